@@ -4,6 +4,7 @@ import numpy as np
 from sondage_deux_degres import sample_degree
 from tirages_sas import sas_sans_remise_base, sas_avec_remise_base, draw_by_draw, tirage_bernoulli, tri_aleatoire, selection_rejet, reservoir_sampling
 from estimation import tableau_resultats  # Assurez-vous que la fonction tableau_resultats est disponible
+from replication import replication_echantillon
 
 # Dictionnaire d'affichage utilisateur vers noms internes
 method_labels = {
@@ -50,6 +51,9 @@ def page_deux_degres():
         return
 
     data = st.session_state["data"]
+
+    # Générateur propre à la session : les sessions concurrentes ne partagent aucun état aléatoire
+    rng = st.session_state.setdefault("rng", np.random.default_rng())
     colonnes = list(data.columns)
 
     st.subheader("🔢 Nombre de degrés à simuler")
@@ -134,6 +138,16 @@ def page_deux_degres():
             )
             size.append(taille_val)
 
+    st.subheader("🔁 Variance par réplications")
+    methodes_replication = {"Aucune": None, "Bootstrap (Rao-Wu)": "bootstrap", "Jackknife (retrait d'une UP)": "jackknife", "BRR (deux UP par strate)": "brr"}
+    replication_label = st.radio(
+        "Méthode de réplication",
+        list(methodes_replication.keys()),
+        horizontal=True,
+        help="Strates : variable de l'étape 1 ; unités primaires : grappes de l'étape 2"
+    )
+    methode_replication = methodes_replication[replication_label]
+
     if st.button("🚀 Lancer le plan de sondage", help="Exécute le tirage selon la configuration"):
         with st.spinner("Tirage en cours..."):
             try:
@@ -141,12 +155,13 @@ def page_deux_degres():
                 methods_str = [str(method) for method in methods]
                 
                 res = sample_degree(
-                    data=data,
+                    data=st.session_state.get("base", data),  # Base de sondage (index déjà construits)
                     size=size,
                     stage=["stratified"] + ["cluster"] * (nb_degres - 1),
-                    varnames=varnames,
+                    varnames=[[v] for v in varnames],  # Une variable par étape
                     method=methods_str,  # Nous passons une liste de chaînes de caractères
-                    description=True
+                    description=True,
+                    random_state=rng
                 )
 
                 st.success("✅ Tirage terminé avec succès!")
@@ -183,19 +198,22 @@ def page_deux_degres():
                         # Calcul des estimateurs
                         y = final_sample_clean["Y"]
                         N_pop = len(data)  # Population totale connue
-                        n = len(final_sample_clean)
-                        pik_value = n / N_pop
-                        pik = np.full(n, pik_value)
-
-                        rho = 1
-                        pik1 = np.outer(pik, pik)
-                        pikl = rho * pik1
-                        np.fill_diagonal(pikl, pik)
+                        pik = final_sample_clean["Prob"].to_numpy()  # Probabilité d'inclusion composée des étapes
 
-                        # Estimation des résultats
-                        resultats = tableau_resultats(y, pik, pikl, N=N_pop, alpha=0.05)
+                        # Estimation des résultats (inclusions supposées indépendantes :
+                        # variance HT en forme fermée, sans matrice n x n)
+                        resultats = tableau_resultats(y, pik, N=N_pop, alpha=0.05, plan="poisson")
                         st.dataframe(resultats.dropna().style.format(precision=3).set_caption("Tableau des résultats statistiques"))
 
+                        # Variance par réplications : strates du premier degré, grappes du second comme UP
+                        if methode_replication is not None:
+                            replications = replication_echantillon(
+                                final_sample_clean, "Y", col_prob="Prob",
+                                col_strate=varnames[0], col_psu=varnames[1],
+                                methode=methode_replication, R=500, random_state=rng, n_jobs=None
+                            )
+                            st.dataframe(replications.style.format(precision=3).set_caption(f"Estimations par réplications ({replication_label})"))
+
             except Exception as e:
                 st.error(f"❌ Erreur lors du tirage: {str(e)}")
                 st.error("Veuillez vérifier votre configuration et réessayer.")
@@ -1,7 +1,8 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from sondage_par_grappes import methodes_tirage
+from sondage_par_grappes import methodes_tirage, tirer_grappes
+from base_de_sondage import SamplingFrame
 from estimation import tableau_resultats
 
 def page_grappes():
@@ -12,7 +13,13 @@ def page_grappes():
         st.warning("⚠️ Veuillez d'abord importer une base de données dans l'onglet **Chargement des données**.")
         return
 
-    df = st.session_state["data"].copy()
+    df = st.session_state["data"]
+    base = st.session_state.get("base")  # Base de sondage construite au chargement
+    if base is None:
+        base = SamplingFrame(df)
+
+    # Générateur propre à la session : les sessions concurrentes ne partagent aucun état aléatoire
+    rng = st.session_state.setdefault("rng", np.random.default_rng())
 
     # ======== Étape 1 : Choix de la variable de grappes =========
     st.subheader("🧩 Variable caractérisant les grappes")
@@ -24,11 +31,9 @@ def page_grappes():
         help="La variable doit identifier les groupes de votre base (ex : villages, classes, zones...)."
     )
 
-    df = df[df[var_grappe].notna()].copy()
-    df[var_grappe] = df[var_grappe].astype(str)
-
-    grappes_uniques = sorted(df[var_grappe].unique())
-    N = len(grappes_uniques)
+    # Index des grappes (codes, permutation triée par grappe, décalages), construit une fois
+    # par variable dans la base de sondage ; les valeurs manquantes sont exclues
+    N = len(base.groupes(var_grappe).modalites)
 
     st.info(f"🔢 Nombre total de grappes disponibles : **{N}**")
 
@@ -58,12 +63,11 @@ def page_grappes():
     if st.button("🚀 Lancer le tirage"):
         try:
             tirage_function = method_dict[method_selected]
-            indices = tirage_function(N, n)
 
-            indices_valides = [i for i in indices if 1 <= i <= N]
-            grappes_tirees = [grappes_uniques[i - 1] for i in indices_valides]
-
-            echantillon = df[df[var_grappe].isin(grappes_tirees)].copy()
+            # Seules les lignes des grappes tirées sont extraites
+            grappes_tirees, echantillon = tirer_grappes(base, var_grappe, n, tirage_function, random_state=rng)
+            grappes_tirees = [str(g) for g in grappes_tirees]
+            echantillon[var_grappe] = echantillon[var_grappe].astype(str)
             echantillon = echantillon.dropna().reset_index(drop=True)
 
             st.success("✅ Tirage effectué avec succès.")
@@ -94,15 +98,9 @@ def page_grappes():
                 pik_value = n / N  # Probabilité d'inclusion constante
                 pik = np.full(N_pop, pik_value)
 
-                # Construction d'une matrice pikl cohérente
-                # On suppose une dépendance modérée entre unités (rho = 0.9 par exemple)
-                rho = 1
-                pik1 = np.outer(pik, pik)           # Produit π_i * π_j
-                pikl = rho * pik1                   # π_ij = ρ × π_i × π_j
-                np.fill_diagonal(pikl, pik)        # π_ii = π_i
-
-                # Appel à la fonction de résultat
-                resultats = tableau_resultats(y, pik, pikl, N_pop, alpha=0.05)
+                # Inclusions indépendantes (π_ij = π_i × π_j) : variance HT en forme fermée,
+                # sans matrice n x n
+                resultats = tableau_resultats(y, pik, N=N_pop, alpha=0.05, plan="poisson")
 
                 st.dataframe(resultats.style.format(precision=3).set_caption("Tableau des résultats statistiques"))
 
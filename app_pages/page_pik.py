@@ -1,15 +1,20 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from unequal_prob_sampling import (
-    piar_defaut,
-    piar_lahiri,
-    pisr_poisson,
-    pisr_systematique,
-    pisr_sunter
-)
+from unequal_prob_sampling import tirage_probabilites_inegales_base, infos_cache_alias
+from base_de_sondage import SamplingFrame
 from estimation import tableau_resultats
 
+# Dictionnaire d'affichage utilisateur vers noms internes
+methodes_pik = {
+    "PIAR - Méthode par défaut (cumuls)": "piar_defaut",
+    "PIAR - Méthode de Lahiri": "piar_lahiri",
+    "PIAR - Méthode des alias": "piar_alias",
+    "PISR - Poisson": "pisr_poisson",
+    "PISR - Systématique": "pisr_systematique",
+    "PISR - Méthode de Sunter": "pisr_sunter"
+}
+
 def run_proba_inegale_interface(df):
     st.title("🎯 Échantillonnage à probabilités inégales")
     st.markdown("""
@@ -22,7 +27,10 @@ def run_proba_inegale_interface(df):
         st.warning("⚠️ Veuillez d'abord importer une base de données via l’onglet **Chargement des données**.")
         return
 
-    df = st.session_state["data"].copy()
+    df = st.session_state["data"]
+
+    # Générateur propre à la session : les sessions concurrentes ne partagent aucun état aléatoire
+    rng = st.session_state.setdefault("rng", np.random.default_rng())
 
     # Section : Configuration
     with st.expander("⚙️ Paramètres d'échantillonnage", expanded=True):
@@ -31,13 +39,7 @@ def run_proba_inegale_interface(df):
         col_id = st.selectbox("📌 **Colonne identifiant les unités (ID)**", options=df.columns)
         col_poids = st.selectbox("⚖️ **Colonne des poids / probabilités πᵢ**", options=df.columns)
         
-        méthode = st.selectbox("📈 **Méthode d’échantillonnage**", [
-            "PIAR - Méthode par défaut (cumuls)",
-            "PIAR - Méthode de Lahiri",
-            "PISR - Poisson",
-            "PISR - Systématique",
-            "PISR - Méthode de Sunter"
-        ])
+        méthode = st.selectbox("📈 **Méthode d’échantillonnage**", list(methodes_pik.keys()))
 
         if méthode != "PISR - Poisson":
             n = st.number_input(
@@ -54,22 +56,30 @@ def run_proba_inegale_interface(df):
 
     if bouton:
         try:
-            if méthode == "PIAR - Méthode par défaut (cumuls)":
-                résultat = piar_defaut(df, n=n, col_id=col_id, col_poids=col_poids)
-            elif méthode == "PIAR - Méthode de Lahiri":
-                résultat = piar_lahiri(df, n=n, col_id=col_id, col_poids=col_poids)
-            elif méthode == "PISR - Poisson":
-                résultat = pisr_poisson(df, col_id=col_id, col_pi=col_poids)
-            elif méthode == "PISR - Systématique":
+            if méthode not in methodes_pik:
+                st.error("❌ Méthode non reconnue.")
+                return
+
+            if méthode == "PISR - Systématique":
                 somme_pi = df[col_poids].sum()
                 if abs(somme_pi - n) > 1e-3:
                     st.warning(f"⚠️ La somme des πᵢ est {somme_pi:.2f}, mais elle devrait être proche de n = {n}.")
-                résultat = pisr_systematique(df, n=n, col_id=col_id, col_pi=col_poids)
-            elif méthode == "PISR - Méthode de Sunter":
-                résultat = pisr_sunter(df, n=n, col_id=col_id, col_pi=col_poids)
-            else:
-                st.error("❌ Méthode non reconnue.")
-                return
+
+            # Tirage sur tableaux, puis une seule extraction des lignes tirées
+            base = st.session_state.get("base")  # Base de sondage : poids convertis une fois, table d'alias en cache
+            if base is None:
+                base = SamplingFrame(st.session_state["data"])
+            tirage = tirage_probabilites_inegales_base(base, col_poids, n, methodes_pik[méthode], random_state=rng)
+            résultat = tirage.en_dataframe(df, col_pik="pik", col_multiplicite="multiplicite")
+            if méthode.startswith("PIAR"):
+                # Probabilité p_i de chaque tirage, prise sur les poids de toute la base : elle ne
+                # doit pas être déduite de π_i avec le nombre de lignes restant après filtrage
+                poids = np.nan_to_num(base.colonne(col_poids))
+                résultat["p_tirage"] = poids[tirage.indices] / poids.sum()
+
+            if méthode == "PIAR - Méthode des alias":
+                infos = infos_cache_alias()
+                st.caption(f"⏱️ Table d'alias : construction {infos['temps_construction']:.4f} s, tirage {infos['temps_tirage']:.4f} s ({infos['succes']} réutilisation(s) du cache)")
 
             st.success("✅ Échantillonnage réalisé avec succès ! Voici l’échantillon obtenu :")
             st.dataframe(résultat)
@@ -82,21 +92,26 @@ def run_proba_inegale_interface(df):
             st.subheader("📊 Résultats d'estimation sur la variable d'intérêt")
 
             if "Y" in résultat.columns:
-                echantillon_clean = résultat.dropna(subset=["Y", col_poids])
+                echantillon_clean = résultat.dropna(subset=["Y", "pik"])
 
                 if len(echantillon_clean) == 0:
                     st.warning("⚠️ Aucune donnée exploitable pour l'estimation : la variable `Y` est manquante pour toutes les unités sélectionnées.")
                 else:
                     y = echantillon_clean["Y"]
-                    pik = echantillon_clean[col_poids].astype(float).to_numpy()
+                    pik = echantillon_clean["pik"].to_numpy()
                     N_pop = len(df)
 
-                    # Matrice des probabilités d’inclusion doubles (sous hypothèse rho=1)
-                    rho = 1
-                    pikl = np.outer(pik, pik) * rho
-                    np.fill_diagonal(pikl, pik)
-
-                    resultats = tableau_resultats(y, pik, pikl, N=N_pop, alpha=0.05)
+                    # Variance HT sans matrice n x n : Hansen-Hurwitz pour les tirages avec remise
+                    # (une ligne par tirage), forme exacte pour Poisson, approximation pour les plans
+                    # de taille fixe sans π_ij (différences successives pour le systématique, Hájek sinon)
+                    if méthode.startswith("PIAR"):
+                        resultats = tableau_resultats(y, pik, N=N_pop, alpha=0.05, plan="pps_avec_remise",
+                                                      p_tirage=echantillon_clean["p_tirage"].to_numpy())
+                    elif méthode == "PISR - Poisson":
+                        resultats = tableau_resultats(y, pik, N=N_pop, alpha=0.05, plan="poisson")
+                    else:
+                        variance = "differences_successives" if méthode == "PISR - Systématique" else "hajek"
+                        resultats = tableau_resultats(y, pik, N=N_pop, alpha=0.05, variance=variance)
                     st.dataframe(resultats.dropna().style.format(precision=3).set_caption("Tableau des résultats statistiques"))
 
                     with st.expander("ℹ️ Hypothèses utilisées pour l'estimation"):
@@ -108,8 +123,11 @@ def run_proba_inegale_interface(df):
                         - **Horvitz-Thompson** (total)
 
                         Hypothèses :
-                        - Probabilités d'inclusion fournies via la colonne πᵢ
-                        - Indépendance supposée entre les unités (ρ = 1)
+                        - Probabilités d'inclusion πᵢ issues du tirage (colonne `pik`)
+                        - PIAR : variance de Hansen-Hurwitz (tirages avec remise)
+                        - PISR - Poisson : sélections indépendantes (π_ij = π_i π_j)
+                        - PISR - Systématique : variance approchée par différences successives
+                        - PISR - Sunter : variance approchée de Hájek (sans π_ij)
                         """)
             else:
                 st.info("ℹ️ La variable `Y` n'est pas présente dans l’échantillon — estimation non effectuée.")
@@ -1,8 +1,14 @@
 import streamlit as st
 import pandas as pd
 import numpy as np
-from tirages_sas import STRATIFICATION, allocations_proportionnelles, repartition_neyman
-from estimation import tableau_resultats
+from tirages_sas import tirage_stratifie_indices, allocations_proportionnelles, repartition_neyman
+from estimation import tableau_resultats, estimateur_stratifie
+from noyau_tirage import index_groupes
+from base_de_sondage import SamplingFrame, statistiques_groupes, statistiques_strates
+
+# Plan de sondage (variance HT en forme fermée) correspondant à chaque méthode de tirage ;
+# les autres méthodes sont des SAS sans remise
+PLANS_PAR_METHODE = {"sas_avec_remise": "pps_avec_remise", "bernoulli": "bernoulli"}
 
 def page_sas():
     st.title("🎯 Tirage SAS (Sondage Aléatoire Simple)")
@@ -13,6 +19,9 @@ def page_sas():
         return
 
     data = st.session_state["data"].copy()
+
+    # Générateur propre à la session : les sessions concurrentes ne partagent aucun état aléatoire
+    rng = st.session_state.setdefault("rng", np.random.default_rng())
     colonnes_qualitatives = data.select_dtypes(include=["object", "category"]).columns.tolist()
 
     st.subheader("🔍 Choix du plan")
@@ -30,7 +39,8 @@ def page_sas():
             try:
                 # Suppression des NaN dans l'échantillon global avant le tirage
                 data_clean = data.dropna(subset=["Y"])  # Ne garder que les lignes où "Y" n'est pas NaN
-                echantillon = STRATIFICATION(data_clean.assign(Strate='A'), {'A': n}, mode=methode)
+                tirage = tirage_stratifie_indices(np.zeros(len(data_clean)), n, mode=methode, random_state=rng)
+                echantillon = tirage.en_dataframe(data_clean, col_pik="pik", reinitialiser_index=True)
                 st.success(f"✅ Tirage effectué. Échantillon de {len(echantillon)} unités.")
                 st.dataframe(echantillon.dropna())
 
@@ -42,15 +52,11 @@ def page_sas():
                     echantillon_clean = echantillon.dropna(subset=["Y"])  # Filtrer les NaN de Y dans l'échantillon final
                     y = echantillon_clean["Y"]
                     N_pop = len(data_clean)  # Population totale après suppression des NaN dans "Y"
-                    pik_value = n / N_pop
-                    pik = np.full(len(echantillon_clean), pik_value)
-
-                    rho = 1
-                    pik1 = np.outer(pik, pik)
-                    pikl = rho * pik1
-                    np.fill_diagonal(pikl, pik)
+                    pik = echantillon_clean["pik"].to_numpy()  # Probabilités d'inclusion issues du tirage
 
-                    resultats = tableau_resultats(y, pik, pikl, N=N_pop, alpha=0.05)
+                    # Variance HT en forme fermée selon le plan (aucune matrice n x n)
+                    plan = PLANS_PAR_METHODE.get(methode, "sas")
+                    resultats = tableau_resultats(y, pik, N=N_pop, alpha=0.05, plan=plan)
                     st.dataframe(resultats.style.format(precision=3).set_caption("Tableau des résultats statistiques"))
 
                     with st.expander("ℹ️ Hypothèses utilisées"):
@@ -63,7 +69,8 @@ def page_sas():
 
                         Hypothèses :
                         - Probabilité d’inclusion **constante**
-                        - **Indépendance** entre les unités (ρ = 1)
+                        - Variance HT propre au plan : SAS sans remise, Bernoulli (sélections indépendantes)
+                          ou tirage avec remise (Hansen-Hurwitz)
 
                         > ⚠️ **Attention** : Si ces hypothèses sont fausses, les résultats peuvent être biaisés.
                         """)
@@ -84,34 +91,35 @@ def page_sas():
         allocations = {}
 
         try:
-            # Suppression des NaN avant de procéder à la répartition
-            data_clean = data.dropna(subset=[var_strate, "Y"])  # Supprime les NaN dans les colonnes nécessaires
-            if "Strate" in data_clean.columns and var_strate != "Strate":
-                data_temp = data_clean.drop(columns=["Strate"]).rename(columns={var_strate: "Strate"})
-            else:
-                data_temp = data_clean.rename(columns={var_strate: "Strate"})
-
-            data_temp["Strate"] = data_temp["Strate"].astype(str)
-            strates = sorted(data_temp["Strate"].unique())
+            # Statistiques par strate (N_h, et Σy, Σy², S²_h pour Neyman) sur les lignes où la strate
+            # et Y sont renseignées : calculées une fois par base puis servies depuis le cache
+            base = st.session_state.get("base")
+            if base is None:
+                base = SamplingFrame(data, empreinte=st.session_state.get("empreinte"))
+            statistiques = statistiques_strates(base, var_strate, colonnes_requises=("Y",))
+            statistiques.index = statistiques.index.astype(str)
+            strates = sorted(statistiques.index)
+            tailles_disponibles = statistiques["N_h"].to_dict()
 
             if mode_repartition == "Fixe par strate":
                 st.markdown("Définissez la taille de l’échantillon pour chaque strate :")
-                tailles_disponibles = data_temp["Strate"].value_counts().to_dict()
                 for strate in strates:
-                    max_val = tailles_disponibles.get(strate, 0)
+                    max_val = int(tailles_disponibles.get(strate, 0))
                     taille = st.number_input(f"→ {strate}", min_value=0, max_value=max_val, value=min(2, max_val), step=1, key=f"taille_{strate}")
                     allocations[strate] = taille
 
             elif mode_repartition == "Proportionnelle":
                 n_total = st.number_input("Taille totale de l’échantillon", min_value=1, value=10)
-                allocations = allocations_proportionnelles(data_temp, n_total)
+                allocations = allocations_proportionnelles(base, n_total, statistiques=statistiques)
                 st.success("📊 Répartition proportionnelle calculée :")
                 st.write(allocations)
 
             elif mode_repartition == "Neyman":
                 var_quant = st.selectbox("Variable d’intérêt (quantitative)", data.select_dtypes(include='number').columns)
                 n_total = st.number_input("Taille totale de l’échantillon", min_value=1, value=10)
-                allocations = repartition_neyman(data_temp, n_total, var_quant)
+                statistiques_neyman = statistiques_strates(base, var_strate, var_quant, colonnes_requises=("Y",))
+                statistiques_neyman.index = statistiques_neyman.index.astype(str)
+                allocations = repartition_neyman(base, n_total, var_quant, statistiques=statistiques_neyman)
                 st.success("📊 Répartition selon Neyman :")
                 st.write(allocations)
 
@@ -128,18 +136,16 @@ def page_sas():
                     data_temp = data_clean.rename(columns={var_strate: "Strate"})
 
                 data_temp["Strate"] = data_temp["Strate"].astype(str)
-                strates_valides = data_temp["Strate"].unique()
-                allocations_valides = {k: v for k, v in allocations.items() if k in strates_valides}
+                allocations_valides = {k: v for k, v in allocations.items() if k in tailles_disponibles}
 
                 if not allocations_valides:
                     st.error("❌ Aucune strate valide détectée dans les allocations.")
                     return
 
-                tailles_dispo = data_temp["Strate"].value_counts().to_dict()
                 erreurs = []
 
                 for strate, taille_demandee in allocations_valides.items():
-                    taille_disponible = tailles_dispo.get(strate, 0)
+                    taille_disponible = tailles_disponibles.get(strate, 0)
                     if taille_demandee > taille_disponible:
                         erreurs.append(f"Strate '{strate}' : {taille_demandee} > {taille_disponible}")
 
@@ -149,7 +155,8 @@ def page_sas():
                         st.markdown(f"- {msg}")
                     return
 
-                echantillon = STRATIFICATION(data_temp, allocations_valides, mode=methode)
+                tirage = tirage_stratifie_indices(data_temp["Strate"].to_numpy(), allocations_valides, mode=methode, random_state=rng, n_jobs=None)
+                echantillon = tirage.en_dataframe(data_temp, col_pik="pik", reinitialiser_index=True)
                 st.success(f"✅ Tirage réussi. Taille finale de l’échantillon : {len(echantillon)}")
                 st.dataframe(echantillon.dropna())  # Filtrer les NaN avant d'afficher l'échantillon final
 
@@ -168,16 +175,24 @@ def page_sas():
                     else:
                         y = echantillon_clean["Y"]
                         N_pop = len(data_clean)  # Population totale après suppression des NaN dans "Y"
-                        n = len(echantillon_clean)
-                        pik_value = n / N_pop
-                        pik = np.full(n, pik_value)
-
-                        rho = 1
-                        pik1 = np.outer(pik, pik)
-                        pikl = rho * pik1
-                        np.fill_diagonal(pikl, pik)
+                        pik = echantillon_clean["pik"].to_numpy()  # π_i = n_h / N_h dans chaque strate
+
+                        # Variance HT en forme fermée, strate par strate (aucune matrice n x n)
+                        plan = PLANS_PAR_METHODE.get(methode, "sas_stratifie")
+                        resultats = tableau_resultats(y, pik, N=N_pop, alpha=0.05, plan=plan,
+                                                      strates=echantillon_clean["Strate"].to_numpy())
+
+                        # Estimateur stratifié (SAS sans remise dans chaque strate), à partir des
+                        # statistiques par strate de l'échantillon et des N_h déjà en cache
+                        if methode not in ("sas_avec_remise", "bernoulli"):
+                            groupes_echantillon = index_groupes(echantillon_clean["Strate"].to_numpy(), trier=True)
+                            stats_echantillon = statistiques_groupes(groupes_echantillon, y=y.to_numpy(dtype=float))
+                            effectifs = statistiques["N_h"][statistiques.index.isin(allocations_valides)]
+                            try:
+                                resultats = pd.concat([resultats, estimateur_stratifie(stats_echantillon, effectifs, alpha=0.05)], ignore_index=True)
+                            except ValueError as e:
+                                st.info(f"ℹ️ Estimateur stratifié non calculé : {e}")
 
-                        resultats = tableau_resultats(y, pik, pikl, N=N_pop, alpha=0.05)
                         st.dataframe(resultats.dropna().style.format(precision=3).set_caption("Tableau des résultats statistiques"))
 
                     with st.expander("ℹ️ Hypothèses utilisées"):
@@ -189,8 +204,8 @@ def page_sas():
                         - **Horvitz-Thompson (HT)** pour le total
 
                         Hypothèses :
-                        - Probabilité d’inclusion **constante**
-                        - **Indépendance** entre les unités (ρ = 1)
+                        - Probabilité d’inclusion **constante dans chaque strate** (n_h / N_h)
+                        - Variance HT propre au plan, calculée **strate par strate**
 
                         > ⚠️ **Attention** : Si ces hypothèses sont fausses, les résultats peuvent être biaisés.
                         """)
@@ -4,6 +4,8 @@ import streamlit as st
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from noyau_tirage import empreinte_frame
+from base_de_sondage import SamplingFrame
 
 def page_upload():
     st.title("📂 Chargement des données")
@@ -22,21 +24,39 @@ def page_upload():
 
     if uploaded_file is not None:
         try:
-            # Lecture du fichier CSV avec détection étendue des valeurs manquantes
-            df = pd.read_csv(
-                uploaded_file,
-                sep=sep,
-                na_values=["", " ", "NA", "N/A", "null", "Null", "NaN"]
-            )
-
-            # Remplacement des cellules vides ou espaces par NA
-            df.replace(r'^\s*$', pd.NA, regex=True, inplace=True)
-
-            # Nettoyage des noms de colonnes
-            df.columns = df.columns.str.strip()
-
-            # Stockage dans session_state
-            st.session_state["data"] = df
+            # Streamlit réexécute la page à chaque interaction : la lecture, l'empreinte et la
+            # base de sondage ne sont reconstruites que si le fichier (ou le séparateur) change
+            cle_fichier = (getattr(uploaded_file, "file_id", None) or uploaded_file.name, uploaded_file.size, sep)
+            if st.session_state.get("cle_fichier") != cle_fichier:
+                # Lecture du fichier CSV avec détection étendue des valeurs manquantes
+                df = pd.read_csv(
+                    uploaded_file,
+                    sep=sep,
+                    na_values=["", " ", "NA", "N/A", "null", "Null", "NaN"]
+                )
+
+                # Remplacement des cellules vides ou espaces par NA
+                df.replace(r'^\s*$', pd.NA, regex=True, inplace=True)
+
+                # Nettoyage des noms de colonnes
+                df.columns = df.columns.str.strip()
+
+                # Stockage dans session_state, avec l'empreinte de la base : clé des index
+                # (grappes, strates) construits une seule fois par jeu de données
+                st.session_state["data"] = df
+                st.session_state["empreinte"] = empreinte_frame(df)
+
+                # Base de sondage : strates et grappes usuelles factorisées une fois pour toutes ;
+                # les autres variables le sont au premier tirage qui les utilise
+                st.session_state["base"] = SamplingFrame(
+                    df,
+                    col_strate="Strate" if "Strate" in df.columns else None,
+                    col_grappe="Grappe" if "Grappe" in df.columns else None,
+                    empreinte=st.session_state["empreinte"]
+                )
+                st.session_state["cle_fichier"] = cle_fichier
+
+            df = st.session_state["data"]
 
             # Aperçu des données
             st.success("✅ Fichier chargé avec succès !")
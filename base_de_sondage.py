@@ -0,0 +1,277 @@
+import weakref
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple, Union
+from noyau_tirage import IndexGroupes, empreinte_frame, index_groupes_frame
+
+# --------------------------------------------------
+# Base de sondage compacte, construite une fois par jeu de données
+class SamplingFrame:
+    """
+    Base de sondage prête pour les tirages : les factorisations (strates, grappes), les colonnes
+    numériques (tailles, π_i) et leurs cumuls sont calculés une seule fois, puis partagés par
+    tous les algorithmes (tirages_sas, sondage_par_grappes, sondage_deux_degres,
+    unequal_prob_sampling).
+
+    Attributes:
+        data (pd.DataFrame): Les données d'origine (non copiées).
+        col_id, col_strate, col_grappe, col_taille, col_pi (str | None): Colonnes de référence.
+        strates (IndexGroupes | None): Codes int32 et décalages des strates (si col_strate).
+        grappes (IndexGroupes | None): Codes int32 et décalages des grappes (si col_grappe).
+        tailles (np.ndarray | None): Variable de taille en float64 (si col_taille).
+        pi (np.ndarray | None): Probabilités d'inclusion en float64 (si col_pi).
+    """
+
+    def __init__(self, data: pd.DataFrame, col_strate: Optional[str] = None, col_grappe: Optional[str] = None,
+                 col_taille: Optional[str] = None, col_pi: Optional[str] = None, col_id: Optional[str] = None,
+                 empreinte: Optional[str] = None):
+        self.data = data
+        self.col_id, self.col_strate, self.col_grappe = col_id, col_strate, col_grappe
+        self.col_taille, self.col_pi = col_taille, col_pi
+        # Dans un dict : partagée entre enveloppes d'un même DataFrame
+        self._empreinte = {"base": empreinte, "fournie": empreinte is not None}
+        self._contenus: Optional[Dict[str, str]] = None  # Empreintes des colonnes en cache (caches partagés)
+        self._verifiees: set = set()  # Colonnes déjà vérifiées par cette enveloppe
+        self._groupes: Dict[Tuple[str, ...], IndexGroupes] = {}
+        self._colonnes: Dict[str, np.ndarray] = {}
+        self._cumuls: Dict[str, np.ndarray] = {}
+
+        for colonne in (col_strate, col_grappe, col_taille, col_pi, col_id):
+            if colonne is not None and colonne not in data.columns:
+                raise ValueError(f"La colonne '{colonne}' est absente de la base.")
+
+        # Les structures déclarées sont construites tout de suite, une fois pour toutes
+        self.strates = self.groupes(col_strate) if col_strate is not None else None
+        self.grappes = self.groupes(col_grappe) if col_grappe is not None else None
+        self.tailles = self.colonne(col_taille) if col_taille is not None else None
+        self.pi = self.colonne(col_pi) if col_pi is not None else None
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def __repr__(self) -> str:
+        return (f"SamplingFrame(N={len(self)}, strates={self.col_strate!r}, grappes={self.col_grappe!r}, "
+                f"taille={self.col_taille!r}, pi={self.col_pi!r})")
+
+    @property
+    def empreinte(self) -> str:
+        # Empreinte de toute la base, calculée au premier besoin seulement
+        if self._empreinte["base"] is None:
+            self._empreinte["base"] = empreinte_frame(self.data)
+        return self._empreinte["base"]
+
+    @property
+    def identifiants(self) -> np.ndarray:
+        return self.data[self.col_id].to_numpy() if self.col_id is not None else np.arange(len(self))
+
+    def groupes(self, colonnes: Union[str, List[str]]) -> IndexGroupes:
+        """
+        Index (codes int32, permutation triée, décalages) d'une ou plusieurs colonnes,
+        construit au premier appel puis conservé dans la base.
+        """
+        cle = (colonnes,) if isinstance(colonnes, str) else tuple(colonnes)
+        self._verifier_contenu(cle)
+        if cle not in self._groupes:
+            self._groupes[cle] = index_groupes_frame(self.data, list(cle), empreinte=self._empreinte["base"])
+        return self._groupes[cle]
+
+    def colonne(self, nom: str) -> np.ndarray:
+        """
+        Colonne numérique en float64 contigu (valeurs manquantes conservées en NaN), mise en cache.
+        """
+        self._verifier_contenu((nom,))
+        if nom not in self._colonnes:
+            self._colonnes[nom] = np.ascontiguousarray(pd.to_numeric(self.data[nom], errors="coerce").to_numpy(dtype=float, na_value=np.nan))
+        return self._colonnes[nom]
+
+    def cumul(self, nom: str) -> np.ndarray:
+        """
+        Cumuls de la colonne (valeurs manquantes comptées 0), mis en cache : cumul des π_i pour
+        le tirage systématique, des tailles pour les tirages proportionnels.
+        """
+        self._verifier_contenu((nom,))
+        if nom not in self._cumuls:
+            self._cumuls[nom] = np.cumsum(np.nan_to_num(self.colonne(nom)))
+        return self._cumuls[nom]
+
+    def _verifier_contenu(self, colonnes: Tuple[str, ...]) -> None:
+        # Caches partagés entre appels sur un même DataFrame (voir base_de_sondage) : chaque colonne
+        # utilisée est hachée une fois par enveloppe, et ce qui en dépend est reconstruit si elle
+        # a été modifiée en place depuis la mise en cache.
+        if self._contenus is None:
+            return
+        for nom in colonnes:
+            if nom in self._verifiees:
+                continue
+            self._verifiees.add(nom)
+            empreinte = empreinte_frame(self.data, nom)
+            if self._contenus.get(nom, empreinte) != empreinte:
+                self._colonnes.pop(nom, None)
+                self._cumuls.pop(nom, None)
+                for cle in [cle for cle in self._groupes if nom in cle]:
+                    del self._groupes[cle]
+                if not self._empreinte["fournie"]:
+                    self._empreinte["base"] = None  # Empreinte de toute la base, à recalculer
+            self._contenus[nom] = empreinte
+
+    def effectifs(self, colonnes: Union[str, List[str]]) -> pd.Series:
+        """
+        Effectif N_h de chaque groupe, indexé par les modalités.
+        """
+        groupes = self.groupes(colonnes)
+        return pd.Series(groupes.effectifs, index=groupes.modalites)
+
+    def totaux(self, colonnes: Union[str, List[str]], variable: str) -> pd.Series:
+        """
+        Total de la variable dans chaque groupe (valeurs manquantes comptées 0), en une passe.
+        """
+        groupes = self.groupes(colonnes)
+        valides = groupes.codes >= 0
+        sommes = np.bincount(groupes.codes[valides], weights=np.nan_to_num(self.colonne(variable))[valides],
+                             minlength=len(groupes.modalites))
+        return pd.Series(sommes, index=groupes.modalites)
+
+# --------------------------------------------------
+# Accès uniforme aux données, qu'on reçoive un DataFrame ou une SamplingFrame
+#
+# Index, colonnes, cumuls et empreinte déjà calculés pour un DataFrame passé directement, par objet :
+# id(DataFrame) -> (référence faible, signature, caches, empreintes des colonnes utilisées). La
+# référence faible ne garde pas le DataFrame en vie, et l'entrée disparaît avec lui (un nouvel
+# objet de même id repart de zéro).
+_caches_par_objet: Dict[int, tuple] = {}
+
+def _oublier_objet(cle: int):
+    return lambda _: _caches_par_objet.pop(cle, None)
+
+def base_de_sondage(donnees: Union[pd.DataFrame, SamplingFrame], empreinte: Optional[str] = None) -> SamplingFrame:
+    """
+    Renvoie donnees telle quelle si c'est déjà une SamplingFrame, sinon l'enveloppe (sans copie).
+
+    Pour un DataFrame, les index de groupes, colonnes, cumuls et l'empreinte sont partagés entre
+    les appels successifs sur le même objet : seul le premier appel factorise les données. Un
+    changement de taille, de colonnes ou d'empreinte fournie invalide tous les caches ; à chaque
+    appel, les colonnes effectivement utilisées sont hachées (pd.util.hash_pandas_object) et
+    celles modifiées en place sont recalculées. Une SamplingFrame n'est jamais revérifiée.
+    """
+    if isinstance(donnees, SamplingFrame):
+        return donnees
+    base = SamplingFrame(donnees, empreinte=empreinte)
+    cle = id(donnees)
+    signature = (len(donnees), tuple(donnees.columns), empreinte)
+    entree = _caches_par_objet.get(cle)
+    if entree is None or entree[0]() is not donnees or entree[1] != signature:
+        entree = (weakref.ref(donnees, _oublier_objet(cle)), signature,
+                  (base._groupes, base._colonnes, base._cumuls, base._empreinte), {})
+        _caches_par_objet[cle] = entree
+    base._groupes, base._colonnes, base._cumuls, base._empreinte = entree[2]
+    base._contenus = entree[3]
+    return base
+
+# --------------------------------------------------
+# Statistiques exhaustives par strate (N_h, Σy, Σy², coûts), calculées par sommes vectorisées
+def statistiques_groupes(groupes: IndexGroupes, y: Optional[np.ndarray] = None, couts: Optional[np.ndarray] = None,
+                         exclus: Optional[np.ndarray] = None) -> pd.DataFrame:
+    """
+    Table des statistiques de chaque groupe, par sommes pondérées sur les codes (np.bincount).
+
+    Args:
+        groupes (IndexGroupes): Index des groupes (strates).
+        y (np.ndarray, optionnel): Variable d'intérêt en float64 (NaN = manquante).
+        couts (np.ndarray, optionnel): Coût unitaire de chaque ligne.
+        exclus (np.ndarray, optionnel): Masque des lignes à ignorer entièrement.
+
+    Returns:
+        pd.DataFrame: Une ligne par groupe non vide : N_h, et si y est fourni n_y (valeurs
+        renseignées), somme_y, somme_y2, moyenne, variance (S²_h, ddof=1) et ecart_type ;
+        si couts est fourni, cout (coût unitaire moyen c_h).
+    """
+    codes = groupes.codes if exclus is None else np.where(exclus, -1, groupes.codes)
+    G = len(groupes.modalites)
+    valides = codes >= 0
+    stats = {"N_h": np.bincount(codes[valides], minlength=G)}
+
+    if y is not None:
+        renseignes = valides & ~np.isnan(y)
+        c, v = codes[renseignes], y[renseignes]
+        n_y = np.bincount(c, minlength=G)
+        somme_y = np.bincount(c, weights=v, minlength=G)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            moyenne = somme_y / n_y
+        # S²_h à partir des écarts à la moyenne de la strate (exact pour une strate constante,
+        # sans la perte de précision de Σy² - (Σy)²/n)
+        ecarts2 = np.bincount(c, weights=(v - moyenne[c]) ** 2, minlength=G)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            variance = np.where(n_y > 1, ecarts2 / (n_y - 1), np.nan)
+        stats.update({
+            "n_y": n_y,
+            "somme_y": somme_y,
+            "somme_y2": np.bincount(c, weights=v ** 2, minlength=G),
+            "moyenne": moyenne,
+            "variance": variance,
+            "ecart_type": np.sqrt(variance),
+        })
+
+    if couts is not None:
+        c = codes[valides]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            stats["cout"] = np.bincount(c, weights=np.nan_to_num(couts[valides]), minlength=G) / stats["N_h"]
+
+    table = pd.DataFrame(stats, index=pd.Index(groupes.modalites))
+    return table[table["N_h"] > 0]
+
+# Cache LRU des tables de statistiques, indexé par (empreinte, strate, variable, coût, colonnes requises)
+TAILLE_MAX_CACHE_STATISTIQUES = 32
+_cache_statistiques: "OrderedDict[tuple, pd.DataFrame]" = OrderedDict()
+
+def statistiques_strates(donnees: Union[pd.DataFrame, SamplingFrame], col_strate: str, variable: Optional[str] = None,
+                         col_cout: Optional[str] = None, colonnes_requises: Tuple[str, ...] = (),
+                         empreinte: Optional[str] = None) -> pd.DataFrame:
+    """
+    Statistiques par strate (voir statistiques_groupes), calculées une fois par base et mises en cache.
+
+    Args:
+        donnees (pd.DataFrame | SamplingFrame): La base.
+        col_strate (str): Variable de stratification.
+        variable (str, optionnel): Variable d'intérêt (Σy, Σy², S²_h).
+        col_cout (str, optionnel): Colonne des coûts unitaires.
+        colonnes_requises (tuple): Les lignes où l'une de ces colonnes manque sont ignorées
+            (par exemple ("Y",) pour ne garder que les unités où Y est observée).
+        empreinte (str, optionnel): Empreinte de la base, si elle est déjà connue.
+
+    Returns:
+        pd.DataFrame: Une ligne par strate (copie de la table en cache).
+    """
+    colonnes_requises = tuple(colonnes_requises)
+    utilisees = [c for c in dict.fromkeys((col_strate, variable, col_cout) + colonnes_requises) if c is not None]
+    if isinstance(donnees, SamplingFrame):
+        base = donnees
+        empreinte = base.empreinte
+    else:
+        base = SamplingFrame(donnees, empreinte=empreinte)
+        empreinte = empreinte if empreinte is not None else empreinte_frame(donnees, utilisees)
+
+    for colonne in utilisees:
+        if colonne not in base.data.columns:
+            raise ValueError(f"La colonne '{colonne}' est absente de la base.")
+
+    cle = (empreinte, col_strate, variable, col_cout, colonnes_requises)
+    if cle in _cache_statistiques:
+        _cache_statistiques.move_to_end(cle)
+        return _cache_statistiques[cle].copy()
+
+    exclus = None
+    if colonnes_requises:
+        exclus = base.data[list(colonnes_requises)].isna().any(axis=1).to_numpy()
+    table = statistiques_groupes(
+        base.groupes(col_strate),
+        y=base.colonne(variable) if variable is not None else None,
+        couts=base.colonne(col_cout) if col_cout is not None else None,
+        exclus=exclus,
+    )
+    table.index.name = col_strate
+
+    _cache_statistiques[cle] = table
+    if len(_cache_statistiques) > TAILLE_MAX_CACHE_STATISTIQUES:
+        _cache_statistiques.popitem(last=False)  # Retire la table la moins récemment utilisée
+    return table.copy()
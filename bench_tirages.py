@@ -0,0 +1,110 @@
+"""
+Mesure des temps de tirage : implémentations vectorisées contre les anciennes versions en boucle.
+
+Usage :
+    python bench_tirages.py
+    python bench_tirages.py --N-systematique 10000000 --N-draw 100000 --n-draw 10000
+
+Les anciennes versions (recopiées ci-dessous telles qu'elles existaient avant la vectorisation)
+ont un coût O(N·n) pour le systématique et O(N·n²) pour le draw-by-draw : elles sont mesurées
+sur des tailles réduites (--N-ancien, --n-ancien), les nouvelles aux deux tailles.
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+
+from tirages_sas import draw_by_draw
+from unequal_prob_sampling import pisr_systematique, pisr_systematique_indices
+
+
+# --------------------------------------------------
+# Anciennes implémentations, conservées uniquement comme référence de temps
+
+def ancien_pisr_systematique(df, n, col_id, col_pi, random_state=222):
+    if random_state is not None:
+        np.random.seed(random_state)
+    df = df.copy()
+    df['V'] = df[col_pi].cumsum()
+    df['V_shift'] = df['V'].shift(fill_value=0)
+    u = np.random.uniform(0, 1)
+    positions = [u + k for k in range(n)]
+    sélection = pd.DataFrame()
+    for pos in positions:
+        ligne = df[(df['V_shift'] < pos) & (pos <= df['V'])].head(1)
+        sélection = pd.concat([sélection, ligne], axis=0)
+    return pd.DataFrame(sélection).reset_index(drop=True)
+
+
+def ancien_draw_by_draw(N, n, random_state=None):
+    if random_state is not None:
+        random.seed(random_state)
+    numero = list(range(1, N + 1))
+    echantillon = []
+    for _ in range(n):
+        choix = random.choice([x for x in numero if x not in echantillon])
+        echantillon.append(choix)
+    return echantillon
+
+
+# --------------------------------------------------
+# Outils de mesure
+
+def chrono(fonction, *args, repetitions=3, **kwargs):
+    """Meilleur temps (en secondes) sur quelques répétitions."""
+    meilleur = np.inf
+    for _ in range(repetitions):
+        debut = time.perf_counter()
+        fonction(*args, **kwargs)
+        meilleur = min(meilleur, time.perf_counter() - debut)
+    return meilleur
+
+
+def base_pps(N, n, graine=0):
+    rng = np.random.default_rng(graine)
+    x = rng.uniform(1, 100, N)
+    return pd.DataFrame({'ID': np.arange(1, N + 1), 'pi': n * x / x.sum()})
+
+
+def ligne(libelle, N, n, secondes):
+    print(f"{libelle:<45} N={N:>10,} n={n:>7,} : {secondes * 1000:10.1f} ms")
+
+
+# --------------------------------------------------
+# Scénarios
+
+def bench_systematique(N, n, N_ancien, n_ancien):
+    print("PISR systématique")
+    petite = base_pps(N_ancien, n_ancien)
+    ligne("  ancienne version (boucle + pd.concat)", N_ancien, n_ancien,
+          chrono(ancien_pisr_systematique, petite, n_ancien, 'ID', 'pi', repetitions=1))
+    ligne("  pisr_systematique", N_ancien, n_ancien, chrono(pisr_systematique, petite, n_ancien, 'ID', 'pi'))
+
+    grande = base_pps(N, n)
+    pi = grande['pi'].to_numpy()
+    ligne("  pisr_systematique_indices", N, n, chrono(pisr_systematique_indices, pi, n))
+    ligne("  pisr_systematique (DataFrame)", N, n, chrono(pisr_systematique, grande, n, 'ID', 'pi'))
+
+
+def bench_draw_by_draw(N, n, N_ancien, n_ancien):
+    print("Draw-by-draw")
+    ligne("  ancienne version (liste filtrée)", N_ancien, n_ancien,
+          chrono(ancien_draw_by_draw, N_ancien, n_ancien, random_state=1, repetitions=1))
+    ligne("  draw_by_draw", N_ancien, n_ancien, chrono(draw_by_draw, N_ancien, n_ancien, random_state=1))
+    ligne("  draw_by_draw", N, n, chrono(draw_by_draw, N, n, random_state=1))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--N-systematique", type=int, default=10_000_000)
+    parser.add_argument("--n-systematique", type=int, default=1_000)
+    parser.add_argument("--N-draw", type=int, default=100_000)
+    parser.add_argument("--n-draw", type=int, default=10_000)
+    parser.add_argument("--N-ancien", type=int, default=20_000)
+    parser.add_argument("--n-ancien", type=int, default=100)
+    args = parser.parse_args()
+
+    bench_systematique(args.N_systematique, args.n_systematique, args.N_ancien, args.n_ancien)
+    bench_draw_by_draw(args.N_draw, args.n_draw, args.N_ancien, args.n_ancien)
@@ -1,7 +1,10 @@
+import os
 import numpy as np
 import pandas as pd
 import warnings
-from scipy import stats
+from concurrent.futures import ThreadPoolExecutor
+from scipy import stats, sparse
+from noyau_tirage import index_groupes
 
 #############################################################################################
 ### Fonction pour basique pour le calcul de la moyenne empirique et l'estimateur du total ###
@@ -152,24 +155,263 @@ def estimateur_Hajek(y, pik, N=None, type_estimateur="moyenne", alpha=0.05):
 import numpy as np
 from scipy import stats
 
-def estimateur_HT_IC_exact(y, pikl, method=1, alpha=0.05):
+# Nombre d'éléments π_ij traités par bloc de lignes (2^22 float64 = 32 Mo par tableau temporaire)
+ELEMENTS_PAR_BLOC_HT = 1 << 22
+
+
+def _variance_HT_bloc(pikl, y, pik, debut, fin, method):
+    """
+    Contribution des lignes debut:fin de pikl à la variance de Horvitz-Thompson.
+    Seul le bloc de lignes est lu (fichier mappé en mémoire compris) : mémoire en O(bloc x n).
+    """
+    lignes = np.arange(debut, fin)
+
+    if method == 1:
+        # Bloc complet de la matrice : Σ_j y_i y_j Δ_ij / (π_i π_j π_ij)
+        bloc = np.array(pikl[debut:fin], dtype=float)
+        if np.any(np.isnan(bloc)):
+            raise ValueError("Il y a des valeurs manquantes dans pikl.")
+        produit = pik[debut:fin, None] * pik[None, :]
+        delta = bloc - produit
+        delta[lignes - debut, lignes] = pik[debut:fin] * (1 - pik[debut:fin])
+        denom = produit * bloc
+        termes = np.divide(y[debut:fin, None] * y[None, :] * delta, denom,
+                           out=np.zeros_like(denom), where=denom != 0)
+        return termes.sum()
+
+    # Sen-Yates-Grundy : la matrice étant symétrique et la diagonale nulle,
+    # seul le triangle supérieur (j > i) est sommé, sans le facteur 1/2
+    bloc = np.array(pikl[debut:fin, debut:], dtype=float)
+    if np.any(np.isnan(bloc)):
+        raise ValueError("Il y a des valeurs manquantes dans pikl.")
+    y_ratio = y / pik
+    colonnes = np.arange(debut, len(y))
+    triangle = colonnes[None, :] > lignes[:, None]
+    ecarts2 = (y_ratio[debut:fin, None] - y_ratio[None, debut:]) ** 2
+    numerateur = ecarts2 * (pik[debut:fin, None] * pik[None, debut:] - bloc)
+    termes = np.divide(numerateur, bloc, out=np.zeros_like(bloc), where=triangle & (bloc != 0))
+    return termes.sum()
+
+
+def _variance_HT_dense(pikl, y, pik, method, taille_bloc=None, n_jobs=1):
+    # Somme des contributions de chaque bloc de lignes, dans l'ordre des blocs
+    n = len(y)
+    if taille_bloc is None:
+        taille_bloc = max(1, ELEMENTS_PAR_BLOC_HT // max(n, 1))
+    debuts = range(0, n, taille_bloc)
+    calcul = lambda debut: _variance_HT_bloc(pikl, y, pik, debut, min(debut + taille_bloc, n), method)
+    n_jobs = os.cpu_count() if n_jobs is None else n_jobs
+    if n_jobs > 1 and len(debuts) > 1:
+        with ThreadPoolExecutor(max_workers=n_jobs) as executeur:
+            contributions = list(executeur.map(calcul, debuts))
+    else:
+        contributions = [calcul(debut) for debut in debuts]
+    return float(np.sum(contributions))
+
+
+class JointInclusion:
+    """
+    Probabilités d'inclusion doubles π_ij d'un échantillon, sous la forme la plus compacte
+    que permet le plan. Les paires non représentées sont indépendantes (π_ij = π_i π_j) :
+    elles ne contribuent pas à la variance de Horvitz-Thompson.
+
+    Représentations (constructeurs) :
+    - JointInclusion.dense(pikl) : matrice n x n (ndarray, np.memmap ou fichier .npy) ;
+    - JointInclusion.creuse(pikl, pik) : matrice scipy.sparse des π_ij des paires dépendantes ;
+    - JointInclusion.par_blocs(groupes, matrices) : un bloc dense par strate ou grappe ;
+    - JointInclusion.par_plan(plan, pik, strates) : implicite (SAS éventuellement stratifié,
+      Poisson/Bernoulli), calcul en O(n).
+
+    Attributes:
+        pik (np.ndarray): Probabilités d'inclusion simples π_i.
+        representation (str): "dense", "creuse", "blocs" ou "plan".
+    """
+
+    def __init__(self, pik, representation, donnees):
+        self.pik = np.asarray(pik, dtype=float)
+        self.representation = representation
+        self._donnees = donnees
+
+    def __len__(self):
+        return len(self.pik)
+
+    def __repr__(self):
+        return f"JointInclusion(n={len(self)}, representation={self.representation!r})"
+
+    @classmethod
+    def dense(cls, pikl):
+        # Matrice complète ; un np.memmap ou un fichier .npy n'est jamais chargé en entier
+        if isinstance(pikl, (str, os.PathLike)):
+            pikl = np.load(pikl, mmap_mode="r")
+        elif not isinstance(pikl, np.ndarray):
+            pikl = np.asarray(pikl, dtype=float)
+        if pikl.ndim != 2 or pikl.shape[0] != pikl.shape[1]:
+            raise ValueError("pikl doit être une matrice carrée.")
+        pik = np.array(np.diagonal(pikl), dtype=float)
+        if np.any(np.isnan(pik)):
+            raise ValueError("Il y a des valeurs manquantes dans pikl.")
+        return cls(pik, "dense", pikl)
+
+    @classmethod
+    def creuse(cls, pikl, pik):
+        # Seules les paires stockées (hors diagonale, les deux triangles) sont dépendantes
+        pik = np.asarray(pik, dtype=float)
+        matrice = sparse.coo_matrix(pikl)
+        if matrice.shape != (len(pik), len(pik)):
+            raise ValueError("pikl doit être une matrice carrée de la taille de pik.")
+        hors_diagonale = matrice.row != matrice.col
+        lignes, colonnes = matrice.row[hors_diagonale], matrice.col[hors_diagonale]
+        valeurs = matrice.data[hors_diagonale].astype(float)
+        if np.any(np.isnan(valeurs)):
+            raise ValueError("Il y a des valeurs manquantes dans pikl.")
+        return cls(pik, "creuse", (lignes, colonnes, valeurs))
+
+    @classmethod
+    def par_blocs(cls, groupes, matrices):
+        # matrices[g] : bloc dense des π_ij des unités du groupe g, dans leur ordre d'apparition
+        groupes = index_groupes(np.asarray(groupes))
+        pik = np.empty(len(groupes.codes))
+        blocs = []
+        for g, modalite in enumerate(groupes.modalites):
+            positions = groupes.positions(g)
+            bloc = np.asarray(matrices[modalite], dtype=float)
+            if bloc.shape != (len(positions), len(positions)):
+                raise ValueError(f"Le bloc du groupe '{modalite}' doit être de taille {len(positions)} x {len(positions)}.")
+            pik[positions] = np.diagonal(bloc)
+            blocs.append((positions, bloc))
+        if np.any(np.isnan(pik)):
+            raise ValueError("Il y a des valeurs manquantes dans pikl.")
+        return cls(pik, "blocs", blocs)
+
+    @classmethod
+    def par_plan(cls, plan, pik, strates=None):
+        # SAS sans remise (par strate) : π_ij = π_h (n_h - 1) / (N_h - 1) dans la strate h
+        # Poisson / Bernoulli : sélections indépendantes, aucune paire dépendante
+        pik = np.asarray(pik, dtype=float)
+        if plan in ("poisson", "bernoulli"):
+            return cls(pik, "plan", None)
+        if plan not in ("sas", "sas_stratifie"):
+            raise ValueError(f"Plan inconnu : {plan}. Plans disponibles : sas, sas_stratifie, poisson, bernoulli.")
+        if plan == "sas_stratifie" and strates is None:
+            raise ValueError("Le plan 'sas_stratifie' nécessite les strates.")
+        codes = np.zeros(len(pik), dtype=np.int64) if strates is None else pd.factorize(np.asarray(strates))[0]
+        if np.any(codes < 0):
+            raise ValueError("Il y a des valeurs manquantes dans les strates.")
+        H = codes.max() + 1 if len(codes) else 0
+        n_h = np.bincount(codes, minlength=H).astype(float)
+        pi_h = np.bincount(codes, weights=pik, minlength=H) / n_h
+        N_h = n_h / pi_h
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pi_paires = np.where(n_h > 1, pi_h * (n_h - 1) / (N_h - 1), 0.0)
+        return cls(pik, "plan", (codes, n_h, pi_h, pi_paires))
+
+    def variance_HT(self, y, method=1, taille_bloc=None, n_jobs=1):
+        """
+        Variance de Horvitz-Thompson (method 1 : produits croisés ; 2 : Sen-Yates-Grundy),
+        en temps proportionnel au nombre de paires dépendantes représentées.
+        """
+        y = np.asarray(y, dtype=float)
+        pik = self.pik
+
+        if self.representation == "dense":
+            return _variance_HT_dense(self._donnees, y, pik, method, taille_bloc, n_jobs)
+
+        if self.representation == "blocs":
+            # Paires de groupes différents indépendantes : somme des variances des blocs
+            return float(sum(_variance_HT_dense(bloc, y[positions], pik[positions], method, taille_bloc, n_jobs)
+                             for positions, bloc in self._donnees))
+
+        # Termes diagonaux (méthode 1) : Σ y_i² (1 - π_i) / π_i²
+        variance = np.sum(y ** 2 * (1 - pik) / pik ** 2) if method == 1 else 0.0
+
+        if self.representation == "creuse":
+            lignes, colonnes, pikl = self._donnees
+            produit = pik[lignes] * pik[colonnes]
+            if method == 1:
+                termes = np.divide(y[lignes] * y[colonnes] * (pikl - produit), produit * pikl,
+                                   out=np.zeros_like(pikl), where=pikl != 0)
+            else:
+                y_ratio = y / pik
+                termes = np.divide((y_ratio[lignes] - y_ratio[colonnes]) ** 2 * (produit - pikl), pikl,
+                                   out=np.zeros_like(pikl), where=(lignes < colonnes) & (pikl != 0))
+            return float(variance + termes.sum())
+
+        if self._donnees is None:
+            return float(variance)  # Poisson : aucune paire dépendante
+
+        # SAS par strate : π_i et π_ij constants dans la strate, sommes sur les paires en O(n)
+        codes, n_h, pi_h, pi_paires = self._donnees
+        H = len(n_h)
+        actives = pi_paires > 0
+        if method == 1:
+            somme_y = np.bincount(codes, weights=y, minlength=H)
+            somme_y2 = np.bincount(codes, weights=y ** 2, minlength=H)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                facteurs = (pi_paires - pi_h ** 2) / (pi_h ** 2 * pi_paires)
+            # Σ_{i≠j} y_i y_j = (Σ y)² - Σ y²
+            variance += np.sum(np.where(actives, facteurs * (somme_y ** 2 - somme_y2), 0.0))
+        else:
+            a = y / pik
+            somme_a = np.bincount(codes, weights=a, minlength=H)
+            somme_a2 = np.bincount(codes, weights=a ** 2, minlength=H)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                facteurs = (pi_h ** 2 - pi_paires) / pi_paires
+            # Σ_{i<j} (a_i - a_j)² = n Σ a² - (Σ a)²
+            variance += np.sum(np.where(actives, facteurs * (n_h * somme_a2 - somme_a ** 2), 0.0))
+        return float(variance)
+
+    def en_dense(self):
+        """
+        Matrice n x n des π_ij (pour de petits échantillons, ou pour vérification).
+        """
+        pik = self.pik
+        if self.representation == "dense":
+            return np.array(self._donnees, dtype=float)
+        matrice = np.outer(pik, pik)
+        if self.representation == "creuse":
+            lignes, colonnes, pikl = self._donnees
+            matrice[lignes, colonnes] = pikl
+        elif self.representation == "blocs":
+            for positions, bloc in self._donnees:
+                matrice[np.ix_(positions, positions)] = bloc
+        elif self._donnees is not None:
+            codes, _, _, pi_paires = self._donnees
+            memes = codes[:, None] == codes[None, :]
+            matrice = np.where(memes, pi_paires[codes][:, None], matrice)
+        np.fill_diagonal(matrice, pik)
+        return matrice
+
+
+def estimateur_HT_IC_exact(y, pikl, method=1, alpha=0.05, taille_bloc=None, n_jobs=1):
     """
     Calcule l'estimateur de Horvitz-Thompson (HT) du total d'une variable, 
     sa variance exacte basée sur les probabilités d'inclusion doubles (π_ij),
     et un intervalle de confiance asymptotique.
 
+    La matrice pikl est parcourue par blocs de lignes : la mémoire supplémentaire reste en
+    O(taille_bloc x n), et pikl peut être un np.memmap (ou le chemin d'un fichier .npy, ouvert
+    en lecture mappée) sans jamais être chargée entièrement. Une JointInclusion structurée
+    (creuse, diagonale par blocs ou implicite selon le plan) est traitée sans matrice n x n.
+
     Paramètres
     ----------
     y : array-like
         Valeurs observées de la variable d’intérêt (ex. : revenus, tailles, etc.) pour les unités de l'échantillon.
-    pikl : 2D array-like (matrice carrée)
+    pikl : 2D array-like (matrice carrée), np.memmap, chemin d'un fichier .npy ou JointInclusion
         Matrice des probabilités d’inclusion doubles π_ij. Les éléments diagonaux doivent être les π_i.
     method : int, optionnel
         Méthode pour le calcul de la variance :
         - 1 : méthode classique (produits croisés)
-        - 2 : méthode par différences pondérées
+        - 2 : méthode par différences pondérées (Sen-Yates-Grundy, pikl supposée symétrique :
+          seul le triangle supérieur est lu)
     alpha : float, optionnel
         Niveau de risque pour l’intervalle de confiance (par défaut 0.05 pour un IC à 95%).
+    taille_bloc : int, optionnel
+        Nombre de lignes de pikl traitées à la fois (par défaut, environ ELEMENTS_PAR_BLOC_HT
+        éléments par bloc).
+    n_jobs : int ou None, optionnel
+        Nombre de threads traitant les blocs (1 par défaut ; None : tous les cœurs).
+        Le résultat ne dépend pas du nombre de threads.
 
     Retourne
     --------
@@ -184,73 +426,34 @@ def estimateur_HT_IC_exact(y, pikl, method=1, alpha=0.05):
 
     # Conversion en tableaux numpy
     y = np.asarray(y, dtype=float)
-    pikl = np.asarray(pikl, dtype=float)
 
-    # Vérification de la présence de valeurs manquantes
+    # Vérification de la présence de valeurs manquantes (celles de pikl sont vérifiées bloc par bloc)
     if np.any(np.isnan(y)):
         raise ValueError("Il y a des valeurs manquantes dans y.")
-    if np.any(np.isnan(pikl)):
-        raise ValueError("Il y a des valeurs manquantes dans pikl.")
-
-    # Vérifie que pikl est une matrice carrée
-    if pikl.ndim != 2 or pikl.shape[0] != pikl.shape[1]:
-        raise ValueError("pikl doit être une matrice carrée.")
-
-    # Vérifie que la taille de y correspond à la taille de pikl
-    if len(y) != pikl.shape[0]:
-        raise ValueError("La taille de y ne correspond pas à celle de pikl.")
 
     # Vérifie que la méthode est bien 1 ou 2
     if method not in [1, 2]:
         raise ValueError("La méthode doit être 1 ou 2.")
 
-    # Récupération des probabilités d'inclusion simples π_i (diagonale de pikl)
-    pik = np.diag(pikl)
+    # Représentation des π_ij : une matrice (dense ou mappée) est enveloppée sans copie
+    inclusion = pikl if isinstance(pikl, JointInclusion) else JointInclusion.dense(pikl)
+
+    # Vérifie que la taille de y correspond à la taille de pikl
+    if len(y) != len(inclusion):
+        raise ValueError("La taille de y ne correspond pas à celle de pikl.")
+
+    # Probabilités d'inclusion simples π_i (diagonale de pikl)
+    pik = inclusion.pik
 
     # Vérifie qu'aucune des π_i n'est nulle (évite division par zéro)
     if np.any(pik == 0):
         raise ValueError("Certaines probabilités d'inclusion π_i sont nulles.")
 
-    # Produit extérieur des probabilités simples π_i * π_j
-    pik1 = np.outer(pik, pik)
-
-    # Calcul de la matrice delta = π_ij - π_i * π_j
-    delta = pikl - pik1
-
-    # Remplace les diagonales de delta par π_i * (1 - π_i), pour la variance individuelle
-    np.fill_diagonal(delta, pik * (1 - pik))
-
     # Calcul de l'estimateur Horvitz-Thompson : somme des y_i / π_i
     HT = np.sum(y / pik)
 
-    # === Méthode 1 : produits croisés ===
-    if method == 1:
-        # Produit extérieur des valeurs y_i * y_j
-        y1 = np.outer(y, y)
-
-        # Dénominateur : π_i * π_j * π_ij
-        denom = pik1 * pikl
-
-        # Remplace les zéros du dénominateur par NaN pour éviter les divisions invalides
-        denom[denom == 0] = np.nan
-
-        # Calcul de la variance avec les pondérations exactes
-        variance = np.nansum(y1 * delta / denom)
-
-    # === Méthode 2 : différences pondérées ===
-    else:
-        # Calcul de y_i / π_i pour toutes les unités
-        y_ratio = y / pik
-
-        # Différences au carré entre chaque paire (i, j)
-        y_diff = np.subtract.outer(y_ratio, y_ratio) ** 2
-
-        # Dénominateur : π_ij
-        denom = pikl.copy()
-        denom[denom == 0] = np.nan  # Évite les divisions par zéro
-
-        # Calcul de la variance basée sur les différences
-        variance = 0.5 * np.nansum(y_diff * (pik1 - pikl) / denom)
+    # Variance, calculée selon la structure des π_ij
+    variance = inclusion.variance_HT(y, method=method, taille_bloc=taille_bloc, n_jobs=n_jobs)
 
     # Si la variance est invalide (NaN ou négative), on évite les erreurs
     if np.isnan(variance) or variance < 0:
@@ -278,12 +481,344 @@ def estimateur_HT_IC_exact(y, pikl, method=1, alpha=0.05):
     }
 
 
+#####################################################################################
+### Estimateur du total et variance en forme fermée, selon le plan (sans matrice) ###
+#####################################################################################
+
+
+# Plans dont la variance est connue en forme fermée (calcul en O(n), sans matrice π_ij)
+PLANS_VARIANCE = {"sas", "sas_stratifie", "poisson", "bernoulli", "pps_avec_remise"}
+
+
+def estimateur_HT_plan(y, pik, plan, strates=None, p_tirage=None, alpha=0.05):
+    """
+    Calcule l'estimateur du total et sa variance estimée pour un plan connu, en forme fermée :
+    temps et mémoire en O(n), sans construire la matrice n x n des π_ij.
+
+    Paramètres
+    ----------
+    y : array-like
+        Valeurs observées de la variable d’intérêt pour les unités de l'échantillon
+        (une ligne par tirage pour un plan avec remise).
+    pik : array-like
+        Probabilités d’inclusion π_i des unités de l'échantillon.
+    plan : str
+        Plan de sondage :
+        - "sas" : sondage aléatoire simple sans remise, π = n/N
+          (stratifié si strates est fourni) ;
+        - "sas_stratifie" : SAS sans remise indépendant dans chaque strate (strates requis) ;
+        - "poisson" ou "bernoulli" : sélections indépendantes, π_ij = π_i π_j ;
+        - "pps_avec_remise" : tirage avec remise à probabilités p_i (Hansen-Hurwitz),
+          éventuellement stratifié.
+    strates : array-like, optionnel
+        Strate de chaque unité de l'échantillon.
+    p_tirage : array-like, optionnel
+        Probabilités de tirage p_i à chaque tirage (plan avec remise). À défaut, elles sont
+        déduites de π_i = 1 - (1 - p_i)^m, m étant le nombre de tirages de la strate.
+    alpha : float, optionnel
+        Niveau de risque pour l’intervalle de confiance (par défaut 0.05 pour un IC à 95%).
+
+    Retourne
+    --------
+    dict
+        Mêmes clés que estimateur_HT_IC_exact : "HT", "variance", "erreur_standard",
+        "IC_borne_inf", "IC_borne_sup".
+
+    Exceptions
+    ----------
+    ValueError :
+        - Si le plan est inconnu, ou si "sas_stratifie" est demandé sans strates.
+        - Si y, pik (ou strates, p_tirage) n'ont pas la même taille.
+        - S'il y a des valeurs manquantes ou des π_i nuls.
+
+    Notes
+    -----
+    - SAS (par strate) : V = Σ_h N_h² (1 - n_h/N_h) s²_h / n_h, avec N_h = n_h / π_h.
+    - Poisson : V = Σ_i (1 - π_i) y_i² / π_i².
+    - Avec remise : z_i = y_i / (m_h p_i), T_h = Σ z_i, V = Σ_h m_h/(m_h - 1) Σ_i (z_i - T_h/m_h)².
+    Une strate d'une seule unité contribue 0 à la variance.
+    """
+
+    # Conversion en tableaux numpy et vérifications
+    y = np.asarray(y, dtype=float)
+    pik = np.asarray(pik, dtype=float)
+
+    if plan not in PLANS_VARIANCE:
+        raise ValueError(f"Plan inconnu : {plan}. Plans disponibles : {sorted(PLANS_VARIANCE)}.")
+    if plan == "sas_stratifie" and strates is None:
+        raise ValueError("Le plan 'sas_stratifie' nécessite les strates.")
+    if len(y) != len(pik):
+        raise ValueError("Les vecteurs y et pik doivent être de même taille.")
+    if np.any(np.isnan(y)):
+        raise ValueError("Il y a des valeurs manquantes dans y.")
+    if np.any(np.isnan(pik)):
+        raise ValueError("Il y a des valeurs manquantes dans pik.")
+    if np.any(pik <= 0):
+        raise ValueError("Certaines probabilités d'inclusion π_i sont nulles.")
+
+    # Codes des strates (une seule strate par défaut)
+    if strates is None:
+        codes = np.zeros(len(y), dtype=np.int64)
+    else:
+        if len(strates) != len(y):
+            raise ValueError("Les strates doivent être de même taille que y.")
+        codes, _ = pd.factorize(np.asarray(strates))
+        if np.any(codes < 0):
+            raise ValueError("Il y a des valeurs manquantes dans les strates.")
+    H = codes.max() + 1 if len(codes) else 0
+    n_h = np.bincount(codes, minlength=H).astype(float)
+
+    if plan in ("poisson", "bernoulli"):
+        # Sélections indépendantes : seuls les termes diagonaux subsistent
+        HT = np.sum(y / pik)
+        variance = np.sum((1 - pik) * y ** 2 / pik ** 2)
+
+    elif plan == "pps_avec_remise":
+        # Hansen-Hurwitz : chaque tirage donne une estimation y_i / p_i du total de la strate
+        m = n_h[codes]
+        if p_tirage is None:
+            p = 1 - (1 - np.minimum(pik, 1)) ** (1 / m)
+        else:
+            p = np.asarray(p_tirage, dtype=float)
+            if len(p) != len(y):
+                raise ValueError("p_tirage doit être de même taille que y.")
+        z = y / (m * p)
+        T_h = np.bincount(codes, weights=z, minlength=H)
+        ecarts2 = np.bincount(codes, weights=(z - T_h[codes] / m) ** 2, minlength=H)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            V_h = np.where(n_h > 1, n_h / (n_h - 1) * ecarts2, 0.0)
+        HT = T_h.sum()
+        variance = V_h.sum()
+
+    else:
+        # SAS sans remise dans chaque strate : π_h constant, N_h = n_h / π_h
+        pi_h = np.bincount(codes, weights=pik, minlength=H) / n_h
+        N_h = n_h / pi_h
+        moyennes = np.bincount(codes, weights=y, minlength=H) / n_h
+        ecarts2 = np.bincount(codes, weights=(y - moyennes[codes]) ** 2, minlength=H)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s2_h = np.where(n_h > 1, ecarts2 / (n_h - 1), 0.0)
+        HT = np.sum(y / pik)
+        variance = np.sum(N_h ** 2 * (1 - np.minimum(pi_h, 1)) * s2_h / n_h)
+
+    # Écart-type et intervalle de confiance
+    erreur_standard = np.sqrt(variance)
+    z_alpha = stats.norm.ppf(1 - alpha / 2)
+
+    return {
+        "HT": HT,
+        "variance": variance,
+        "erreur_standard": erreur_standard,
+        "IC_borne_inf": HT - z_alpha * erreur_standard,
+        "IC_borne_sup": HT + z_alpha * erreur_standard
+    }
+
+
+#################################################################################
+### Variances approchées pour les plans πps de taille fixe (sans les π_ij) ###
+#################################################################################
+
+
+# Approximations disponibles (toutes en O(n), sans probabilités d'inclusion doubles)
+VARIANCES_APPROCHEES = {"hajek", "deville", "brewer1", "brewer2", "brewer3", "brewer4", "differences_successives"}
+
+
+def estimateur_HT_approche(y, pik, methode="hajek", ordre=None, alpha=0.05):
+    """
+    Calcule l'estimateur de Horvitz-Thompson du total et une variance approchée, pour un plan
+    à probabilités inégales de taille fixe dont les π_ij sont inconnues (systématique, Sunter...).
+    Le calcul se fait en quelques passes vectorielles sur l'échantillon.
+
+    Paramètres
+    ----------
+    y : array-like
+        Valeurs observées de la variable d’intérêt pour les unités de l'échantillon.
+    pik : array-like
+        Probabilités d’inclusion π_i des unités de l'échantillon.
+    methode : str, optionnel
+        Approximation de la variance :
+        - "hajek" : Hájek, c_i = n (1 - π_i) / (n - 1) ;
+        - "deville" : Deville, c_i = (1 - π_i) / (1 - Σ a_k²), a_k = (1 - π_k) / Σ (1 - π_l) ;
+        - "brewer1" à "brewer4" : famille de Brewer (Brewer et Donadio), coefficients c_i
+          fonction de π_i et de Σ_s π_k ;
+        - "differences_successives" : différences successives, pour le tirage systématique
+          (les unités doivent être dans l'ordre de la base triée, voir ordre).
+    ordre : array-like, optionnel
+        Rang de chaque unité dans la base (par exemple sa position) : l'échantillon est trié
+        selon ce rang avant les différences successives. Par défaut, l'ordre fourni est conservé.
+    alpha : float, optionnel
+        Niveau de risque pour l’intervalle de confiance (par défaut 0.05 pour un IC à 95%).
+
+    Retourne
+    --------
+    dict
+        Mêmes clés que estimateur_HT_IC_exact : "HT", "variance", "erreur_standard",
+        "IC_borne_inf", "IC_borne_sup".
+
+    Exceptions
+    ----------
+    ValueError :
+        - Si la méthode est inconnue.
+        - Si y et pik n'ont pas la même taille, ou si l'échantillon compte moins de 2 unités.
+        - S'il y a des valeurs manquantes ou des π_i nuls.
+
+    Notes
+    -----
+    Hájek et Deville : V = Σ_i c_i (y_i/π_i - ŷ*_i)², avec ŷ*_i = π_i Σ_k c_k y_k/π_k / Σ_k c_k.
+    Brewer : V = Σ_i (1/c_i - π_i) (y_i/π_i - Ŷ/n)², avec c_i = (n - 1)/(n - π_i) (brewer1),
+    (n - 1)/(n - Σπ_k/n) (brewer2), (n - 1)/(n - 2π_i + Σπ_k/n) (brewer3),
+    (n - 1)/(n - (2n - 1)π_i/(n - 1) + Σπ_k/(n - 1)) (brewer4), où Σπ_k estime Σ_U π_k².
+    Différences successives : V = n / (2(n - 1)) Σ_{k≥2} (y_k/π_k - y_{k-1}/π_{k-1})².
+    """
+
+    # Conversion en tableaux numpy et vérifications
+    y = np.asarray(y, dtype=float)
+    pik = np.asarray(pik, dtype=float)
+
+    if methode not in VARIANCES_APPROCHEES:
+        raise ValueError(f"Méthode inconnue : {methode}. Méthodes disponibles : {sorted(VARIANCES_APPROCHEES)}.")
+    if len(y) != len(pik):
+        raise ValueError("Les vecteurs y et pik doivent être de même taille.")
+    if np.any(np.isnan(y)):
+        raise ValueError("Il y a des valeurs manquantes dans y.")
+    if np.any(np.isnan(pik)):
+        raise ValueError("Il y a des valeurs manquantes dans pik.")
+    if np.any(pik <= 0):
+        raise ValueError("Certaines probabilités d'inclusion π_i sont nulles.")
+
+    n = len(y)
+    if n < 2:
+        raise ValueError("Au moins deux unités sont nécessaires pour estimer la variance.")
+
+    y_ratio = y / pik
+    HT = np.sum(y_ratio)
+
+    if methode in ("hajek", "deville"):
+        if methode == "hajek":
+            c = n * (1 - pik) / (n - 1)
+        else:
+            a = (1 - pik) / np.sum(1 - pik)
+            c = (1 - pik) / (1 - np.sum(a ** 2))
+        # Prédiction de y_i/π_i par la moyenne pondérée par les c_k
+        if np.sum(c) > 0:
+            variance = np.sum(c * (y_ratio - np.sum(c * y_ratio) / np.sum(c)) ** 2)
+        else:
+            variance = 0.0  # Toutes les unités sont certaines (π_i = 1)
+
+    elif methode.startswith("brewer"):
+        somme_pi = np.sum(pik)  # Estimateur HT de Σ_U π_k² (Σ_s π_k² / π_k)
+        if methode == "brewer1":
+            c = (n - 1) / (n - pik)
+        elif methode == "brewer2":
+            c = np.full(n, (n - 1) / (n - somme_pi / n))
+        elif methode == "brewer3":
+            c = (n - 1) / (n - 2 * pik + somme_pi / n)
+        else:
+            c = (n - 1) / (n - (2 * n - 1) * pik / (n - 1) + somme_pi / (n - 1))
+        variance = np.sum((1 / c - pik) * (y_ratio - HT / n) ** 2)
+
+    else:
+        # Différences successives, dans l'ordre de la base
+        if ordre is not None:
+            y_ratio = y_ratio[np.argsort(np.asarray(ordre), kind="stable")]
+        variance = n / (2 * (n - 1)) * np.sum(np.diff(y_ratio) ** 2)
+
+    # Écart-type et intervalle de confiance
+    erreur_standard = np.sqrt(variance)
+    z = stats.norm.ppf(1 - alpha / 2)
+
+    return {
+        "HT": HT,
+        "variance": variance,
+        "erreur_standard": erreur_standard,
+        "IC_borne_inf": HT - z * erreur_standard,
+        "IC_borne_sup": HT + z * erreur_standard
+    }
+
+
+##################################################################
+### Fonction pour le calcul de l'estimateur stratifié (SAS/h) ###
+##################################################################
+
+
+def estimateur_stratifie(statistiques_echantillon, effectifs_population, alpha=0.05):
+    """
+    Estimateur stratifié de la moyenne et du total sous un SAS sans remise dans chaque strate,
+    calculé à partir des seules statistiques par strate (aucune matrice n x n).
+
+    Paramètres
+    ----------
+    statistiques_echantillon : pd.DataFrame
+        Statistiques de l'échantillon par strate (base_de_sondage.statistiques_groupes),
+        avec au moins les colonnes n_y, moyenne et variance, indexées par strate.
+    effectifs_population : pd.Series
+        Effectifs N_h de la population, indexés par strate (par exemple la colonne N_h de
+        base_de_sondage.statistiques_strates).
+    alpha : float, optionnel
+        Niveau de signification pour l'intervalle de confiance (par défaut 0.05).
+
+    Retourne
+    --------
+    pd.DataFrame
+        Deux lignes ("Stratifié (moyenne)", "Stratifié (total)") au format de tableau_resultats :
+        Estimateur, Estimation, Erreur standard, IC min, IC max.
+
+    Exceptions
+    ----------
+    ValueError :
+        - Si une strate de la population n'a aucune observation dans l'échantillon.
+
+    Notes
+    -----
+    Total : T = Σ_h N_h ȳ_h, de variance estimée Σ_h N_h² (1 - n_h/N_h) s²_h / n_h.
+    La moyenne est T / N. Une strate d'une seule observation (s²_h indéfini) contribue 0
+    à la variance.
+    """
+    N_h = pd.Series(effectifs_population, dtype=float)
+    stats_h = statistiques_echantillon.reindex(N_h.index)
+    n_h = stats_h["n_y"].fillna(0).to_numpy(dtype=float)
+
+    if np.any(n_h == 0):
+        manquantes = list(N_h.index[n_h == 0])
+        raise ValueError(f"Aucune observation dans l'échantillon pour les strates : {manquantes}")
+
+    N_h = N_h.to_numpy()
+    N = N_h.sum()
+    moyennes = stats_h["moyenne"].to_numpy(dtype=float)
+    s2 = np.nan_to_num(stats_h["variance"].to_numpy(dtype=float))
+
+    # Estimation du total et de sa variance, strate par strate
+    total = np.dot(N_h, moyennes)
+    variance_total = np.sum(N_h ** 2 * (1 - n_h / N_h) * s2 / n_h)
+    et_total = np.sqrt(variance_total)
+    moyenne, et_moyenne = total / N, et_total / N
+
+    z = stats.norm.ppf(1 - alpha / 2)
+    df = pd.DataFrame({
+        "Estimateur": ["Stratifié (moyenne)", "Stratifié (total)"],
+        "Estimation": [moyenne, total],
+        "Erreur standard": [et_moyenne, et_total],
+        "IC min": [moyenne - z * et_moyenne, total - z * et_total],
+        "IC max": [moyenne + z * et_moyenne, total + z * et_total]
+    })
+    return df.round(3)
+
+
 ###################################
 #### FONCTION POUR RECAPITULER ####
 ###################################
 
 
-def tableau_resultats(y, pik, pikl, N, alpha=0.05):
+def tableau_resultats(y, pik, pikl=None, N=None, alpha=0.05, plan=None, strates=None, variance=None, ordre=None,
+                      p_tirage=None):
+    # Si le plan est connu (plan = "sas", "sas_stratifie", "poisson", "bernoulli", "pps_avec_remise"),
+    # la variance HT est calculée en forme fermée, en O(n) : pikl n'est alors pas nécessaire.
+    # Pour "pps_avec_remise", p_tirage donne les probabilités de tirage p_i (sinon déduites de π_i)
+    # Pour un plan πps de taille fixe sans π_ij, variance désigne une approximation
+    # ("hajek", "deville", "brewer1" à "brewer4", "differences_successives")
+    if plan is None and pikl is None and variance is None:
+        raise ValueError("Indiquez la matrice pikl, le plan de sondage ou une variance approchée.")
+
     # Calcul de la moyenne empirique, intervalle de confiance et total empirique
     moyenne, ic_m, total, ic_t = calculer_moyenne_et_ic(y, N, alpha)
     
@@ -292,7 +827,12 @@ def tableau_resultats(y, pik, pikl, N, alpha=0.05):
     hajek_total = estimateur_Hajek(y, pik, N, "total", alpha)      # Estimation du total avec Hajek
     
     # Estimation de l'Horvitz-Thompson
-    ht = estimateur_HT_IC_exact(y, pikl, method=1, alpha=alpha)
+    if variance is not None:
+        ht = estimateur_HT_approche(y, pik, variance, ordre=ordre, alpha=alpha)
+    elif plan is not None:
+        ht = estimateur_HT_plan(y, pik, plan, strates=strates, p_tirage=p_tirage, alpha=alpha)
+    else:
+        ht = estimateur_HT_IC_exact(y, pikl, method=1, alpha=alpha)
 
     # Construction du dataframe avec tous les résultats
     df = pd.DataFrame({
@@ -315,23 +855,193 @@ def tableau_resultats(y, pik, pikl, N, alpha=0.05):
             "-", 
             hajek_moyenne["erreur_standard"], 
             hajek_total["erreur_standard"], 
-            "-"
+            ht["erreur_standard"]
         ],
         "IC min": [
             ic_m[0], 
             ic_t[0], 
             hajek_moyenne["borne_inferieure_IC"], 
             hajek_total["borne_inferieure_IC"], 
-            "-"
+            ht["IC_borne_inf"]
         ],
         "IC max": [
             ic_m[1], 
             ic_t[1], 
             hajek_moyenne["borne_superieure_IC"], 
             hajek_total["borne_superieure_IC"], 
-            "-"
+            ht["IC_borne_sup"]
         ]
     })
 
     # Retourner le tableau avec les résultats arrondis à trois chiffres
     return df.round(3)
+
+
+##########################################################################
+### Estimation de plusieurs variables sur plusieurs domaines à la fois ###
+##########################################################################
+
+
+def _sommes_par_groupe(codes, G, X):
+    # Sommes des lignes de X par groupe, en un produit (matrice indicatrice creuse G x n) @ X
+    indicatrice = sparse.csr_matrix((np.ones(len(codes)), (codes, np.arange(len(codes)))), shape=(G, len(codes)))
+    return np.asarray(indicatrice @ X)
+
+
+def _variances_domaines(X, pik, domaines, D, plan, strates, H):
+    """
+    Variance (forme fermée du plan) de l'estimateur HT du total de chaque colonne de X restreinte
+    à chaque domaine : tableau D x k. Pour les plans stratifiés, les sommes sont faites par
+    (domaine, strate), les unités de la strate hors du domaine comptant pour 0.
+    """
+    if plan in ("poisson", "bernoulli"):
+        return _sommes_par_groupe(domaines, D, ((1 - pik) / pik ** 2)[:, None] * X ** 2)
+
+    n_h = np.bincount(strates, minlength=H).astype(float)
+    if plan == "pps_avec_remise":
+        # Hansen-Hurwitz : z_i = x_i / (m_h p_i), p_i déduit de π_i = 1 - (1 - p_i)^m_h
+        m = n_h[strates]
+        p = 1 - (1 - np.minimum(pik, 1)) ** (1 / m)
+        X = X / (m * p)[:, None]
+        facteurs = np.where(n_h > 1, n_h / np.maximum(n_h - 1, 1), 0.0)
+    else:
+        # SAS par strate : N_h² (1 - f_h) / (n_h (n_h - 1)) devant la somme des carrés des écarts
+        pi_h = np.bincount(strates, weights=pik, minlength=H) / n_h
+        N_h = n_h / pi_h
+        facteurs = np.where(n_h > 1, N_h ** 2 * (1 - np.minimum(pi_h, 1)) / (n_h * np.maximum(n_h - 1, 1)), 0.0)
+
+    # Somme des carrés des écarts à la moyenne de la strate, en deux passes (exacte) :
+    # Σ_{i∈d}(x_i - μ)² + (n_h - n_hd) μ², avec μ = Σ_{i∈d} x_i / n_h
+    groupes = domaines * H + strates
+    G = D * H
+    sommes = _sommes_par_groupe(groupes, G, X)
+    effectifs = np.bincount(groupes, minlength=G).astype(float)
+    n_groupe = np.tile(n_h, D)
+    moyennes = sommes / n_groupe[:, None]
+    carres = _sommes_par_groupe(groupes, G, (X - moyennes[groupes]) ** 2)
+    carres += (n_groupe - effectifs)[:, None] * moyennes ** 2
+    return (carres * np.tile(facteurs, D)[:, None]).reshape(D, H, -1).sum(axis=1)
+
+
+def tableau_resultats_domaines(Y, pik, domaines=None, plan="poisson", strates=None, alpha=0.05):
+    """
+    Estime, pour chaque variable et chaque domaine, le total de Horvitz-Thompson et la moyenne de
+    Hájek avec leurs variances, en une seule passe groupée : les poids 1/π_i, le quantile normal et
+    les sommes par domaine sont calculés une fois pour toutes les variables.
+
+    Paramètres
+    ----------
+    Y : array-like (n x k) ou pd.DataFrame
+        Variables d'intérêt, une colonne par variable (sans valeurs manquantes).
+    pik : array-like
+        Probabilités d’inclusion π_i.
+    domaines : array-like, optionnel
+        Domaine de chaque unité (un seul domaine, "Ensemble", par défaut).
+    plan : str, optionnel
+        Plan pour les variances en forme fermée, comme estimateur_HT_plan : "sas", "sas_stratifie",
+        "poisson" (par défaut), "bernoulli" ou "pps_avec_remise" (une ligne par tirage).
+    strates : array-like, optionnel
+        Strate de chaque unité (plans "sas", "sas_stratifie" et "pps_avec_remise").
+    alpha : float, optionnel
+        Niveau de risque pour l’intervalle de confiance (par défaut 0.05 pour un IC à 95%).
+
+    Retourne
+    --------
+    pd.DataFrame
+        Table longue, une ligne par (variable, domaine, estimateur) : Variable, Domaine, n
+        (unités de l'échantillon dans le domaine), Estimateur ("Horvitz-Thompson (total)",
+        "Hajek (moyenne)"), Estimation, Erreur standard, IC min, IC max.
+
+    Exceptions
+    ----------
+    ValueError :
+        - Si le plan est inconnu, ou si "sas_stratifie" est demandé sans strates.
+        - Si Y, pik, domaines ou strates n'ont pas le même nombre de lignes.
+        - S'il y a des valeurs manquantes ou des π_i nuls.
+
+    Notes
+    -----
+    La variance du total d'un domaine est celle du total de y_i 1(i ∈ d). La moyenne de Hájek
+    ŷ_d = Σ_d y_i/π_i / Σ_d 1/π_i est linéarisée : u_i = (y_i - ŷ_d) 1(i ∈ d) / N̂_d.
+    """
+
+    # Variables en colonnes
+    if isinstance(Y, pd.DataFrame):
+        noms, Y = list(Y.columns), Y.to_numpy(dtype=float)
+    else:
+        Y = np.asarray(Y, dtype=float)
+        Y = Y[:, None] if Y.ndim == 1 else Y
+        noms = [f"y{j + 1}" for j in range(Y.shape[1])] if Y.shape[1] > 1 else ["y"]
+    pik = np.asarray(pik, dtype=float)
+    n = len(pik)
+
+    # Vérifications
+    if plan not in PLANS_VARIANCE:
+        raise ValueError(f"Plan inconnu : {plan}. Plans disponibles : {sorted(PLANS_VARIANCE)}.")
+    if plan == "sas_stratifie" and strates is None:
+        raise ValueError("Le plan 'sas_stratifie' nécessite les strates.")
+    if len(Y) != n:
+        raise ValueError("Y et pik doivent avoir le même nombre de lignes.")
+    if np.any(np.isnan(Y)):
+        raise ValueError("Il y a des valeurs manquantes dans Y.")
+    if np.any(np.isnan(pik)):
+        raise ValueError("Il y a des valeurs manquantes dans pik.")
+    if np.any(pik <= 0):
+        raise ValueError("Certaines probabilités d'inclusion π_i sont nulles.")
+
+    # Codes des domaines et des strates (une seule passe de factorisation chacun)
+    if domaines is None:
+        codes_d, modalites_d = np.zeros(n, dtype=np.int64), np.array(["Ensemble"], dtype=object)
+    else:
+        if len(domaines) != n:
+            raise ValueError("Les domaines doivent être de même taille que pik.")
+        codes_d, modalites_d = pd.factorize(np.asarray(domaines), sort=True)
+        if np.any(codes_d < 0):
+            raise ValueError("Il y a des valeurs manquantes dans les domaines.")
+    if strates is None:
+        codes_h, H = np.zeros(n, dtype=np.int64), 1
+    else:
+        if len(strates) != n:
+            raise ValueError("Les strates doivent être de même taille que pik.")
+        codes_h, modalites_h = pd.factorize(np.asarray(strates))
+        if np.any(codes_h < 0):
+            raise ValueError("Il y a des valeurs manquantes dans les strates.")
+        H = len(modalites_h)
+    D, k = len(modalites_d), Y.shape[1]
+
+    # Poids calculés une fois : 1/π_i, ou 1/(m_h p_i) (Hansen-Hurwitz) pour un tirage avec remise
+    if plan == "pps_avec_remise":
+        m = np.bincount(codes_h, minlength=H)[codes_h].astype(float)
+        w = 1 / (m * (1 - (1 - np.minimum(pik, 1)) ** (1 / m)))
+    else:
+        w = 1 / pik
+
+    # Totaux HT et moyennes de Hájek de toutes les variables dans tous les domaines
+    totaux = _sommes_par_groupe(codes_d, D, Y * w[:, None])             # D x k
+    N_chapeau = np.bincount(codes_d, weights=w, minlength=D)             # D
+    moyennes = totaux / N_chapeau[:, None]
+    effectifs = np.bincount(codes_d, minlength=D)
+
+    # Variances : totaux, puis moyennes par la variable linéarisée
+    var_totaux = _variances_domaines(Y, pik, codes_d, D, plan, codes_h, H)
+    U = (Y - moyennes[codes_d]) / N_chapeau[codes_d][:, None]
+    var_moyennes = _variances_domaines(U, pik, codes_d, D, plan, codes_h, H)
+
+    # Table longue : variables x domaines, pour chacun des deux estimateurs
+    z = stats.norm.ppf(1 - alpha / 2)
+    blocs = []
+    for estimateur, valeurs, variances in (("Horvitz-Thompson (total)", totaux, var_totaux),
+                                           ("Hajek (moyenne)", moyennes, var_moyennes)):
+        estimation = valeurs.T.ravel()
+        erreur_standard = np.sqrt(np.maximum(variances, 0)).T.ravel()
+        blocs.append(pd.DataFrame({
+            "Variable": np.repeat(np.asarray(noms, dtype=object), D),
+            "Domaine": np.tile(modalites_d, k),
+            "n": np.tile(effectifs, k),
+            "Estimateur": estimateur,
+            "Estimation": estimation,
+            "Erreur standard": erreur_standard,
+            "IC min": estimation - z * erreur_standard,
+            "IC max": estimation + z * erreur_standard
+        }))
+    return pd.concat(blocs, ignore_index=True).round(3)
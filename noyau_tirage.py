@@ -0,0 +1,219 @@
+import hashlib
+import numpy as np
+import pandas as pd
+from collections import OrderedDict
+from typing import List, NamedTuple, Optional, Tuple, Union
+
+# --------------------------------------------------
+# Résultat d'un tirage sous forme de tableaux (indices positionnels)
+class ResultatTirage(NamedTuple):
+    """
+    Résultat d'un algorithme de tirage, indépendant de tout DataFrame.
+
+    Attributes:
+        indices (np.ndarray): Positions (0 à N-1) des unités tirées, dans l'ordre du tirage
+            (une position peut apparaître plusieurs fois pour un tirage avec remise).
+        pik (np.ndarray | None): Probabilités d'inclusion des unités tirées, alignées sur indices.
+        multiplicites (np.ndarray | None): Pour les tirages avec remise, nombre de fois où
+            chaque unité tirée figure dans l'échantillon, aligné sur indices.
+    """
+    indices: np.ndarray
+    pik: Optional[np.ndarray] = None
+    multiplicites: Optional[np.ndarray] = None
+
+    def __len__(self) -> int:
+        return len(self.indices)
+
+    def en_dataframe(self, df: pd.DataFrame, col_pik: Optional[str] = None,
+                     col_multiplicite: Optional[str] = None, reinitialiser_index: bool = False) -> pd.DataFrame:
+        """
+        Construit le DataFrame de l'échantillon par une seule extraction positionnelle.
+
+        Args:
+            df (pd.DataFrame): La base dans laquelle le tirage a été effectué.
+            col_pik (str, optionnel): Nom de la colonne où reporter les π_i.
+            col_multiplicite (str, optionnel): Nom de la colonne où reporter les multiplicités.
+            reinitialiser_index (bool): Si True, l'index est remplacé par 0..n-1.
+
+        Returns:
+            pd.DataFrame: Les lignes tirées.
+        """
+        echantillon = df.take(self.indices)
+        if col_pik is not None and self.pik is not None:
+            echantillon[col_pik] = self.pik
+        if col_multiplicite is not None and self.multiplicites is not None:
+            echantillon[col_multiplicite] = self.multiplicites
+        if reinitialiser_index:
+            echantillon = echantillon.reset_index(drop=True)
+        return echantillon
+
+# --------------------------------------------------
+# Multiplicités d'un tirage avec remise
+def multiplicites(indices: np.ndarray) -> np.ndarray:
+    """
+    Nombre d'occurrences de chaque position dans indices, aligné sur indices.
+    """
+    indices = np.asarray(indices)
+    if len(indices) == 0:
+        return np.empty(0, dtype=np.int64)
+    _, inverse, effectifs = np.unique(indices, return_inverse=True, return_counts=True)
+    return effectifs[inverse]
+
+# --------------------------------------------------
+# Index des groupes (strates, grappes) : codes entiers et positions triées par groupe
+class IndexGroupes(NamedTuple):
+    """
+    Représentation compacte des groupes d'une variable, construite en une seule passe.
+
+    Attributes:
+        codes (np.ndarray): Code du groupe de chaque ligne (-1 pour une valeur manquante).
+        modalites (np.ndarray): Valeur de chaque groupe, dans l'ordre d'apparition.
+        ordre (np.ndarray): Positions des lignes, regroupées par groupe (ordre d'origine conservé
+            dans chaque groupe).
+        debuts (np.ndarray): Décalages : les lignes du groupe g sont ordre[debuts[g]:debuts[g + 1]].
+    """
+    codes: np.ndarray
+    modalites: np.ndarray
+    ordre: np.ndarray
+    debuts: np.ndarray
+
+    @property
+    def effectifs(self) -> np.ndarray:
+        return np.diff(self.debuts)
+
+    def positions(self, g: int) -> np.ndarray:
+        return self.ordre[self.debuts[g]:self.debuts[g + 1]]
+
+    def lignes(self, groupes: np.ndarray, trier: bool = True) -> np.ndarray:
+        """
+        Positions de toutes les lignes des groupes donnés, rassemblées à partir des décalages :
+        coût proportionnel au nombre de lignes renvoyées, pas à la taille de la base.
+        Avec trier=True, les positions sont rendues dans l'ordre de la base.
+        """
+        groupes = np.unique(np.asarray(groupes, dtype=np.int64))
+        longueurs = self.debuts[groupes + 1] - self.debuts[groupes]
+        if longueurs.sum() == 0:
+            return np.empty(0, dtype=self.ordre.dtype)
+        # Case de chaque ligne dans ordre : début de son groupe + rang dans le groupe
+        decalages = np.repeat(self.debuts[groupes] - np.cumsum(longueurs) + longueurs, longueurs)
+        lignes = self.ordre[decalages + np.arange(longueurs.sum())]
+        return np.sort(lignes) if trier else lignes
+
+def index_groupes(valeurs, trier: bool = False) -> IndexGroupes:
+    """
+    Construit l'IndexGroupes d'un vecteur de valeurs (factorisation puis tri stable des codes).
+
+    valeurs peut aussi être une liste de vecteurs (groupes croisés de plusieurs variables) :
+    une ligne dont l'une des valeurs manque n'appartient alors à aucun groupe. Avec trier=True,
+    les groupes sont numérotés dans l'ordre croissant des modalités, comme dans DataFrame.groupby.
+    """
+    if isinstance(valeurs, list):
+        croisement = pd.MultiIndex.from_arrays(valeurs)
+        codes, modalites = pd.factorize(croisement, sort=trier)
+        manquants = np.zeros(len(croisement), dtype=bool)
+        for v in valeurs:
+            manquants |= pd.isna(v)
+        if manquants.any():
+            # Renumérote les groupes sans les combinaisons comportant une valeur manquante
+            codes = np.where(manquants, -1, codes)
+            gardes = np.unique(codes[codes >= 0])
+            renumerotation = np.full(len(modalites), -1)
+            renumerotation[gardes] = np.arange(len(gardes))
+            codes = np.where(codes >= 0, renumerotation[np.maximum(codes, 0)], -1)
+            modalites = modalites[gardes]
+        tuples = np.empty(len(modalites), dtype=object)  # tableau 1-D de tuples
+        tuples[:] = list(modalites)
+        modalites = tuples
+    else:
+        codes, modalites = pd.factorize(valeurs, sort=trier)
+        modalites = np.asarray(modalites)
+    codes = codes.astype(np.int32)
+    valides = np.flatnonzero(codes >= 0)
+    ordre = valides[np.argsort(codes[valides], kind="stable")]
+    effectifs = np.bincount(codes[valides], minlength=len(modalites))
+    debuts = np.concatenate(([0], np.cumsum(effectifs))).astype(np.int64)
+    return IndexGroupes(codes, modalites, ordre, debuts)
+
+# --------------------------------------------------
+# Empreinte d'un DataFrame, clé des caches construits une fois par base
+def empreinte_frame(df: pd.DataFrame, colonnes: Union[str, List[str], None] = None) -> str:
+    """
+    Calcule une empreinte du contenu (valeurs, index et ordre des lignes) d'un DataFrame.
+
+    Args:
+        df (pd.DataFrame): Le DataFrame à identifier.
+        colonnes (str | List[str], optionnel): Colonnes à prendre en compte (toutes par défaut).
+
+    Returns:
+        str: Empreinte hexadécimale, identique pour deux DataFrames de même contenu.
+    """
+    if colonnes is not None:
+        df = df[[colonnes] if isinstance(colonnes, str) else list(colonnes)]
+    hachages = pd.util.hash_pandas_object(df, index=True).to_numpy()
+    return hashlib.blake2b(hachages.tobytes(), digest_size=16).hexdigest()
+
+# --------------------------------------------------
+# Cache LRU des index de groupes, indexé par (empreinte de la base, colonnes, tri)
+TAILLE_MAX_CACHE_GROUPES = 32
+_cache_groupes: "OrderedDict[Tuple[str, Tuple[str, ...], bool], IndexGroupes]" = OrderedDict()
+
+def index_groupes_frame(df: pd.DataFrame, colonnes: Union[str, List[str]], empreinte: Optional[str] = None,
+                        trier: bool = True) -> IndexGroupes:
+    """
+    Renvoie l'IndexGroupes d'une ou plusieurs colonnes de df, construit une seule fois par base.
+
+    Args:
+        df (pd.DataFrame): La base.
+        colonnes (str | List[str]): Variable(s) définissant les groupes (grappes, strates).
+        empreinte (str, optionnel): Empreinte de toute la base (empreinte_frame), calculée une fois
+            au chargement. À défaut, l'empreinte des seules colonnes concernées est calculée.
+        trier (bool): Numérotation des groupes dans l'ordre trié des modalités.
+
+    Returns:
+        IndexGroupes: Codes, modalités, permutation triée par groupe et décalages.
+    """
+    colonnes = (colonnes,) if isinstance(colonnes, str) else tuple(colonnes)
+    cle = (empreinte if empreinte is not None else empreinte_frame(df, list(colonnes)), colonnes, trier)
+
+    if cle in _cache_groupes:
+        _cache_groupes.move_to_end(cle)
+        return _cache_groupes[cle]
+
+    valeurs = [df[c].to_numpy() for c in colonnes]
+    groupes = index_groupes(valeurs if len(valeurs) > 1 else valeurs[0], trier=trier)
+    _cache_groupes[cle] = groupes
+    if len(_cache_groupes) > TAILLE_MAX_CACHE_GROUPES:
+        _cache_groupes.popitem(last=False)  # Retire l'index le moins récemment utilisé
+    return groupes
+
+def vider_cache_groupes() -> None:
+    """
+    Vide le cache des index de groupes.
+    """
+    _cache_groupes.clear()
+
+# --------------------------------------------------
+# Générateurs aléatoires explicites (aucun état global)
+# Tout tirage accepte un entier, une SeedSequence, un Generator ou None (entropie du système)
+EtatAleatoire = Union[int, np.random.SeedSequence, np.random.Generator, None]
+
+def generateur(random_state: EtatAleatoire = None) -> np.random.Generator:
+    """
+    Renvoie un np.random.Generator à partir d'un entier, d'une SeedSequence, d'un Generator
+    (renvoyé tel quel) ou de None (entropie du système).
+    """
+    if isinstance(random_state, np.random.Generator):
+        return random_state
+    return np.random.default_rng(random_state)
+
+def graines_independantes(random_state: EtatAleatoire, k: int) -> list:
+    """
+    Renvoie k SeedSequence indépendantes (SeedSequence.spawn), dérivées de random_state.
+    Le résultat ne dépend que de random_state et de k : chaque flux peut être consommé
+    dans n'importe quel ordre, par n'importe quel processus.
+    """
+    if isinstance(random_state, np.random.Generator):
+        return random_state.bit_generator.seed_seq.spawn(k)
+    if isinstance(random_state, np.random.SeedSequence):
+        return random_state.spawn(k)
+    return np.random.SeedSequence(random_state).spawn(k)
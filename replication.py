@@ -0,0 +1,320 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from scipy import stats
+from noyau_tirage import index_groupes, graines_independantes
+
+###########################################################################
+### Variance par réplications : bootstrap de Rao-Wu, jackknife et BRR ###
+###########################################################################
+
+# Méthodes de réplication disponibles
+METHODES_REPLICATION = {"bootstrap", "jackknife", "brr"}
+
+# Nombre d'éléments (UP x réplications) des facteurs construits à la fois (float32 : 64 Mo)
+ELEMENTS_PAR_BLOC_REPLICATION = 1 << 24
+
+# En dessous de ce nombre d'éléments (UP x réplications), le calcul séquentiel est plus rapide
+SEUIL_REPLICATION_PARALLELE = 1 << 26
+
+
+def _structure_replication(n, strates=None, psu=None):
+    """
+    Structure des unités primaires (UP) : UP de chaque unité, strate de chaque UP, et UP
+    regroupées par strate (IndexGroupes). Sans psu, chaque unité est sa propre UP ; sans
+    strates, l'échantillon forme une seule strate.
+    """
+    strates = np.zeros(n, dtype=np.int64) if strates is None else np.asarray(strates)
+    psu = np.arange(n) if psu is None else np.asarray(psu)
+    if len(strates) != n or len(psu) != n:
+        raise ValueError("Les strates et les UP doivent être de même taille que les poids.")
+
+    # Une UP est identifiée par le couple (strate, UP) : des UP de même nom dans deux strates sont distinctes
+    unites = index_groupes([strates, psu])
+    if np.any(unites.codes < 0):
+        raise ValueError("Il y a des valeurs manquantes dans les strates ou les UP.")
+    strate_up = np.empty(len(unites.modalites), dtype=object)
+    strate_up[:] = [m[0] for m in unites.modalites]
+    up_par_strate = index_groupes(strate_up)
+    return unites.codes, up_par_strate
+
+
+def nombre_replications(methode, strates=None, psu=None, n=None, R=500):
+    """
+    Nombre de réplications d'une méthode : R pour le bootstrap, une par UP (hors strates d'une
+    seule UP) pour le jackknife, l'ordre de la matrice de Hadamard pour la BRR.
+    """
+    if methode == "bootstrap":
+        return int(R)
+    _, up_par_strate = _structure_replication(n, strates, psu)
+    n_h = up_par_strate.effectifs
+    if methode == "jackknife":
+        return int(n_h[n_h > 1].sum())
+    return _ordre_hadamard(len(n_h))
+
+
+def _ordre_hadamard(H):
+    # Plus petite puissance de 2 strictement supérieure à H (la première colonne, constante, est écartée)
+    return 1 << int(H).bit_length()
+
+
+def _signes_hadamard(debut, fin, H):
+    """
+    Colonnes 1..H, lignes debut:fin de la matrice de Hadamard de Sylvester (H x (fin - debut)),
+    sans construire la matrice entière : l'élément (r, c) vaut (-1)^popcount(r & c).
+    """
+    bits = np.arange(1, H + 1, dtype=np.int64)[:, None] & np.arange(debut, fin, dtype=np.int64)[None, :]
+    parite = np.zeros(bits.shape, dtype=np.int8)
+    while bits.any():  # log2(R) passes : parité du nombre de bits communs
+        parite ^= (bits & 1).astype(np.int8)
+        bits >>= 1
+    return 1 - 2 * parite
+
+
+def _facteurs_replication(up_par_strate, methode, debut, fin, graines=None, fay=0.0):
+    """
+    Facteurs d'ajustement des poids des UP pour les réplications debut:fin : tableau
+    (nombre d'UP x (fin - debut)) en float32, et coefficient de chaque réplication dans la variance.
+    """
+    n_h = up_par_strate.effectifs
+    strate_up = up_par_strate.codes
+    n_up = len(strate_up)
+    R_bloc = fin - debut
+
+    if methode == "bootstrap":
+        # Rao-Wu avec m_h = n_h - 1 : n_h - 1 UP tirées avec remise dans chaque strate,
+        # poids multipliés par n_h / (n_h - 1) x nombre de tirages de l'UP
+        facteurs = np.ones((n_up, R_bloc), dtype=np.float32)
+        actives = n_h > 1
+        m_h = np.where(actives, n_h - 1, 0)
+        strate_tirage = np.repeat(np.arange(len(n_h)), m_h)
+        echelle = np.where(actives, n_h / np.maximum(n_h - 1, 1), 1.0)[strate_up]
+        dans_active = actives[strate_up]
+        for r in range(R_bloc):
+            rng = np.random.default_rng(graines[debut + r])  # Un flux par réplication
+            rangs = (rng.random(len(strate_tirage)) * n_h[strate_tirage]).astype(np.int64)
+            tirees = up_par_strate.ordre[up_par_strate.debuts[strate_tirage] + rangs]
+            comptes = np.bincount(tirees, minlength=n_up)
+            facteurs[dans_active, r] = (comptes * echelle)[dans_active]
+        return facteurs, np.full(R_bloc, 1.0 / len(graines))
+
+    if methode == "jackknife":
+        # Une réplication par UP retirée (strates d'au moins deux UP) : l'UP retirée a un
+        # poids nul, les autres UP de sa strate sont repondérées par n_h / (n_h - 1)
+        retirees = up_par_strate.ordre[np.repeat(n_h > 1, n_h)][debut:fin]
+        h = strate_up[retirees]
+        memes = strate_up[:, None] == h[None, :]
+        facteurs = np.where(memes, (n_h[h] / (n_h[h] - 1))[None, :], 1.0).astype(np.float32)
+        facteurs[retirees, np.arange(R_bloc)] = 0.0
+        return facteurs, (n_h[h] - 1) / n_h[h]
+
+    # BRR (Fay si fay > 0) : exactement deux UP par strate, demi-échantillons équilibrés
+    # donnés par les colonnes 1..H d'une matrice de Hadamard
+    if np.any(n_h != 2):
+        raise ValueError("La BRR nécessite exactement deux UP par strate.")
+    R = _ordre_hadamard(len(n_h))
+    signes = _signes_hadamard(debut, fin, len(n_h))  # H x R_bloc
+    premieres = up_par_strate.ordre[up_par_strate.debuts[:-1]]
+    secondes = up_par_strate.ordre[up_par_strate.debuts[:-1] + 1]
+    facteurs = np.empty((n_up, R_bloc), dtype=np.float32)
+    facteurs[premieres] = np.where(signes > 0, 2 - fay, fay)
+    facteurs[secondes] = np.where(signes > 0, fay, 2 - fay)
+    return facteurs, np.full(R_bloc, 1.0 / (R * (1 - fay) ** 2))
+
+
+def poids_replication(poids, strates=None, psu=None, methode="bootstrap", R=500, fay=0.0,
+                      random_state=None, debut=0, fin=None, dtype=np.float32):
+    """
+    Construit la matrice n x R des poids de réplication (ou les colonnes debut:fin seulement).
+
+    Paramètres
+    ----------
+    poids : array-like
+        Poids de sondage d_i = 1 / π_i des unités de l'échantillon.
+    strates : array-like, optionnel
+        Strate de chaque unité (une seule strate par défaut).
+    psu : array-like, optionnel
+        Unité primaire (UP) de chaque unité (chaque unité est sa propre UP par défaut).
+    methode : str, optionnel
+        "bootstrap" (Rao-Wu), "jackknife" (retrait d'une UP) ou "brr" (deux UP par strate).
+    R : int, optionnel
+        Nombre de réplications du bootstrap (fixé par la structure pour les autres méthodes).
+    fay : float, optionnel
+        Coefficient de Fay pour la BRR (0 : BRR classique).
+    random_state : int, SeedSequence, Generator ou None
+        Graine du bootstrap : la réplication r a son propre flux, quel que soit le découpage.
+    debut, fin : int, optionnel
+        Réplications à construire (toutes par défaut).
+    dtype : type numpy, optionnel
+        Type des poids (float32 par défaut).
+
+    Retourne
+    --------
+    np.ndarray
+        Poids de réplication, de forme (n, fin - debut).
+    """
+    if methode not in METHODES_REPLICATION:
+        raise ValueError(f"Méthode inconnue : {methode}. Méthodes disponibles : {sorted(METHODES_REPLICATION)}.")
+    poids = np.asarray(poids, dtype=float)
+    up, up_par_strate = _structure_replication(len(poids), strates, psu)
+    total = nombre_replications(methode, strates, psu, len(poids), R)
+    fin = total if fin is None else min(fin, total)
+    graines = graines_independantes(random_state, total) if methode == "bootstrap" else None
+    facteurs, _ = _facteurs_replication(up_par_strate, methode, debut, fin, graines, fay)
+    return (poids[:, None] * facteurs[up]).astype(dtype, copy=False)
+
+
+# État partagé des processus de calcul (transmis une seule fois, à leur démarrage)
+_etat_replication = {}
+
+
+def _initialiser_replication(etat):
+    _etat_replication.clear()
+    _etat_replication.update(etat)
+
+
+def _estimations_replicats(debut, fin, etat=None):
+    # Totaux pondérés de chaque variable pour les réplications debut:fin, en un produit matriciel :
+    # (UP x variables)ᵀ @ (UP x réplications)
+    etat = _etat_replication if etat is None else etat
+    facteurs, coefficients = _facteurs_replication(etat["up_par_strate"], etat["methode"], debut, fin,
+                                                   etat["graines"], etat["fay"])
+    return etat["totaux_up"].T @ facteurs.astype(np.float64), coefficients
+
+
+def variance_replication(y, poids, strates=None, psu=None, methode="bootstrap", R=500, fay=0.0,
+                         random_state=None, alpha=0.05, taille_bloc=None, n_jobs=1):
+    """
+    Estime les totaux et moyennes (Hájek) de plusieurs variables, et leurs variances par
+    réplications, pour un échantillon à plusieurs degrés (sortie de sample_degree par exemple).
+
+    Les estimations de toutes les réplications sont obtenues par un seul produit matriciel par
+    bloc de réplications : les variables pondérées sont d'abord agrégées par UP, puis multipliées
+    par la matrice (UP x réplications) des facteurs d'ajustement (float32). Le résultat est
+    identique à celui obtenu avec la matrice n x R des poids de réplication (poids_replication).
+
+    Paramètres
+    ----------
+    y : array-like, pd.Series ou pd.DataFrame
+        Variable(s) d'intérêt, une colonne par variable (sans valeurs manquantes).
+    poids : array-like
+        Poids de sondage d_i = 1 / π_i.
+    strates, psu, methode, R, fay, random_state :
+        Voir poids_replication.
+    alpha : float, optionnel
+        Niveau de risque pour l’intervalle de confiance (par défaut 0.05 pour un IC à 95%).
+    taille_bloc : int, optionnel
+        Nombre de réplications traitées à la fois (par défaut, environ
+        ELEMENTS_PAR_BLOC_REPLICATION facteurs par bloc).
+    n_jobs : int ou None, optionnel
+        Nombre de processus traitant les blocs (1 par défaut ; None : tous les cœurs).
+        Le résultat ne dépend pas du nombre de processus.
+
+    Retourne
+    --------
+    pd.DataFrame
+        Une ligne par variable et par estimateur (total, moyenne) : Variable, Estimateur,
+        Estimation, Erreur standard, IC min, IC max, au format de tableau_resultats.
+
+    Notes
+    -----
+    v(θ̂) = Σ_r c_r (θ̂_r - θ̂)², avec c_r = 1/R (bootstrap), (n_h - 1)/n_h (jackknife)
+    et 1/(R (1 - fay)²) (BRR). Une strate d'une seule UP ne contribue pas à la variance.
+    """
+    if methode not in METHODES_REPLICATION:
+        raise ValueError(f"Méthode inconnue : {methode}. Méthodes disponibles : {sorted(METHODES_REPLICATION)}.")
+
+    # Variables d'intérêt en colonnes
+    if isinstance(y, pd.DataFrame):
+        noms, Y = list(y.columns), y.to_numpy(dtype=float)
+    elif isinstance(y, pd.Series):
+        noms, Y = [y.name if y.name is not None else "y"], y.to_numpy(dtype=float)[:, None]
+    else:
+        Y = np.asarray(y, dtype=float)
+        Y = Y[:, None] if Y.ndim == 1 else Y
+        noms = [f"y{j + 1}" for j in range(Y.shape[1])] if Y.shape[1] > 1 else ["y"]
+    poids = np.asarray(poids, dtype=float)
+    if len(Y) != len(poids):
+        raise ValueError("Les variables et les poids doivent être de même taille.")
+    if np.any(np.isnan(Y)) or np.any(np.isnan(poids)):
+        raise ValueError("Il y a des valeurs manquantes dans les variables ou les poids.")
+
+    # Agrégation par UP des variables pondérées (dernière colonne : somme des poids, pour Hájek)
+    up, up_par_strate = _structure_replication(len(poids), strates, psu)
+    n_up = len(up_par_strate.codes)
+    ponderees = np.column_stack([Y * poids[:, None], poids])
+    totaux_up = np.column_stack([np.bincount(up, weights=ponderees[:, j], minlength=n_up)
+                                 for j in range(ponderees.shape[1])])
+    estimations = totaux_up.sum(axis=0)
+
+    total = nombre_replications(methode, strates, psu, len(poids), R)
+    if total == 0:
+        raise ValueError("Aucune réplication possible : chaque strate ne compte qu'une UP.")
+    etat = {
+        "up_par_strate": up_par_strate, "methode": methode, "fay": fay, "totaux_up": totaux_up,
+        "graines": graines_independantes(random_state, total) if methode == "bootstrap" else None,
+    }
+
+    # Blocs de réplications : mémoire bornée, et au moins un bloc par processus
+    n_jobs = (os.cpu_count() or 1) if n_jobs is None else n_jobs
+    if taille_bloc is None:
+        taille_bloc = max(1, ELEMENTS_PAR_BLOC_REPLICATION // max(n_up, 1))
+        if n_jobs > 1:
+            taille_bloc = min(taille_bloc, -(-total // n_jobs))
+    debuts = list(range(0, total, taille_bloc))
+    fins = [min(d + taille_bloc, total) for d in debuts]
+
+    if n_jobs > 1 and len(debuts) > 1 and n_up * total >= SEUIL_REPLICATION_PARALLELE:
+        with ProcessPoolExecutor(max_workers=min(n_jobs, len(debuts)), initializer=_initialiser_replication,
+                                 initargs=(etat,)) as pool:
+            resultats = list(pool.map(_estimations_replicats, debuts, fins))
+    else:
+        resultats = [_estimations_replicats(d, f, etat) for d, f in zip(debuts, fins)]
+
+    # Écarts des réplications à l'estimation complète, pour les totaux et les moyennes (ratios)
+    variances_totaux = np.zeros(len(noms))
+    variances_moyennes = np.zeros(len(noms))
+    moyennes = estimations[:-1] / estimations[-1]
+    for replicats, coefficients in resultats:
+        totaux_r, poids_r = replicats[:-1], replicats[-1]
+        variances_totaux += ((totaux_r - estimations[:-1, None]) ** 2) @ coefficients
+        with np.errstate(divide='ignore', invalid='ignore'):
+            ecarts = np.where(poids_r > 0, totaux_r / poids_r - moyennes[:, None], 0.0)
+        variances_moyennes += (ecarts ** 2) @ coefficients
+
+    z = stats.norm.ppf(1 - alpha / 2)
+    lignes = []
+    for j, nom in enumerate(noms):
+        for estimateur, valeur, variance in (("Total", estimations[j], variances_totaux[j]),
+                                             ("Moyenne", moyennes[j], variances_moyennes[j])):
+            erreur_standard = np.sqrt(variance)
+            lignes.append({
+                "Variable": nom,
+                "Estimateur": f"{estimateur} ({methode})",
+                "Estimation": valeur,
+                "Erreur standard": erreur_standard,
+                "IC min": valeur - z * erreur_standard,
+                "IC max": valeur + z * erreur_standard
+            })
+    return pd.DataFrame(lignes).round(3)
+
+
+def replication_echantillon(echantillon, variables, col_prob="Prob", col_strate=None, col_psu=None, **options):
+    """
+    variance_replication appliquée à un échantillon (DataFrame) portant sa probabilité
+    d'inclusion, par exemple la sortie finale de sondage_deux_degres.sample_degree
+    (colonne 'Prob', strates du premier degré, grappes comme UP).
+
+    Les lignes où l'une des variables manque sont écartées. Les options sont transmises
+    à variance_replication (methode, R, fay, random_state, alpha, taille_bloc, n_jobs).
+    """
+    variables = [variables] if isinstance(variables, str) else list(variables)
+    propre = echantillon.dropna(subset=variables + [col_prob])
+    return variance_replication(
+        propre[variables],
+        1 / propre[col_prob].to_numpy(dtype=float),
+        strates=propre[col_strate].to_numpy() if col_strate is not None else None,
+        psu=propre[col_psu].to_numpy() if col_psu is not None else None,
+        **options
+    )
@@ -1,176 +1,231 @@
 import pandas as pd
 import numpy as np
-from typing import Optional, List, Union, Dict
-from tirages_sas import sas_sans_remise_base, sas_avec_remise_base, draw_by_draw, tirage_bernoulli, tri_aleatoire, selection_rejet, reservoir_sampling
+from typing import Optional, List, Union, Dict, Tuple
+from noyau_tirage import EtatAleatoire, generateur, index_groupes, IndexGroupes
+from base_de_sondage import SamplingFrame, base_de_sondage
+from tirages_sas import draw_by_draw_indices, selection_rejet, reservoir_indices
+
+# --------------------------------------------------
+# Tirages par groupe sur positions : tous les groupes sont traités en un seul appel.
+# Les groupes sont décrits par leurs décalages (format CSR) : le groupe g occupe les cases
+# debuts[g]..debuts[g] + effectifs[g] - 1 du tableau des lignes regroupées.
+# Chaque fonction renvoie les cases retenues et le numéro du groupe de chacune.
+
+def _groupes_des_cases(effectifs: np.ndarray) -> np.ndarray:
+    # Numéro du groupe de chaque case du tableau regroupé
+    return np.repeat(np.arange(len(effectifs)), effectifs)
+
+def _par_groupes_tri(debuts, effectifs, tailles, rng):
+    # Une uniforme par ligne, tri des uniformes à l'intérieur de chaque groupe (tri lexicographique
+    # sur (g, u), sans arrondi flottant), puis les n_h premières cases de chaque groupe : tri
+    # aléatoire, et donc SAS sans remise
+    gid = _groupes_des_cases(effectifs)
+    cases = np.lexsort((rng.uniform(0, 1, len(gid)), gid))
+    rangs = np.arange(len(gid)) - debuts[gid]
+    gardees = rangs < tailles[gid]
+    return cases[gardees], gid[gardees]
+
+def _par_groupes_avec_remise(debuts, effectifs, tailles, rng):
+    # n_h tirages uniformes indépendants dans chaque groupe
+    gid = _groupes_des_cases(tailles)
+    rangs = np.floor(rng.uniform(0, 1, len(gid)) * effectifs[gid]).astype(np.int64)
+    return debuts[gid] + np.minimum(rangs, effectifs[gid] - 1), gid
+
+def _par_groupes_bernoulli(debuts, effectifs, tailles, rng):
+    # Chaque ligne est retenue indépendamment avec la probabilité n_h / N_h (taille aléatoire)
+    gid = _groupes_des_cases(effectifs)
+    cases = np.flatnonzero(rng.uniform(0, 1, len(gid)) < tailles[gid] / effectifs[gid])
+    return cases, gid[cases]
+
+def _par_groupes_boucle(tirage_indices):
+    # Méthodes séquentielles par nature : un appel au noyau de tirages_sas par groupe,
+    # avec le même générateur, sur les positions 0..N_h-1 du groupe
+    def tirage(debuts, effectifs, tailles, rng):
+        actifs = np.flatnonzero(tailles > 0)
+        blocs = [debuts[g] + tirage_indices(int(effectifs[g]), int(tailles[g]), rng) for g in actifs]
+        cases = np.concatenate(blocs) if blocs else np.empty(0, dtype=np.int64)
+        return cases, np.repeat(actifs, [len(b) for b in blocs])
+    return tirage
+
+# Table de correspondance : nom de méthode -> tirage de tous les groupes en une passe
+TIRAGES_PAR_GROUPES = {
+    "sas_sans_remise": _par_groupes_tri,
+    "sas_avec_remise": _par_groupes_avec_remise,
+    "draw_by_draw": _par_groupes_boucle(draw_by_draw_indices),
+    "tirage_bernoulli": _par_groupes_bernoulli,
+    "tri_aleatoire": _par_groupes_tri,
+    "selection_rejet": _par_groupes_boucle(lambda N, n, rng: selection_rejet(N, n, random_state=rng) - 1),
+    "reservoir_sampling": _par_groupes_boucle(reservoir_indices),
+}
+
+# Méthodes de tirage acceptées à chaque étape
+METHODES = list(TIRAGES_PAR_GROUPES)
+
+# --------------------------------------------------
+# Noyaux sur positions : chaque étape ne voit que les lignes retenues à l'étape précédente
+
+def _groupes_etape(base: SamplingFrame, variables: Union[str, List[str]], positions: Optional[np.ndarray]) -> IndexGroupes:
+    """
+    Index des groupes (strates ou grappes) des seules lignes `positions`, en O(len(positions)).
+    Si positions vaut None (toute la base), l'index est celui de la base de sondage, construit une fois.
+    Les groupes sont numérotés dans l'ordre trié, comme avec DataFrame.groupby.
+    """
+    if positions is None:
+        return base.groupes(variables)
+    colonnes = [variables] if isinstance(variables, str) else list(variables)
+    valeurs = [base.data[c].to_numpy()[positions] for c in colonnes]  # Extraction des seules lignes retenues
+    return index_groupes(valeurs if len(valeurs) > 1 else valeurs[0], trier=True)
+
+def _tailles_groupes(size, modalites: np.ndarray) -> np.ndarray:
+    # Détermine la taille de l’échantillon de chaque groupe selon le format de `size`
+    if isinstance(size, dict):
+        cles = [nom if not isinstance(nom, tuple) else nom[0] for nom in modalites]  # Clé simple ou tuple
+        return np.array([size.get(cle, 0) for cle in cles], dtype=np.int64)  # Taille pour chaque strate
+    if isinstance(size, list):
+        tailles = np.zeros(len(modalites), dtype=np.int64)
+        k = min(len(size), len(modalites))
+        tailles[:k] = size[:k]
+        return tailles
+    return np.full(len(modalites), size, dtype=np.int64)  # Même taille pour toutes les strates
+
+def _tirer_groupes(debuts, effectifs, tailles, method, rng) -> Tuple[np.ndarray, np.ndarray]:
+    # Tirage de tous les groupes ; renvoie les cases retenues et leur probabilité d'inclusion
+    cases, gid = TIRAGES_PAR_GROUPES[method](debuts, effectifs, tailles, rng)
+    return cases, tailles[gid] / effectifs[gid]
+
+def _tirage_strates(groupes: IndexGroupes, size, method: str, rng: np.random.Generator,
+                    description: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Tirage dans chaque groupe ; renvoie les positions retenues (relatives aux lignes indexées
+    par `groupes`) et leur probabilité d'inclusion à cette étape.
+    """
+    effectifs = groupes.effectifs
+    demandees = _tailles_groupes(size, groupes.modalites)
+    tailles = np.minimum(demandees, effectifs)  # Ne pas tirer plus que la taille réelle du groupe
+
+    if description:
+        for nom, N_h, n, n_eff in zip(groupes.modalites, effectifs, demandees, tailles):
+            print(f"→ Strate: {nom}, taille groupe: {N_h}, taille demandée: {n}")
+            if n_eff == 0:
+                print(f"⚠️  Aucune unité tirée pour la strate {nom}")
+
+    if not (tailles > 0).any():
+        raise ValueError("⚠️ Aucune strate n'a été échantillonnée.")
+
+    cases, prob = _tirer_groupes(groupes.debuts[:-1], effectifs, tailles, method, rng)
+    return groupes.ordre[cases], prob
+
+def _tirage_simple(N: int, size, method: str, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    # Tirage non stratifié sur les positions 0..N-1 : un seul groupe
+    n = size[0] if isinstance(size, list) else size  # Prend la première valeur si une liste
+    if n > N and method != "sas_avec_remise":
+        raise ValueError(f"Impossible de tirer {n} unités sans remise parmi {N}.")
+    return _tirer_groupes(np.array([0]), np.array([N]), np.array([n]), method, rng)
+
+def _tirage_grappes(groupes: IndexGroupes, size, method: str, rng: np.random.Generator) -> Tuple[np.ndarray, np.ndarray]:
+    # Tirage des grappes selon la méthode choisie ; toutes les lignes des grappes choisies sont gardées
+    if isinstance(size, list):
+        size = size[0]  # Si size est une liste, on ne garde que la première valeur
+    n_clusters = len(groupes.modalites)  # Nombre total de grappes
+    size = min(size, n_clusters)  # Ajuste la taille demandée si > nombre de grappes
 
+    tirees, pi = _tirer_groupes(np.array([0]), np.array([n_clusters]), np.array([size]), method, rng)
+    if method == "sas_avec_remise":
+        # Les grappes tirées plusieurs fois ne sont gardées qu'une fois (groupes.lignes) :
+        # probabilité d'être tirée au moins une fois en `size` tirages
+        pi = np.full(len(tirees), 1 - (1 - 1 / n_clusters) ** size)
+    pi_grappes = np.zeros(n_clusters)
+    pi_grappes[tirees] = pi  # Probabilité d'inclusion de chaque grappe tirée
+    selection = groupes.lignes(tirees)  # Lignes des grappes choisies (décalages), dans l'ordre des données
+    return selection, pi_grappes[groupes.codes[selection]]
+
+# --------------------------------------------------
 # Fonction de tirage stratifié
 def strata(
-    data: pd.DataFrame,  # Données source
+    data: Union[pd.DataFrame, SamplingFrame],  # Données source (ou base de sondage déjà indexée)
     stratanames: Optional[List[str]],  # Variables de stratification
     size: Union[int, List[int], Dict],  # Taille(s) d'échantillon par strate
     method: str = "sas_sans_remise",  # Méthode de tirage par défaut
     description: bool = False,  # Affiche les descriptions intermédiaires
-    stage_num: int = 1  # Numéro de l’étape (utile pour multi-degrés)
+    stage_num: int = 1,  # Numéro de l’étape (utile pour multi-degrés)
+    random_state: EtatAleatoire = None,  # Graine ou générateur (entier, SeedSequence, Generator)
+    empreinte: Optional[str] = None  # Empreinte de la base (clé du cache des index de groupes)
 ) -> pd.DataFrame:
     """
     Réalise un tirage stratifié selon différentes méthodes, avec tirage uniforme.
     """
-    # Vérifie que la méthode choisie est bien parmi les options autorisées
-    if method not in ["sas_sans_remise", "sas_avec_remise", "draw_by_draw", "tirage_bernoulli", "tri_aleatoire", "selection_rejet", "reservoir_sampling"]:
-        raise ValueError("Méthode non reconnue. Options: 'sas_sans_remise', 'sas_avec_remise', 'draw_by_draw', 'tirage_bernoulli', 'tri_aleatoire', 'selection_rejet', 'reservoir_sampling'")
+    rng = generateur(random_state)  # Générateur explicite, sans état global
+    base = base_de_sondage(data, empreinte)  # Index de groupes partagés entre les appels
+    data = base.data
 
-    samples = []  # Liste pour stocker les échantillons par strate
+    # Vérifie que la méthode choisie est bien parmi les options autorisées
+    if method not in METHODES:
+        raise ValueError("Méthode non reconnue. Options: " + ", ".join(f"'{m}'" for m in METHODES))
 
-    # Si stratification activée
     if stratanames is not None:
-        grouped = data.groupby(stratanames)  # Regroupe les données selon les strates
-
-        size_list = size.copy() if isinstance(size, list) else None  # Copie défensive si taille est une liste
-
-        # Boucle sur chaque strate
-        for idx, (name, group) in enumerate(grouped):
-            # Détermine la taille de l’échantillon selon le format de `size`
-            if isinstance(size, dict):
-                key = name if not isinstance(name, tuple) else name[0]  # Clé simple ou tuple
-                n = size.get(key, 0)  # Taille pour cette strate
-            elif isinstance(size, list):
-                n = size_list[idx] if idx < len(size_list) else 0
-            else:
-                n = size  # Même taille pour toutes les strates
-
-            if description:
-                print(f"→ Strate: {name}, taille groupe: {len(group)}, taille demandée: {n}")
-
-            n = min(n, len(group))  # Ne pas tirer plus que la taille réelle du groupe
-            if n == 0:
-                if description:
-                    print(f"⚠️  Aucune unité tirée pour la strate {name}")
-                continue  # Passe à la strate suivante
-
-            # Tirage uniforme sans remise
-            if method == "sas_sans_remise":
-                sample = np.random.choice(group.index, n, replace=False)  # Tirage sans remise
-                prob = n / len(group)
-                sample = group.loc[sample]  # Applique les indices de l'échantillon
-            elif method == "sas_avec_remise":
-                sample = np.random.choice(group.index, n, replace=True)  # Tirage avec remise
-                prob = n / len(group)
-                sample = group.loc[sample]
-            elif method == "draw_by_draw":
-                sample = np.random.choice(group.index, n, replace=False)  # Tirage draw-by-draw sans remise
-                prob = n / len(group)
-                sample = group.loc[sample]
-            elif method == "tirage_bernoulli":
-                sample = np.random.choice(group.index, n, replace=False)  # Tirage bernoullien sans remise
-                prob = n / len(group)
-                sample = group.loc[sample]
-            elif method == "tri_aleatoire":
-                sample = np.random.choice(group.index, n, replace=False)  # Tirage par tri aléatoire sans remise
-                prob = n / len(group)
-                sample = group.loc[sample]
-            elif method == "selection_rejet":
-                sample = np.random.choice(group.index, n, replace=False)  # Sélection-rejet sans remise
-                prob = n / len(group)
-                sample = group.loc[sample]
-            elif method == "reservoir_sampling":
-                sample = np.random.choice(group.index, n, replace=False)  # Reservoir Sampling sans remise
-                prob = n / len(group)
-                sample = group.loc[sample]
-
-            sample[f'Prob_{stage_num}_stage'] = prob  # Ajoute la probabilité d'inclusion
-            samples.append(sample)  # Ajoute l’échantillon de la strate à la liste
-
-        if not samples:
-            raise ValueError("⚠️ Aucune strate n'a été échantillonnée.")
-
-        sampled = pd.concat(samples)  # Fusionne tous les échantillons
-
+        groupes = _groupes_etape(base, stratanames, None)  # Index construit une fois par base
+        selection, prob = _tirage_strates(groupes, size, method, rng, description=description)
     else:
-        # Tirage non stratifié
-        n = size
-        if isinstance(n, list):
-            n = n[0]  # Prend la première valeur si une liste
-
-        # Tirage uniforme sans remise
-        if method == "sas_sans_remise":
-            sampled = np.random.choice(data.index, n, replace=False)  # Tirage sans remise
-            prob = n / len(data)
-            sampled = data.loc[sampled]  # Applique les indices de l'échantillon
-        elif method == "sas_avec_remise":
-            sampled = np.random.choice(data.index, n, replace=True)  # Tirage avec remise
-            prob = n / len(data)
-            sampled = data.loc[sampled]
-        elif method == "draw_by_draw":
-            sampled = np.random.choice(data.index, n, replace=False)  # Tirage draw-by-draw sans remise
-            prob = n / len(data)
-            sampled = data.loc[sampled]
-        elif method == "tirage_bernoulli":
-            sampled = np.random.choice(data.index, n, replace=False)  # Tirage bernoullien sans remise
-            prob = n / len(data)
-            sampled = data.loc[sampled]
-        elif method == "tri_aleatoire":
-            sampled = np.random.choice(data.index, n, replace=False)  # Tirage par tri aléatoire sans remise
-            prob = n / len(data)
-            sampled = data.loc[sampled]
-        elif method == "selection_rejet":
-            sampled = np.random.choice(data.index, n, replace=False)  # Sélection-rejet sans remise
-            prob = n / len(data)
-            sampled = data.loc[sampled]
-        elif method == "reservoir_sampling":
-            sampled = np.random.choice(data.index, n, replace=False)  # Reservoir Sampling sans remise
-            prob = n / len(data)
-            sampled = data.loc[sampled]
-
-        sampled[f'Prob_{stage_num}_stage'] = prob  # Ajoute la probabilité d'inclusion
+        selection, prob = _tirage_simple(len(data), size, method, rng)
 
+    sampled = data.take(selection)  # Une seule extraction positionnelle
+    sampled[f'Prob_{stage_num}_stage'] = prob  # Ajoute la probabilité d'inclusion
     return sampled  # Retourne l’échantillon
 
 def cluster(
-    data: pd.DataFrame,  # Données d’entrée
+    data: Union[pd.DataFrame, SamplingFrame],  # Données d’entrée (ou base de sondage déjà indexée)
     clustername: Union[str, List[str]],  # Nom ou liste des variables de grappes
     size: Union[int, List[int]],  # Nombre de grappes à sélectionner
     method: str = "sas_sans_remise",  # Méthode de tirage
     description: bool = False,  # Affichage des étapes
-    stage_num: int = 1  # Numéro d’étape (multi-degrés)
+    stage_num: int = 1,  # Numéro d’étape (multi-degrés)
+    random_state: EtatAleatoire = None,  # Graine ou générateur (entier, SeedSequence, Generator)
+    empreinte: Optional[str] = None  # Empreinte de la base (clé du cache des index de groupes)
 ) -> pd.DataFrame:
     """
     Réalise un tirage par grappes avec tirage uniforme.
     """
+    rng = generateur(random_state)  # Générateur explicite, sans état global
+    base = base_de_sondage(data, empreinte)  # Index de groupes partagés entre les appels
+    data = base.data
+
     # Si clustername est une liste, on ne garde que la première variable
     if isinstance(clustername, list):
         clustername = clustername[0]
 
-    # Si size est une liste, on ne garde que la première valeur
-    if isinstance(size, list):
-        size = size[0]
-
-    clusters = data[clustername].unique()  # Liste des grappes uniques
-    n_clusters = len(clusters)  # Nombre total de grappes
-    size = min(size, n_clusters)  # Ajuste la taille demandée si > nombre de grappes
-
-    # Tirage uniforme sans remise
-    selected_clusters = np.random.choice(clusters, size, replace=False)  # Tirage sans remise
-    prob = size / n_clusters
+    groupes = _groupes_etape(base, clustername, None)  # Index construit une fois par base
+    selection, prob = _tirage_grappes(groupes, size, method, rng)
 
     # Filtre les données pour ne garder que les grappes sélectionnées
-    sampled = data[data[clustername].isin(selected_clusters)].copy()
+    sampled = data.take(selection)
 
     # Ajoute la probabilité d’inclusion
-    sampled[f'Prob_{stage_num}_stage'] = prob if isinstance(prob, (int, float)) else np.repeat(prob.mean(), len(sampled))
+    sampled[f'Prob_{stage_num}_stage'] = prob
 
     return sampled  # Retourne les unités sélectionnées
 
 def sample_degree(
-    data: pd.DataFrame,  # Données complètes à échantillonner
+    data: Union[pd.DataFrame, SamplingFrame],  # Données complètes à échantillonner (ou base de sondage)
     size: Union[List[int], List[List[int]], int],  # Taille d’échantillon à chaque étape
     stage: Optional[List[str]] = None,  # Liste des types d’étapes (e.g. "stratified", "cluster")
-    varnames: Optional[Union[List[str], List[List[str]]]] = None,  # Variables de stratification/grappes
+    varnames: Optional[Union[str, List[str], List[List[str]]]] = None,  # Variables de stratification/grappes (communes, ou une liste par étape)
     method: Optional[Union[List[str], str]] = None,  # Méthodes de tirage à chaque étape
-    description: bool = False  # Affichage des étapes
+    description: bool = False,  # Affichage des étapes
+    random_state: EtatAleatoire = None,  # Graine ou générateur (entier, SeedSequence, Generator)
+    empreinte: Optional[str] = None  # Empreinte de la base (clé du cache des index de groupes)
 ) -> Dict[int, pd.DataFrame]:
     """
     Réalise un plan de sondage à plusieurs degrés avec tirage uniforme.
+
+    Les étapes sont emboîtées : l'étape k ne tire que parmi les lignes retenues à l'étape k-1
+    (unités tirées, ou toutes les lignes des grappes tirées). Chaque résultat contient les
+    colonnes Prob_j_stage des étapes j <= k et leur produit, la probabilité d'inclusion
+    composée 'Prob'.
     """
+    rng = generateur(random_state)  # Un seul générateur, partagé par les étapes successives
+    base = base_de_sondage(data, empreinte)  # Index de groupes partagés entre les appels
+    data = base.data
+
     # Vérifie que la taille est bien fournie
     if size is None:
         raise ValueError("La taille d'échantillon doit être spécifiée")
@@ -185,9 +240,22 @@ def sample_degree(
     # Mise en forme des listes pour assurer une consistance
     size_list = size if isinstance(size, list) else [size]
     method_list = method if isinstance(method, list) else [method] * number if method else ["sas_sans_remise"] * number
-    varnames_list = varnames if isinstance(varnames, list) and isinstance(varnames[0], list) else [varnames] * number
-
-    results = {}  # Dictionnaire pour stocker les résultats
+    # Une liste de listes donne les variables de chaque étape ; une variable seule ou une liste
+    # simple vaut pour toutes les étapes
+    par_etape = isinstance(varnames, list) and len(varnames) > 0 and isinstance(varnames[0], list)
+    if par_etape and len(varnames) != number:
+        raise ValueError(f"{len(varnames)} listes de variables fournies pour {number} étapes.")
+    varnames_list = varnames if par_etape else [varnames] * number
+    stage_list = stage if stage is not None else ["simple"] * number
+
+    for stage_method in method_list:
+        if stage_method not in METHODES:
+            raise ValueError("Méthode non reconnue. Options: " + ", ".join(f"'{m}'" for m in METHODES))
+
+    # Lignes encore en jeu et probabilités d'inclusion de chaque étape, alignées sur elles
+    positions = None  # None : toutes les lignes (index de groupes mis en cache)
+    probas_etapes = []
+    etapes = {}
 
     # Effectuer chaque étape du plan de sondage
     for i in range(number):
@@ -197,17 +265,33 @@ def sample_degree(
         stage_varnames = varnames_list[i]
 
         if description:
-            print(f"\nÉtape {i + 1} - Méthode: {stage_method}, Taille échantillon: {stage_size}, Variables: {stage_varnames}")
-
-        # Applique un tirage en fonction du type d’étape (stratification, grappes ou tirage global)
-        if "stratified" in stage[i]:
-            sampled = strata(data, stage_varnames, stage_size, method=stage_method, description=description, stage_num=i+1)
-        elif "cluster" in stage[i]:
-            sampled = cluster(data, stage_varnames, stage_size, method=stage_method, description=description, stage_num=i+1)
+            print(f"\nÉtape {i + 1} - Méthode: {stage_method}, Taille échantillon: {stage_size}, Variables: {stage_varnames}, Lignes en jeu: {len(data) if positions is None else len(positions)}")
+
+        # Applique un tirage en fonction du type d’étape (stratification, grappes ou tirage global),
+        # sur les seules lignes retenues jusqu'ici
+        if "stratified" in stage_list[i]:
+            groupes = _groupes_etape(base, stage_varnames, positions)
+            selection, prob = _tirage_strates(groupes, stage_size, stage_method, rng, description=description)
+        elif "cluster" in stage_list[i]:
+            variable = stage_varnames[0] if isinstance(stage_varnames, list) else stage_varnames
+            groupes = _groupes_etape(base, variable, positions)
+            selection, prob = _tirage_grappes(groupes, stage_size, stage_method, rng)
         else:
             # Tirage simple dans le cas où il n'y a ni stratification ni grappes
-            sampled = strata(data, None, stage_size, method=stage_method, description=description, stage_num=i+1)
+            selection, prob = _tirage_simple(len(data) if positions is None else len(positions), stage_size, stage_method, rng)
 
+        # Restriction de l'ensemble courant aux lignes retenues
+        positions = selection if positions is None else positions[selection]
+        probas_etapes = [p[selection] for p in probas_etapes] + [prob]
+        etapes[i] = (positions, probas_etapes)
+
+    # Une seule extraction par étape, une fois le plan complet tiré
+    results = {}  # Dictionnaire pour stocker les résultats
+    for i, (positions_i, probas_i) in etapes.items():
+        sampled = data.take(positions_i)
+        for j, p in enumerate(probas_i):
+            sampled[f'Prob_{j + 1}_stage'] = p
+        sampled['Prob'] = np.prod(probas_i, axis=0)  # Probabilité d'inclusion composée
         results[i] = sampled  # Sauvegarde du résultat de cette étape
 
     return results  # Retourne les résultats par étape
@@ -1,56 +1,32 @@
 import pandas as pd
 import numpy as np
-import random
-
-# Fonctions de tirage
-def tirage_sas_sans_remise(N, n):
-    population = list(range(1, N + 1))
-    return random.sample(population, n)
-
-def tirage_sas_avec_remise(N, n):
-    population = list(range(1, N + 1))
-    return [random.choice(population) for _ in range(n)]
-
-def tirage_draw_by_draw(N, n):
-    population = list(range(1, N + 1))
-    echantillon = [random.choice(population)]
-    while len(echantillon) < n:
-        candidat = random.choice(population)
-        if candidat not in echantillon:
-            echantillon.append(candidat)
-    return echantillon
-
-def tirage_bernoulli(N, n):
-    unif = np.random.uniform(0, 1, N)
-    echantillon = [i + 1 for i in range(N) if unif[i] < n / N]
-    return echantillon[:n]
-
-def tirage_tri_aleatoire(N, n):
-    unif = np.random.uniform(0, 1, N)
-    indices_trie = np.argsort(unif)
-    return (indices_trie[:n] + 1).tolist()
-
-def tirage_selection_rejet(N, n):
-    echantillon = []
-    k = 1
-    j = 0
-    while j < n and k <= N:
-        u = random.uniform(0, 1)
-        if u < (n - j) / (N - k + 1):
-            echantillon.append(k)
-            j += 1
-        k += 1
-    return echantillon
-
-def tirage_mise_a_jour(N, n):
-    selection = list(range(1, n + 1))
-    for k in range(n + 1, N + 1):
-        u = random.uniform(0, 1)
-        if u < n / k:
-            c = random.choice(selection)
-            r = selection.index(c)
-            selection[r] = k
-    return selection
+from base_de_sondage import SamplingFrame, base_de_sondage
+from tirages_sas import (sas_sans_remise_indices, sas_avec_remise_indices, draw_by_draw_indices, reservoir_indices,
+                         selection_rejet, tri_aleatoire, tirage_bernoulli as tirage_bernoulli_base)
+
+# Fonctions de tirage (random_state : entier, SeedSequence ou np.random.Generator)
+def tirage_sas_sans_remise(N, n, random_state=None):
+    return sas_sans_remise_indices(N, n, random_state=random_state) + 1
+
+def tirage_sas_avec_remise(N, n, random_state=None):
+    return sas_avec_remise_indices(N, n, random_state=random_state) + 1
+
+def tirage_draw_by_draw(N, n, random_state=None):
+    return draw_by_draw_indices(N, n, random_state=random_state) + 1
+
+def tirage_bernoulli(N, n, random_state=None):
+    # Tirage bernoullien vectorisé de tirages_sas, limité à n grappes
+    return tirage_bernoulli_base(N, n, random_state=random_state)[:n]
+
+def tirage_tri_aleatoire(N, n, random_state=None):
+    return tri_aleatoire(N, n, random_state=random_state)
+
+def tirage_selection_rejet(N, n, random_state=None):
+    # Sélection-rejet par blocs vectorisés de tirages_sas
+    return selection_rejet(N, n, random_state=random_state)
+
+def tirage_mise_a_jour(N, n, random_state=None):
+    return reservoir_indices(N, n, random_state=random_state) + 1
 
 # Dictionnaire des méthodes
 methodes_tirage = {
@@ -63,24 +39,41 @@ methodes_tirage = {
     7: ("Mise à jour échantillon", tirage_mise_a_jour)
 }
 
+# Tirage de grappes dans une base de sondage (DataFrame ou SamplingFrame)
+def tirer_grappes(base, col_grappe, n, fonction=tirage_sas_sans_remise, random_state=None):
+    # L'index des grappes (codes, permutation triée par grappe, décalages) est celui de la base :
+    # construit une fois, il permet de ne lire que les lignes des grappes tirées
+    base = base_de_sondage(base)
+    index = base.groupes(col_grappe)
+    N = len(index.modalites)
+
+    indices = np.asarray(fonction(N, n, random_state=random_state), dtype=np.int64)
+    indices = indices[(indices >= 1) & (indices <= N)]
+    grappes_tirees = index.modalites[indices - 1].tolist()
+    echantillon = base.data.take(index.lignes(indices - 1))
+    return grappes_tirees, echantillon
+
 def sondage_par_grappes():
     # Fichier source
     chemin = input("Chemin vers le fichier CSV : ")
-    df = pd.read_csv(chemin, sep=';')
+    colonnes = pd.read_csv(chemin, sep=';', nrows=0).columns
+    if 'Num' not in colonnes or 'Grappe' not in colonnes:
+        raise ValueError("Le fichier doit contenir les colonnes 'Num' et 'Grappe'.")
+
+    # Seules les colonnes utiles au tirage sont chargées
+    df = pd.read_csv(chemin, sep=';', usecols=['Num', 'Grappe'])
 
     print("\n=== Base de données chargée ===")
     print(df.head())
 
-    if 'Num' not in df.columns or 'Grappe' not in df.columns:
-        raise ValueError("Le fichier doit contenir les colonnes 'Num' et 'Grappe'.")
-
     # Correction : Suppression des valeurs manquantes dans 'Num'
     df = df.dropna(subset=['Num'])  # enlève les NaN de 'Num'
     df['Num'] = df['Num'].astype(int)  # Convertit 'Num' en entier
     df['Grappe'] = df['Grappe'].astype(str)  # Assure que 'Grappe' est de type str
 
-    grappes_uniques = sorted(df['Grappe'].unique())
-    N = len(grappes_uniques)
+    # Base de sondage : l'index des grappes est construit une seule fois
+    base = SamplingFrame(df, col_grappe='Grappe', col_id='Num')
+    N = len(base.grappes.modalites)
 
     # Affichage des méthodes
     print("\nMéthodes de tirage disponibles :")
@@ -99,12 +92,8 @@ def sondage_par_grappes():
     if n_grappes > N:
         raise ValueError("Le nombre de grappes demandées est supérieur à ce qui est disponible.")
 
-    # Tirage des indices
-    indices_grappes_tirees = fonction(N, n_grappes)
-    grappes_tirees = [grappes_uniques[i - 1] for i in indices_grappes_tirees if i <= N]
-
-    # Sous-échantillon correspondant
-    echantillon = df[df['Grappe'].isin(grappes_tirees)]
+    # Tirage des grappes et sous-échantillon correspondant (seules leurs lignes sont lues)
+    grappes_tirees, echantillon = tirer_grappes(base, 'Grappe', n_grappes, fonction)
 
     # Nombre d’individus par grappe
     individus_par_grappe = echantillon.groupby('Grappe')['Num'].count()
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+
+from base_de_sondage import SamplingFrame, base_de_sondage
+from unequal_prob_sampling import pisr_systematique
+
+
+def _base(N=50):
+    rng = np.random.default_rng(0)
+    x = rng.uniform(1, 3, N)
+    return pd.DataFrame({"ID": np.arange(N), "Strate": rng.choice(["a", "b"], N), "pi": 5 * x / x.sum()})
+
+
+def test_caches_partages_entre_appels_sur_le_meme_dataframe():
+    df = _base()
+    premiere = base_de_sondage(df)
+    cumul, groupes = premiere.cumul("pi"), premiere.groupes("Strate")
+    seconde = base_de_sondage(df)
+    assert seconde is not premiere
+    assert seconde.cumul("pi") is cumul
+    assert seconde.groupes("Strate") is groupes
+
+
+def test_colonne_modifiee_en_place_recalculee():
+    df = _base()
+    base_de_sondage(df).cumul("pi")
+    base_de_sondage(df).groupes("Strate")
+
+    df["pi"] = df["pi"].to_numpy()[::-1]
+    df.loc[:9, "Strate"] = "c"
+    base = base_de_sondage(df)
+    np.testing.assert_allclose(base.cumul("pi"), np.cumsum(df["pi"]))
+    np.testing.assert_allclose(base.colonne("pi"), df["pi"])
+    assert list(base.effectifs("Strate").index) == sorted(df["Strate"].unique())
+    np.testing.assert_array_equal(base.effectifs("Strate"), df["Strate"].value_counts().sort_index())
+
+
+def test_tirage_apres_modification_en_place_identique_a_une_copie():
+    df = _base()
+    pisr_systematique(df, 5, "ID", "pi", random_state=1)
+    df["pi"] = np.where(df["ID"] < 25, 0.0, 5 / 25)
+    pd.testing.assert_frame_equal(pisr_systematique(df, 5, "ID", "pi", random_state=1),
+                                  pisr_systematique(df.copy(), 5, "ID", "pi", random_state=1))
+
+
+def test_samplingframe_explicite_sans_verification():
+    base = SamplingFrame(_base(), col_pi="pi")
+    assert base._contenus is None
+    assert base_de_sondage(base) is base
@@ -0,0 +1,225 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import sparse
+
+from estimation import (JointInclusion, _variance_HT_dense, estimateur_HT_approche, estimateur_HT_IC_exact, estimateur_HT_plan,
+                        tableau_resultats, tableau_resultats_domaines)
+
+
+def _ligne_HT(tableau):
+    return tableau.set_index("Estimateur").loc["Horvitz-Thompson"]
+
+
+@pytest.mark.parametrize("plan", ["sas", "poisson", "pps_avec_remise"])
+def test_tableau_resultats_ligne_HT_selon_le_plan(plan):
+    rng = np.random.default_rng(0)
+    y = rng.normal(10, 2, 40)
+    pik = np.full(40, 0.1)
+    ht = estimateur_HT_plan(y, pik, plan)
+    ligne = _ligne_HT(tableau_resultats(y, pik, N=400, plan=plan))
+    assert ligne["Erreur standard"] == pytest.approx(ht["erreur_standard"])
+    assert ligne["IC min"] == pytest.approx(ht["IC_borne_inf"])
+    assert ligne["IC max"] == pytest.approx(ht["IC_borne_sup"])
+
+
+def test_tableau_resultats_p_tirage_change_la_variance():
+    rng = np.random.default_rng(1)
+    y = rng.normal(10, 2, 30)
+    pik = rng.uniform(0.05, 0.2, 30)
+    p = rng.uniform(0.001, 0.01, 30)
+    sans = _ligne_HT(tableau_resultats(y, pik, N=300, plan="pps_avec_remise"))
+    avec = _ligne_HT(tableau_resultats(y, pik, N=300, plan="pps_avec_remise", p_tirage=p))
+    ht = estimateur_HT_plan(y, pik, "pps_avec_remise", p_tirage=p)
+    assert avec["Erreur standard"] == pytest.approx(ht["erreur_standard"])
+    assert avec["Erreur standard"] != pytest.approx(sans["Erreur standard"])
+
+
+def test_tableau_resultats_variance_approchee():
+    rng = np.random.default_rng(2)
+    y = rng.normal(10, 2, 30)
+    pik = rng.uniform(0.05, 0.2, 30)
+    ligne = _ligne_HT(tableau_resultats(y, pik, N=300, variance="brewer2"))
+    assert ligne["Erreur standard"] == pytest.approx(estimateur_HT_approche(y, pik, "brewer2")["erreur_standard"])
+
+
+# --------------------------------------------------
+# Variances approchées : comparaison avec la variance exacte d'un plan systématique à
+# ordre aléatoire, dont on énumère tous les échantillons (toutes les permutations de la
+# base, tous les points de départ) : probabilités des échantillons, π_ij et variance exactes.
+
+def _echantillons_systematiques(pi, permutations):
+    """Échantillons (positions dans l'ordre du tirage) et leur probabilité, moyennés sur les ordres."""
+    n = int(round(pi.sum()))
+    plans = {}
+    for ordre in permutations:
+        V = np.cumsum(pi[ordre])
+        bornes = np.unique(np.concatenate([[0.0, 1.0], np.mod(V, 1)]))
+        for a, b in zip(bornes[:-1], bornes[1:]):
+            cases = np.minimum(np.searchsorted(V, (a + b) / 2 + np.arange(n)), len(pi) - 1)
+            cle = tuple(ordre[cases])
+            plans[cle] = plans.get(cle, 0.0) + (b - a) / len(permutations)
+    return plans
+
+
+@pytest.fixture(scope="module")
+def plan_systematique_exact():
+    x = np.array([2.0, 3, 4, 5, 6, 8, 12])
+    pi = 3 * x / x.sum()
+    y = 5 * x + np.random.default_rng(0).normal(0, 3, len(x))
+    plans = _echantillons_systematiques(pi, [np.array(p) for p in itertools.permutations(range(len(x)))])
+    pikl = np.zeros((len(x), len(x)))
+    for s, p in plans.items():
+        pikl[np.ix_(s, s)] += p
+    V_vraie = sum(p * (np.sum(y[list(s)] / pi[list(s)]) - y.sum()) ** 2 for s, p in plans.items())
+    return y, pi, pikl, plans, V_vraie
+
+
+def test_plan_systematique_pi_ij_exactes(plan_systematique_exact):
+    y, pi, pikl, plans, V_vraie = plan_systematique_exact
+    assert np.allclose(np.diag(pikl), pi)
+    # Variance exacte Σ Σ (π_ij - π_i π_j) y_i/π_i y_j/π_j et estimateur exact sans biais
+    assert y @ ((pikl - np.outer(pi, pi)) / np.outer(pi, pi)) @ y == pytest.approx(V_vraie)
+    esperance = sum(p * estimateur_HT_IC_exact(y[list(s)], pikl[np.ix_(s, s)])["variance"] for s, p in plans.items())
+    assert esperance == pytest.approx(V_vraie)
+
+
+@pytest.mark.parametrize("methode", ["hajek", "deville", "brewer1", "brewer2", "brewer3", "brewer4"])
+def test_variances_approchees_proches_de_la_variance_exacte(plan_systematique_exact, methode):
+    y, pi, _, plans, V_vraie = plan_systematique_exact
+    esperance = sum(p * estimateur_HT_approche(y[list(s)], pi[list(s)], methode)["variance"] for s, p in plans.items())
+    assert esperance / V_vraie == pytest.approx(1, abs=0.2)
+
+
+def test_differences_successives_proches_de_la_variance_exacte():
+    # Faible taux de sondage (l'approximation ne comporte pas de correction de population finie),
+    # échantillon pris dans l'ordre du tirage ; ordres aléatoires tirés avec une graine fixe
+    rng = np.random.default_rng(0)
+    x = rng.uniform(1, 5, 60)
+    pi = 4 * x / x.sum()
+    y = 5 * x + rng.normal(0, 3, len(x))
+    plans = _echantillons_systematiques(pi, [rng.permutation(len(x)) for _ in range(100)])
+    V_vraie = sum(p * (np.sum(y[list(s)] / pi[list(s)]) - y.sum()) ** 2 for s, p in plans.items())
+    esperance = sum(p * estimateur_HT_approche(y[list(s)], pi[list(s)], "differences_successives")["variance"]
+                    for s, p in plans.items())
+    assert esperance / V_vraie == pytest.approx(1, abs=0.15)
+
+
+# --------------------------------------------------
+# Représentations des π_ij : comparaison avec la formule dense n x n
+
+def _variance_reference(y, pikl, method):
+    """Formule directe sur la matrice complète, sans blocs."""
+    pik = np.diag(pikl)
+    a = y / pik
+    if method == 1:
+        return np.sum((pikl - np.outer(pik, pik)) / pikl * np.outer(a, a))
+    hors_diagonale = ~np.eye(len(y), dtype=bool)
+    termes = (np.outer(pik, pik) - pikl) / pikl * (a[:, None] - a[None, :]) ** 2
+    return 0.5 * np.sum(termes[hors_diagonale])
+
+
+def _plan_sas(N_h, n_h):
+    """π_i, π_ij et strates d'un SAS sans remise stratifié (une strate : SAS simple)."""
+    strates = np.repeat(np.arange(len(n_h)), n_h)
+    pik = np.repeat(np.asarray(n_h) / np.asarray(N_h), n_h)
+    pikl = np.outer(pik, pik)
+    for h, (N, n) in enumerate(zip(N_h, n_h)):
+        dans = strates == h
+        pikl[np.ix_(dans, dans)] = n * (n - 1) / (N * (N - 1))
+    np.fill_diagonal(pikl, pik)
+    return pik, pikl, strates
+
+
+@pytest.fixture(params=["sas", "sas_stratifie", "poisson"])
+def plan_pi_ij(request):
+    rng = np.random.default_rng(3)
+    if request.param == "sas":
+        pik, pikl, strates = _plan_sas([40], [8])
+    elif request.param == "sas_stratifie":
+        pik, pikl, strates = _plan_sas([30, 12, 50], [5, 3, 7])
+    else:
+        pik = rng.uniform(0.05, 0.6, 12)
+        pikl = np.outer(pik, pik)
+        np.fill_diagonal(pikl, pik)
+        strates = np.arange(12)  # Chaque unité forme son propre bloc
+    y = rng.normal(20, 5, len(pik))
+    return request.param, y, pik, pikl, strates
+
+
+@pytest.mark.parametrize("method", [1, 2])
+def test_representations_pi_ij_meme_variance_que_dense(plan_pi_ij, method):
+    plan, y, pik, pikl, strates = plan_pi_ij
+    reference = _variance_reference(y, pikl, method)
+    blocs = {h: pikl[np.ix_(strates == h, strates == h)] for h in np.unique(strates)}
+    representations = [
+        JointInclusion.dense(pikl),
+        JointInclusion.creuse(sparse.csr_matrix(np.where(np.isclose(pikl, np.outer(pik, pik)), 0, pikl)), pik),
+        JointInclusion.par_blocs(strates, blocs),
+        JointInclusion.par_plan(plan, pik, strates=strates if plan == "sas_stratifie" else None),
+    ]
+    for inclusion in representations:
+        assert inclusion.variance_HT(y, method=method) == pytest.approx(reference, rel=1e-10), inclusion
+        assert np.allclose(inclusion.en_dense(), pikl), inclusion
+        assert estimateur_HT_IC_exact(y, inclusion, method=method)["variance"] == pytest.approx(reference, rel=1e-10)
+
+
+# --------------------------------------------------
+# Variance HT par blocs de lignes (mémoire et fichier mappé) : même résultat que sans blocs
+
+@pytest.mark.parametrize("method", [1, 2])
+@pytest.mark.parametrize("taille_bloc", [1, 3, 7, 16, 23, 100])
+def test_variance_HT_par_blocs_egale_formule_directe(tmp_path, method, taille_bloc):
+    pik, pikl, _ = _plan_sas([60, 40], [12, 11])  # n = 23 : la plupart des blocs ne divisent pas n
+    y = np.random.default_rng(4).normal(10, 3, len(pik))
+    reference = _variance_reference(y, pikl, method)
+
+    assert _variance_HT_dense(pikl, y, pik, method, taille_bloc=taille_bloc) == pytest.approx(reference, rel=1e-12)
+    assert _variance_HT_dense(pikl, y, pik, method, taille_bloc=taille_bloc, n_jobs=3) == pytest.approx(reference, rel=1e-12)
+
+    chemin = tmp_path / "pikl.npy"
+    np.save(chemin, pikl)
+    mappee = estimateur_HT_IC_exact(y, str(chemin), method=method, taille_bloc=taille_bloc)
+    assert mappee["variance"] == pytest.approx(reference, rel=1e-12)
+
+
+# --------------------------------------------------
+# Estimation par domaines en une passe groupée : même résultat qu'une boucle par domaine
+
+@pytest.mark.parametrize("plan", ["poisson", "sas", "sas_stratifie", "pps_avec_remise"])
+def test_domaines_egaux_a_une_boucle_estimateur_HT_plan(plan):
+    rng = np.random.default_rng(6)
+    n = 90
+    strates = np.repeat(["s1", "s2", "s3"], n // 3)
+    if plan in ("sas", "sas_stratifie"):
+        pik = pd.Series(strates).map({"s1": 0.1, "s2": 0.25, "s3": 0.05}).to_numpy()
+    else:
+        pik = rng.uniform(0.02, 0.3, n)
+    Y = pd.DataFrame({"revenu": rng.normal(100, 20, n), "age": rng.integers(18, 80, n).astype(float),
+                      "actif": rng.integers(0, 2, n).astype(float)})
+    domaines = rng.choice(["nord", "sud", "est", "ouest"], n)
+    avec_strates = plan != "poisson"
+    tableau = tableau_resultats_domaines(Y, pik, domaines, plan=plan, strates=strates if avec_strates else None)
+
+    for variable in Y.columns:
+        y = Y[variable].to_numpy()
+        for domaine in np.unique(domaines):
+            dans = (domaines == domaine).astype(float)
+            lignes = tableau[(tableau["Variable"] == variable) & (tableau["Domaine"] == domaine)].set_index("Estimateur")
+
+            total = estimateur_HT_plan(y * dans, pik, plan, strates=strates if avec_strates else None)
+            ligne = lignes.loc["Horvitz-Thompson (total)"]
+            assert ligne["Estimation"] == pytest.approx(total["HT"], abs=1e-3)
+            assert ligne["Erreur standard"] == pytest.approx(total["erreur_standard"], abs=1e-3)
+
+            # Moyenne de Hájek : rapport de deux totaux, variance de la variable linéarisée
+            N_d = estimateur_HT_plan(dans, pik, plan, strates=strates if avec_strates else None)["HT"]
+            moyenne = total["HT"] / N_d
+            u = (y - moyenne) * dans / N_d
+            lineaire = estimateur_HT_plan(u, pik, plan, strates=strates if avec_strates else None)
+            ligne = lignes.loc["Hajek (moyenne)"]
+            assert ligne["Estimation"] == pytest.approx(moyenne, abs=1e-3)
+            assert ligne["Erreur standard"] == pytest.approx(lineaire["erreur_standard"], abs=1e-3)
+            assert ligne["n"] == dans.sum()
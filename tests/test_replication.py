@@ -0,0 +1,81 @@
+import numpy as np
+import pytest
+from scipy.linalg import hadamard
+
+import replication
+from replication import _ordre_hadamard, _signes_hadamard, poids_replication, variance_replication
+
+
+def _ligne(resultats, estimateur):
+    return resultats[resultats["Estimateur"].str.startswith(estimateur)].iloc[0]
+
+
+@pytest.mark.parametrize("H", [1, 2, 3, 7, 8, 15, 40])
+def test_signes_sylvester_egaux_a_hadamard_et_equilibres(H):
+    R = _ordre_hadamard(H)
+    signes = _signes_hadamard(0, R, H)
+    assert np.array_equal(signes, hadamard(R)[:, 1:H + 1].T)
+    assert np.all(signes.sum(axis=1) == 0)  # Chaque strate : moitié des réplications sur chaque UP
+    assert np.array_equal(signes @ signes.T, R * np.eye(H, dtype=int))  # Colonnes orthogonales
+    # Construction par blocs de réplications, dont un qui ne divise pas R
+    blocs = [_signes_hadamard(d, min(d + 3, R), H) for d in range(0, R, 3)]
+    assert np.array_equal(np.concatenate(blocs, axis=1), signes)
+
+
+def _plan_deux_up_par_strate(H=6, taille_up=4, graine=0):
+    rng = np.random.default_rng(graine)
+    strates = np.repeat(np.arange(H), 2 * taille_up)
+    psu = np.repeat(np.arange(2 * H), taille_up)
+    y = rng.normal(50, 10, len(psu))
+    poids = rng.uniform(5, 15, len(psu))
+    return y, poids, strates, psu
+
+
+@pytest.mark.parametrize("fay", [0.0, 0.3, 0.5])
+def test_brr_et_fay_egaux_a_la_variance_classique(fay):
+    y, poids, strates, psu = _plan_deux_up_par_strate()
+    # Variance classique à deux UP par strate : Σ_h (ŷ_h1 - ŷ_h2)² / 4, où ŷ_hi = 2 t_hi estime
+    # le total de la strate à partir de la seule UP i, soit Σ_h (t_h1 - t_h2)²
+    t_up = np.bincount(psu, weights=y * poids)
+    attendue = np.sum((2 * t_up[0::2] - 2 * t_up[1::2]) ** 2) / 4
+    resultats = variance_replication(y, poids, strates, psu, methode="brr", fay=fay)
+    assert _ligne(resultats, "Total")["Erreur standard"] == pytest.approx(np.sqrt(attendue), abs=1e-3)
+
+
+def test_brr_refuse_plus_de_deux_up_par_strate():
+    y, poids, strates, psu = _plan_deux_up_par_strate()
+    with pytest.raises(ValueError):
+        variance_replication(y, poids, strates, psu // 3 * 3, methode="brr")
+
+
+def test_jackknife_sas_egal_a_s2_sur_n():
+    rng = np.random.default_rng(1)
+    N, n = 1000, 40
+    y = rng.normal(100, 20, n)
+    resultats = variance_replication(y, np.full(n, N / n), methode="jackknife")
+    # Jackknife sans correction de population finie : N² s² / n
+    attendue = N ** 2 * np.var(y, ddof=1) / n
+    assert _ligne(resultats, "Total")["Erreur standard"] == pytest.approx(np.sqrt(attendue), abs=1e-3)
+
+
+@pytest.mark.parametrize("methode", ["bootstrap", "jackknife", "brr"])
+def test_parallele_identique_au_sequentiel(monkeypatch, methode):
+    y, poids, strates, psu = _plan_deux_up_par_strate(H=10)
+    options = dict(methode=methode, R=64, random_state=5, taille_bloc=5)
+    sequentiel = variance_replication(y, poids, strates, psu, n_jobs=1, **options)
+    monkeypatch.setattr(replication, "SEUIL_REPLICATION_PARALLELE", 0)  # Force les processus
+    parallele = variance_replication(y, poids, strates, psu, n_jobs=2, **options)
+    assert parallele.equals(sequentiel)
+
+
+def test_poids_replication_coherents_avec_variance_replication():
+    y, poids, strates, psu = _plan_deux_up_par_strate()
+    W = poids_replication(poids, strates, psu, methode="bootstrap", R=50, random_state=2, dtype=np.float64)
+    assert W.shape == (len(y), 50)
+    totaux_r = y @ W
+    attendue = np.mean((totaux_r - y @ poids) ** 2)  # c_r = 1/R
+    resultats = variance_replication(y, poids, strates, psu, methode="bootstrap", R=50, random_state=2)
+    assert _ligne(resultats, "Total")["Erreur standard"] == pytest.approx(np.sqrt(attendue), abs=1e-2)
+    # Les réplications construites par blocs sont celles de la matrice complète
+    assert np.allclose(poids_replication(poids, strates, psu, methode="bootstrap", R=50, random_state=2,
+                                         debut=10, fin=20, dtype=np.float64), W[:, 10:20])
@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from noyau_tirage import index_groupes
+from sondage_deux_degres import METHODES, _par_groupes_tri, _tirage_grappes, cluster
+
+
+def _base_grappes(n_grappes=6, taille=3):
+    return pd.DataFrame({
+        "grappe": np.repeat(np.arange(n_grappes), taille),
+        "Y": np.arange(n_grappes * taille, dtype=float),
+    })
+
+
+@pytest.mark.parametrize("method", METHODES)
+def test_frequences_inclusion_grappes_egales_prob(method):
+    # La fréquence d'inclusion de chaque grappe sur de nombreux tirages doit rejoindre Prob
+    n_grappes, size, repetitions = 6, 2, 4000
+    groupes = index_groupes(_base_grappes(n_grappes)["grappe"].to_numpy(), trier=True)
+    rng = np.random.default_rng(2024)
+    comptes = np.zeros(n_grappes)
+    probas = []
+    for _ in range(repetitions):
+        selection, prob = _tirage_grappes(groupes, size, method, rng)
+        tirees = np.unique(groupes.codes[selection])
+        comptes[tirees] += 1
+        probas.append(prob)
+    prob = np.concatenate(probas)
+    attendu = prob[0]
+    assert np.allclose(prob, attendu)  # Plan à probabilités égales entre grappes
+    ecart_type = np.sqrt(attendu * (1 - attendu) / repetitions)
+    assert np.all(np.abs(comptes / repetitions - attendu) < 5 * ecart_type)
+
+
+def test_grappes_avec_remise_probabilite_au_moins_une_fois():
+    sampled = cluster(_base_grappes(), "grappe", 3, method="sas_avec_remise", random_state=1)
+    assert np.allclose(sampled["Prob_1_stage"], 1 - (1 - 1 / 6) ** 3)
+    assert not sampled.index.duplicated().any()  # Grappes fusionnées : chaque ligne une fois
+
+
+def test_tri_par_groupes_sans_melange_de_groupes():
+    # Grand nombre de groupes : les cases retenues restent dans leur groupe
+    effectifs = np.full(200_000, 3)
+    debuts = np.concatenate([[0], np.cumsum(effectifs)[:-1]])
+    tailles = np.full(len(effectifs), 2)
+    cases, gid = _par_groupes_tri(debuts, effectifs, tailles, np.random.default_rng(0))
+    assert np.array_equal(cases // 3, gid)
+    assert np.array_equal(np.bincount(gid, minlength=len(effectifs)), tailles)
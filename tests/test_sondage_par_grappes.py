@@ -0,0 +1,43 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from noyau_tirage import generateur
+from sondage_par_grappes import methodes_tirage, tirage_bernoulli, tirage_selection_rejet, tirer_grappes
+
+
+# Versions en boucle Python, référence pour les tirages vectorisés
+def _bernoulli_boucle(N, n, random_state=None):
+    unif = generateur(random_state).uniform(0, 1, N)
+    return [i + 1 for i in range(N) if unif[i] < n / N][:n]
+
+
+def _selection_rejet_boucle(N, n, random_state=None):
+    rng = generateur(random_state)
+    echantillon, k, j = [], 1, 0
+    while j < n and k <= N:
+        if rng.uniform(0, 1) < (n - j) / (N - k + 1):
+            echantillon.append(k)
+            j += 1
+        k += 1
+    return echantillon
+
+
+@pytest.mark.parametrize("N, n", [(1, 1), (20, 5), (300, 40), (1000, 1000)])
+@pytest.mark.parametrize("graine", range(5))
+def test_tirages_vectorises_identiques_aux_boucles(N, n, graine):
+    np.testing.assert_array_equal(tirage_bernoulli(N, n, random_state=graine), _bernoulli_boucle(N, n, graine))
+    np.testing.assert_array_equal(tirage_selection_rejet(N, n, random_state=graine),
+                                  _selection_rejet_boucle(N, n, graine))
+
+
+@pytest.mark.parametrize("choix", sorted(methodes_tirage))
+def test_tirer_grappes_lignes_des_grappes_tirees(choix):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"Num": np.arange(200), "Grappe": rng.choice([f"g{k}" for k in range(15)], 200)})
+    grappes_tirees, echantillon = tirer_grappes(df, "Grappe", 4, methodes_tirage[choix][1], random_state=3)
+    assert len(grappes_tirees) <= 15
+    assert set(echantillon["Grappe"]) == set(grappes_tirees)
+    attendu = df[df["Grappe"].isin(grappes_tirees)]
+    assert sorted(echantillon["Num"]) == sorted(np.repeat(attendu["Num"].to_numpy(),
+                                                          [grappes_tirees.count(g) for g in attendu["Grappe"]]))
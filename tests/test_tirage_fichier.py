@@ -0,0 +1,52 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from tirage_fichier import reservoir_csv
+
+
+@pytest.fixture
+def fichier_stratifie(tmp_path):
+    rng = np.random.default_rng(0)
+    N = 1037
+    df = pd.DataFrame({"ID": np.arange(N), "Strate": rng.choice(["a", "b", "c", "d"], N, p=[0.5, 0.3, 0.19, 0.01]),
+                       "Y": rng.normal(size=N)})
+    chemin = tmp_path / "base.csv"
+    df.to_csv(chemin, sep=";", index=False)
+    return chemin, df
+
+
+@pytest.mark.parametrize("taille_bloc", [1, 7, 100, 5000])
+def test_reservoir_csv_taille_population_et_echantillon(fichier_stratifie, taille_bloc):
+    chemin, df = fichier_stratifie
+    echantillon, N = reservoir_csv(chemin, 30, taille_bloc=taille_bloc, random_state=1)
+    assert N == len(df)
+    assert len(echantillon) == 30
+    assert echantillon["ID"].is_unique
+    # Les lignes tirées sont celles du fichier, inchangées
+    pd.testing.assert_frame_equal(echantillon, df.set_index("ID").loc[echantillon["ID"]].reset_index())
+
+
+@pytest.mark.parametrize("taille_bloc", [1, 7, 100, 5000])
+def test_reservoir_csv_stratifie_N_h_a_travers_les_blocs(fichier_stratifie, taille_bloc):
+    chemin, df = fichier_stratifie
+    n_h = {"a": 20, "b": 10, "c": 5, "d": 50}
+    echantillon, N_h = reservoir_csv(chemin, n_h, col_strate="Strate", taille_bloc=taille_bloc, random_state=2)
+    assert N_h == df["Strate"].value_counts().to_dict()
+    tailles = echantillon["Strate"].value_counts().to_dict()
+    assert tailles == {h: min(n_h[h], N_h[h]) for h in N_h}
+    assert echantillon["ID"].is_unique
+    assert (df.set_index("ID").loc[echantillon["ID"], "Strate"].to_numpy() == echantillon["Strate"].to_numpy()).all()
+
+
+def test_reservoir_csv_inclusion_uniforme(tmp_path):
+    # Petit fichier lu en blocs de 6 lignes : les remplacements traversent les blocs
+    N, n, repetitions = 18, 5, 1000
+    chemin = tmp_path / "petit.csv"
+    pd.DataFrame({"ID": np.arange(N)}).to_csv(chemin, sep=";", index=False)
+    comptes = np.zeros(N)
+    for graine in range(repetitions):
+        echantillon, _ = reservoir_csv(chemin, n, taille_bloc=6, random_state=graine)
+        comptes[echantillon["ID"].to_numpy()] += 1
+    p = n / N
+    assert np.all(np.abs(comptes / repetitions - p) < 4 * np.sqrt(p * (1 - p) / repetitions))
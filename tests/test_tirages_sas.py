@@ -0,0 +1,202 @@
+import itertools
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from base_de_sondage import SamplingFrame
+from tirages_sas import (MODES_TIRAGE, SEUIL_TAUX_SONDAGE_DENSE, STRATIFICATION, allocation_multivariee,
+                         allocation_optimale, draw_by_draw, draw_by_draw_indices, repartition_neyman,
+                         reservoir_flux, reservoir_indices, reservoir_sampling, sas_sans_remise_indices)
+
+
+def _base_stratifiee(N=600):
+    rng = np.random.default_rng(0)
+    # Strates dans un ordre d'apparition différent de l'ordre trié
+    return pd.DataFrame({"Strate": rng.choice(["c", "a", "b"], N), "Y": rng.normal(size=N)})
+
+
+@pytest.mark.parametrize("mode", sorted(MODES_TIRAGE))
+def test_stratification_meme_echantillon_dataframe_et_base(mode):
+    df = _base_stratifiee()
+    depuis_df = STRATIFICATION(df, 10, mode=mode, random_state=7)
+    depuis_base = STRATIFICATION(SamplingFrame(df, col_strate="Strate"), 10, mode=mode, random_state=7)
+    pd.testing.assert_frame_equal(depuis_df, depuis_base)
+
+
+def test_stratification_avertit_et_ajuste_les_tailles():
+    df = pd.DataFrame({"Strate": ["a"] * 3 + ["b"] * 10, "Y": range(13)})
+    with pytest.warns(UserWarning, match="strate 'a' \\(5\\)"):
+        echantillon = STRATIFICATION(df, {"a": 5, "b": 4}, random_state=0)
+    assert echantillon["Strate"].value_counts().to_dict() == {"a": 3, "b": 4}
+
+    with pytest.warns(UserWarning, match="Aucun indice tiré pour la strate 'b'"):
+        echantillon = STRATIFICATION(df, {"a": 2}, random_state=0)
+    assert echantillon["Strate"].value_counts().to_dict() == {"a": 2}
+
+
+# --------------------------------------------------
+# Répartitions optimales : bornes, taille ou budget, optimalité par énumération exhaustive
+
+def _cas_repartition(graine, H=4):
+    rng = np.random.default_rng(graine)
+    N_h = rng.integers(3, 9, H)
+    S_h = rng.uniform(0.5, 5, H)
+    couts = rng.uniform(1, 4, H)
+    n_min = np.minimum(rng.integers(0, 3, H), N_h)
+    n_max = np.maximum(n_min, np.minimum(N_h, rng.integers(2, 9, H)))
+    grille = np.array(list(itertools.product(*[range(a, b + 1) for a, b in zip(n_min, n_max)])))
+    return rng, N_h, S_h, couts, n_min, n_max, grille
+
+
+def _objectif(A, n):
+    # Σ_h A_h / n_h, une strate vide de poids non nul comptant pour +inf
+    n = np.atleast_2d(n).astype(float)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(A > 0, A / n, 0.0).sum(axis=1)
+
+
+@pytest.mark.parametrize("graine", range(20))
+def test_allocation_optimale_taille_fixe_egale_enumeration(graine):
+    rng, N_h, S_h, couts, n_min, n_max, grille = _cas_repartition(graine)
+    n_total = int(rng.integers(n_min.sum(), n_max.sum() + 1))
+    n = allocation_optimale(N_h, S_h, n_total=n_total, couts=couts, n_min=n_min, n_max=n_max)
+
+    assert n.sum() == n_total
+    assert np.all(n_min <= n) and np.all(n <= n_max) and np.all(n <= N_h)
+    # Objectif de Neyman pondéré par les coûts : Σ_h N_h² S_h² / (c_h n_h)
+    A = N_h ** 2 * S_h ** 2 / couts
+    realisables = grille[grille.sum(axis=1) == n_total]
+    assert _objectif(A, n)[0] == pytest.approx(_objectif(A, realisables).min(), rel=1e-9)
+
+
+@pytest.mark.parametrize("graine", range(20))
+def test_allocation_optimale_budget_realisable(graine):
+    rng, N_h, S_h, couts, n_min, n_max, _ = _cas_repartition(graine)
+    budget = float(rng.uniform(couts @ np.maximum(n_min, 1), couts @ n_max))
+    n = allocation_optimale(N_h, S_h, couts=couts, budget=budget, n_min=n_min, n_max=n_max)
+
+    assert couts @ n <= budget + 1e-9
+    assert np.all(n_min <= n) and np.all(n <= n_max)
+    assert np.all(n >= 1)  # Le budget permet une unité par strate : aucune n'est vide
+    # Aucune unité supplémentaire n'est encore finançable
+    assert np.all((n == n_max) | (couts > budget - couts @ n))
+
+
+@pytest.mark.parametrize("graine", range(20))
+def test_allocation_multivariee_respecte_les_cv(graine):
+    rng, N_h, _, couts, n_min, n_max, _ = _cas_repartition(graine)
+    S_hj = rng.uniform(0.5, 5, (len(N_h), 2))
+    totaux = np.array([1.0, 1.2]) * (N_h @ rng.uniform(5, 10, len(N_h)))
+    cv_cibles = np.array([0.1, 0.15])
+    try:
+        n = allocation_multivariee(N_h, S_hj, totaux, cv_cibles, couts=couts, n_min=n_min, n_max=n_max)
+    except ValueError:
+        pytest.skip("CV inatteignables avec ces bornes")
+
+    assert np.all(n_min <= n) and np.all(n <= n_max)
+    N = N_h[:, None].astype(float)
+    variances = (N ** 2 * S_hj ** 2 * (1 / n[:, None] - 1 / N)).sum(axis=0)
+    assert np.all(np.sqrt(variances) / totaux <= cv_cibles * (1 + 1e-12))
+
+
+def test_repartition_neyman_sur_la_base():
+    df = _base_stratifiee(2000)
+    df["Y"] = df["Y"] * df["Strate"].map({"a": 1, "b": 5, "c": 20})
+    tailles = repartition_neyman(df, 100, "Y", n_min=5, n_max=60)
+    assert sum(tailles.values()) == 100
+    assert all(5 <= n <= 60 for n in tailles.values())
+    assert tailles["c"] > tailles["b"] > tailles["a"]
+
+
+# --------------------------------------------------
+# Draw-by-draw (Fisher–Yates partiel)
+
+@pytest.mark.parametrize("N, n", [(1, 1), (10, 0), (10, 3), (10, 10), (100_000, 10_000)])
+def test_draw_by_draw_indices_distincts(N, n):
+    positions = draw_by_draw_indices(N, n, random_state=5)
+    assert len(positions) == n
+    assert len(np.unique(positions)) == n
+    assert np.all((positions >= 0) & (positions < N))
+
+
+def test_draw_by_draw_public_en_base_1_et_reproductible():
+    np.testing.assert_array_equal(draw_by_draw(50, 20, random_state=9), draw_by_draw_indices(50, 20, random_state=9) + 1)
+
+
+def test_draw_by_draw_inclusion_uniforme():
+    N, n, repetitions = 8, 3, 20000
+    comptes = np.zeros(N)
+    for graine in range(repetitions):
+        comptes[draw_by_draw_indices(N, n, random_state=graine)] += 1
+    p = n / N
+    assert np.all(np.abs(comptes / repetitions - p) < 4 * np.sqrt(p * (1 - p) / repetitions))
+
+
+def test_draw_by_draw_refuse_n_superieur_a_N():
+    with pytest.raises(ValueError):
+        draw_by_draw_indices(3, 4)
+
+
+# --------------------------------------------------
+# SAS sans remise : permutation dense ou tirages avec rejet des doublons selon n/N
+
+@pytest.mark.parametrize("N, n", [(100, 3), (100, 10), (100, 11), (100, 60), (100, 100), (10 ** 9, 1000)])
+def test_sas_sans_remise_sans_doublons(N, n):
+    positions = sas_sans_remise_indices(N, n, random_state=2)
+    assert len(positions) == n
+    assert len(np.unique(positions)) == n
+    assert np.all((positions >= 0) & (positions < N))
+
+
+@pytest.mark.parametrize("n", [3, 6])
+def test_sas_sans_remise_inclusion_n_sur_N(n):
+    # Taux de sondage de part et d'autre du seuil de la permutation dense
+    N, repetitions = 40, 20000
+    assert (n / N > SEUIL_TAUX_SONDAGE_DENSE) == (n == 6)
+    comptes = np.zeros(N)
+    for graine in range(repetitions):
+        comptes[sas_sans_remise_indices(N, n, random_state=graine)] += 1
+    p = n / N
+    assert np.all(np.abs(comptes / repetitions - p) < 4 * np.sqrt(p * (1 - p) / repetitions))
+
+
+# --------------------------------------------------
+# Reservoir sampling par sauts géométriques (algorithme L)
+
+@pytest.mark.parametrize("N, n", [(5, 5), (5, 8), (10, 0), (50, 7), (100_000, 300)])
+def test_reservoir_indices_distincts(N, n):
+    positions = reservoir_indices(N, n, random_state=3)
+    assert len(positions) == min(n, N)
+    assert len(np.unique(positions)) == len(positions)
+    assert np.all((positions >= 0) & (positions < N))
+
+
+def test_reservoir_indices_inclusion_uniforme():
+    N, n, repetitions = 30, 4, 20000
+    comptes = np.zeros(N)
+    for graine in range(repetitions):
+        comptes[reservoir_indices(N, n, random_state=graine)] += 1
+    p = n / N
+    assert np.all(np.abs(comptes / repetitions - p) < 4 * np.sqrt(p * (1 - p) / repetitions))
+
+
+def test_reservoir_flux_inclusion_uniforme_et_meme_tirage_que_les_indices():
+    N, n, repetitions = 25, 3, 20000
+    comptes = np.zeros(N)
+    for graine in range(repetitions):
+        reservoir = reservoir_flux((f"u{k}" for k in range(N)), n, random_state=graine)
+        assert len(set(reservoir)) == n
+        comptes[[int(u[1:]) for u in reservoir]] += 1
+    p = n / N
+    assert np.all(np.abs(comptes / repetitions - p) < 4 * np.sqrt(p * (1 - p) / repetitions))
+
+    # Même suite de sauts sur un flux et sur les indices 0..N-1
+    np.testing.assert_array_equal(reservoir_flux(range(1000), 20, random_state=6),
+                                  reservoir_indices(1000, 20, random_state=6))
+    np.testing.assert_array_equal(reservoir_sampling(1000, 20, random_state=6),
+                                  reservoir_indices(1000, 20, random_state=6) + 1)
+
+
+def test_reservoir_flux_court():
+    assert reservoir_flux(iter("abc"), 5, random_state=0) == ["a", "b", "c"]
@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from unequal_prob_sampling import (construire_table_alias, piar_alias_indices, pisr_sunter_indices,
+                                   pisr_systematique, pisr_systematique_indices)
+
+
+def _pi_proportionnelles(N, n, graine=0):
+    # π_i = n·x_i/Σx, toutes inférieures à 1
+    x = np.random.default_rng(graine).uniform(1, 3, N)
+    return n * x / x.sum()
+
+
+@pytest.mark.parametrize("N, n", [(10, 1), (10, 4), (57, 9), (1000, 100)])
+def test_systematique_taille_exacte_n(N, n):
+    pi = _pi_proportionnelles(N, n)
+    for graine in range(50):
+        positions = pisr_systematique_indices(pi, n, random_state=graine)
+        assert len(positions) == n
+        assert len(np.unique(positions)) == n
+        assert np.all(np.diff(positions) > 0)
+
+
+def test_systematique_probabilites_inclusion():
+    N, n, repetitions = 12, 4, 20000
+    pi = _pi_proportionnelles(N, n)
+    comptes = np.zeros(N)
+    for graine in range(repetitions):
+        comptes[pisr_systematique_indices(pi, n, random_state=graine)] += 1
+    ecart_type = np.sqrt(pi * (1 - pi) / repetitions)
+    assert np.all(np.abs(comptes / repetitions - pi) < 4 * ecart_type)
+
+
+def test_systematique_dataframe_renvoie_les_lignes_et_leurs_pi():
+    N, n = 200, 15
+    df = pd.DataFrame({"ID": np.arange(1, N + 1), "pi": _pi_proportionnelles(N, n)})
+    echantillon = pisr_systematique(df, n, "ID", "pi", random_state=3)
+    positions = pisr_systematique_indices(df["pi"].to_numpy(), n, random_state=3)
+    assert len(echantillon) == n
+    np.testing.assert_array_equal(echantillon["ID"], positions + 1)
+    np.testing.assert_allclose(echantillon["pi"], df["pi"].to_numpy()[positions])
+
+
+# --------------------------------------------------
+# Méthode des alias (Walker/Vose)
+
+def _poids_alias():
+    rng = np.random.default_rng(1)
+    return [
+        rng.uniform(0.1, 10, 50),
+        rng.pareto(1.5, 200) + 0.01,
+        np.array([1.0, 0.0, 3.0, 0.0, 6.0]),
+        np.array([100.0] + [1.0] * 30),
+        np.ones(7),
+    ]
+
+
+@pytest.mark.parametrize("poids", _poids_alias())
+def test_table_alias_distribution_implicite_egale_p(poids):
+    seuils, alias = construire_table_alias(poids)
+    N = len(poids)
+    # Chaque case (choisie avec probabilité 1/N) garde sa propre unité avec probabilité seuil,
+    # et renvoie vers son alias sinon
+    implicite = (seuils + np.bincount(alias, weights=1.0 - seuils, minlength=N)) / N
+    np.testing.assert_allclose(implicite, poids / poids.sum(), atol=1e-12)
+    assert np.all((seuils >= 0) & (seuils <= 1 + 1e-12))
+
+
+def test_piar_alias_frequences_de_tirage():
+    poids = np.array([5.0, 1.0, 0.0, 2.0, 12.0, 0.5])
+    p = poids / poids.sum()
+    seuils, alias = construire_table_alias(poids)
+    n = 200_000
+    frequences = np.bincount(piar_alias_indices(seuils, alias, n, random_state=4), minlength=len(p)) / n
+    assert frequences[2] == 0
+    assert np.all(np.abs(frequences - p) < 4 * np.sqrt(p * (1 - p) / n) + 1e-12)
+
+
+# --------------------------------------------------
+# Méthode de Sunter (sélection-rejet généralisée)
+
+@pytest.mark.parametrize("N, n", [(10, 3), (40, 7), (300, 50)])
+def test_sunter_taille_fixe_n(N, n):
+    pi = _pi_proportionnelles(N, n, graine=2)
+    for graine in range(50):
+        positions = pisr_sunter_indices(pi, n, random_state=graine)
+        assert len(positions) == n
+        assert len(np.unique(positions)) == n
+
+
+def test_sunter_probabilites_inclusion():
+    N, n, repetitions = 10, 3, 20000
+    pi = _pi_proportionnelles(N, n, graine=2)
+    comptes = np.zeros(N)
+    for graine in range(repetitions):
+        comptes[pisr_sunter_indices(pi, n, random_state=graine)] += 1
+    ecart_type = np.sqrt(pi * (1 - pi) / repetitions)
+    assert np.all(np.abs(comptes / repetitions - pi) < 4 * ecart_type)
+
+
+def test_sunter_pi_nulles_ou_egales_a_un():
+    pi = np.array([1.0, 0.0, 0.4, 0.6, 1.0, 0.0, 0.25, 0.75])
+    for graine in range(200):
+        positions = pisr_sunter_indices(pi, 4, random_state=graine)
+        assert len(positions) == 4
+        assert {0, 4} <= set(positions.tolist())
+        assert not {1, 5} & set(positions.tolist())
+
+
+def test_sunter_cumuls_de_la_base_identiques():
+    pi = _pi_proportionnelles(500, 40, graine=3)
+    np.testing.assert_array_equal(pisr_sunter_indices(pi, 40, random_state=8, cumuls=np.cumsum(pi)),
+                                  pisr_sunter_indices(pi, 40, random_state=8))
@@ -0,0 +1,132 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional, Tuple, Union
+from noyau_tirage import EtatAleatoire, generateur
+
+# --------------------------------------------------
+# Nombre de lignes lues à la fois dans le fichier
+TAILLE_BLOC_LECTURE = 100_000
+
+# --------------------------------------------------
+# Nombre maximal de remplacements futurs préparés à la fois pour chaque réservoir
+TAILLE_LOT_SAUTS = 1024
+
+# Plafond des sauts, bien au-delà de toute taille de fichier (évite les débordements)
+SAUT_MAX = 10 ** 15
+
+# --------------------------------------------------
+# État d'un réservoir (algorithme L) alimenté bloc par bloc
+def _nouveau_reservoir():
+    return {"lignes": None, "vus": 0, "W": None, "dernier": None,
+            "positions": np.empty(0, dtype=np.int64), "emplacements": np.empty(0, dtype=np.int64)}
+
+def _preparer_sauts(etat, n, rng):
+    # Prépare un lot de remplacements futurs : W évolue par facteurs indépendants u^(1/n),
+    # et chaque saut suit une loi géométrique de paramètre W (algorithme L).
+    # Un lot de n remplacements fait avancer le flux d'un facteur e environ.
+    taille_lot = min(TAILLE_LOT_SAUTS, n)
+    facteurs = np.exp(np.log(1.0 - rng.uniform(size=taille_lot)) / n)
+    W = etat["W"] * np.cumprod(np.concatenate(([1.0], facteurs[:-1])))
+    with np.errstate(divide='ignore', over='ignore'):
+        sauts = np.floor(np.log(1.0 - rng.uniform(size=taille_lot)) / np.log1p(-W))
+    sauts = np.minimum(np.nan_to_num(sauts, nan=0.0), SAUT_MAX).astype(np.int64)
+    positions = etat["dernier"] + np.cumsum(sauts + 1)
+    etat["positions"] = np.concatenate([etat["positions"], positions])
+    etat["emplacements"] = np.concatenate([etat["emplacements"], rng.integers(0, n, size=taille_lot)])
+    etat["W"] = W[-1] * facteurs[-1]
+    etat["dernier"] = positions[-1]
+
+def _alimenter_reservoir(etat, bloc, lignes_bloc, n, rng):
+    # lignes_bloc : positions, dans bloc, des lignes de ce flux (dans l'ordre du fichier)
+    m = len(lignes_bloc)
+    debut = etat["vus"]
+    etat["vus"] += m
+    if n <= 0 or m == 0:
+        return
+
+    # Phase de remplissage : les n premières lignes du flux entrent directement
+    deja = 0 if etat["lignes"] is None else len(etat["lignes"])
+    if deja < n:
+        a_prendre = min(n - deja, m)
+        entree = bloc.iloc[lignes_bloc[:a_prendre]]
+        etat["lignes"] = entree if etat["lignes"] is None else pd.concat([etat["lignes"], entree])
+        if len(etat["lignes"]) < n:
+            return
+        etat["W"] = np.exp(np.log(1.0 - rng.uniform()) / n)
+        etat["dernier"] = debut + a_prendre - 1
+
+    # Phase de remplacement : seules les positions visées par les sauts sont lues
+    while etat["dernier"] < etat["vus"]:
+        _preparer_sauts(etat, n, rng)
+    k = np.searchsorted(etat["positions"], etat["vus"])
+    positions, emplacements = etat["positions"][:k] - debut, etat["emplacements"][:k]
+    etat["positions"], etat["emplacements"] = etat["positions"][k:], etat["emplacements"][k:]
+    if k == 0:
+        return
+
+    # Plusieurs remplacements d'un même emplacement : seul le dernier compte
+    emplacements_inv, derniers = np.unique(emplacements[::-1], return_index=True)
+    positions = positions[::-1][derniers]
+    choix = np.arange(n)
+    choix[emplacements_inv] = n + np.arange(len(positions))
+
+    # Une seule extraction des lignes du bloc entrant dans le réservoir
+    candidats = pd.concat([etat["lignes"], bloc.iloc[lignes_bloc[positions]]])
+    etat["lignes"] = candidats.iloc[choix]
+
+# --------------------------------------------------
+# Reservoir sampling (éventuellement stratifié) directement depuis un fichier CSV
+def reservoir_csv(
+    chemin: str,
+    n: Union[int, Dict],
+    sep: str = ";",
+    col_strate: Optional[str] = None,
+    taille_bloc: int = TAILLE_BLOC_LECTURE,
+    random_state: EtatAleatoire = None,
+    **options_lecture
+) -> Tuple[pd.DataFrame, Union[int, Dict]]:
+    """
+    Tire un échantillon aléatoire simple sans remise (par strate si col_strate est fourni)
+    en lisant le fichier par blocs : seuls l'échantillon et un bloc sont en mémoire.
+
+    Args:
+        chemin (str): Chemin du fichier CSV.
+        n (int | dict): Taille de l'échantillon, ou taille par strate ({strate: n_h}).
+            Un entier avec col_strate donne la même taille à chaque strate.
+        sep (str): Séparateur du fichier.
+        col_strate (str, optionnel): Colonne de stratification.
+        taille_bloc (int): Nombre de lignes lues à chaque bloc.
+        random_state (int | SeedSequence | Generator | None): Graine ou générateur à utiliser.
+        **options_lecture: Options supplémentaires transmises à pd.read_csv.
+
+    Returns:
+        Tuple[pd.DataFrame, int | dict]: L'échantillon et la taille N de la population
+        parcourue (ou {strate: N_h}), à utiliser ensuite avec les estimateurs de estimation.py.
+    """
+    rng = generateur(random_state)
+
+    reservoirs = {}
+    for bloc in pd.read_csv(chemin, sep=sep, chunksize=taille_bloc, **options_lecture):
+        if col_strate is None:
+            etat = reservoirs.setdefault(None, _nouveau_reservoir())
+            _alimenter_reservoir(etat, bloc, np.arange(len(bloc)), n, rng)
+            continue
+
+        if col_strate not in bloc.columns:
+            raise ValueError(f"La colonne '{col_strate}' est absente du fichier.")
+
+        # Un seul passage par bloc pour répartir les lignes entre strates
+        for strate, positions in bloc.groupby(col_strate, sort=False).indices.items():
+            n_h = n.get(strate, 0) if isinstance(n, dict) else n
+            etat = reservoirs.setdefault(strate, _nouveau_reservoir())
+            _alimenter_reservoir(etat, bloc, positions, n_h, rng)
+
+    echantillons = [etat["lignes"] for etat in reservoirs.values() if etat["lignes"] is not None]
+    echantillon = pd.concat(echantillons) if echantillons else pd.DataFrame()
+
+    if col_strate is None:
+        N = reservoirs[None]["vus"] if reservoirs else 0
+    else:
+        N = {strate: etat["vus"] for strate, etat in reservoirs.items()}
+
+    return echantillon.reset_index(drop=True), N
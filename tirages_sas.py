@@ -1,185 +1,640 @@
-import random
+import os
+import heapq
+import warnings
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from itertools import islice
 import pandas as pd
-from typing import Dict
+from typing import Dict, Optional
+from noyau_tirage import ResultatTirage, IndexGroupes, multiplicites, index_groupes, generateur, graines_independantes
+from base_de_sondage import SamplingFrame, statistiques_strates
+
+# Dans tout le module, random_state accepte un entier, une np.random.SeedSequence ou un
+# np.random.Generator (utilisé tel quel) : aucun état aléatoire global n'est modifié.
+
+# --------------------------------------------------
+# Nombre d'unités examinées par bloc vectorisé dans la sélection-rejet
+TAILLE_BLOC_SELECTION_REJET = 1 << 16
+
+# --------------------------------------------------
+# Taux de sondage n/N au-delà duquel le SAS sans remise passe par une permutation dense
+SEUIL_TAUX_SONDAGE_DENSE = 0.1
+
+# --------------------------------------------------
+# SAS sans remise sur indices 0..N-1, sans matérialiser la population
+def sas_sans_remise_indices(N, n, random_state=None):
+    rng = generateur(random_state)
+    if n > N:
+        raise ValueError(f"Impossible de tirer {n} unités sans remise parmi {N}.")
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    # Taux de sondage élevé : permutation dense de la population
+    if n / N > SEUIL_TAUX_SONDAGE_DENSE:
+        return rng.permutation(N)[:n].astype(np.int64)
+
+    # Taux de sondage faible : tirages avec remise puis rejet des doublons (mémoire O(n)).
+    # On garde la première occurrence de chaque valeur, dans l'ordre des tirages.
+    echantillon = np.empty(0, dtype=np.int64)
+    while len(echantillon) < n:
+        manquants = n - len(echantillon)
+        candidats = rng.integers(0, N, size=int(manquants * 1.1) + 8, dtype=np.int64)
+        tous = np.concatenate([echantillon, candidats])
+        _, premieres = np.unique(tous, return_index=True)
+        echantillon = tous[np.sort(premieres)]
+    return echantillon[:n]
+
+# --------------------------------------------------
+# SAS avec remise sur indices 0..N-1, sans matérialiser la population
+def sas_avec_remise_indices(N, n, random_state=None):
+    rng = generateur(random_state)
+    return rng.integers(0, N, size=n, dtype=np.int64)
+
+# --------------------------------------------------
+# Les tirages publics (indices 1..N) acceptent pour N un entier ou directement la base
+# (DataFrame ou SamplingFrame) : N est alors son nombre de lignes
+def _taille_population(N):
+    return len(N) if isinstance(N, (pd.DataFrame, SamplingFrame)) else N
 
 # --------------------------------------------------
 # SAS sans remise (fonction de base avec vecteur unique)
 def sas_sans_remise_base(N, n, random_state=None):
-    if random_state is not None:
-        random.seed(random_state)
-    numero = list(range(1, N+1))
-    echantillon = random.sample(numero, n)  # tirage sans remise
-    return echantillon
+    return sas_sans_remise_indices(_taille_population(N), n, random_state=random_state) + 1
 
 # --------------------------------------------------
 # SAS avec remise (fonction de base)
 def sas_avec_remise_base(N, n, random_state=None):
-    if random_state is not None:
-        random.seed(random_state)
-    numero = list(range(1, N+1))
-    echantillon = [random.choice(numero) for _ in range(n)]
-    return echantillon
+    return sas_avec_remise_indices(_taille_population(N), n, random_state=random_state) + 1
+
+# --------------------------------------------------
+# Draw-by-draw sur indices 0..N-1 : Fisher–Yates partiel, en O(n)
+def draw_by_draw_indices(N, n, random_state=None):
+    rng = generateur(random_state)
+    if n > N:
+        raise ValueError(f"Impossible de tirer {n} unités sans remise parmi {N}.")
+
+    # Au tirage k, on choisit uniformément parmi les N - k unités non encore tirées :
+    # la position j (k <= j < N) de la permutation virtuelle est échangée avec la position k.
+    # Seules les positions déjà échangées sont stockées (dictionnaire), d'où une mémoire O(n).
+    choix = rng.integers(np.arange(n, dtype=np.int64), N, dtype=np.int64).tolist() if n > 0 else []
+    echanges = {}
+    echantillon = []
+    for k, j in enumerate(choix):
+        echantillon.append(echanges.get(j, j))
+        echanges[j] = echanges.get(k, k)
+    return np.asarray(echantillon, dtype=np.int64)
 
 # --------------------------------------------------
 # Tirage draw-by-draw sans remise
 def draw_by_draw(N, n, random_state=None):
-    if random_state is not None:
-        random.seed(random_state)
-    numero = list(range(1, N+1))
-    echantillon = []
-    for _ in range(n):
-        choix = random.choice([x for x in numero if x not in echantillon])
-        echantillon.append(choix)
-    return echantillon
+    return draw_by_draw_indices(_taille_population(N), n, random_state=random_state) + 1
 
 # --------------------------------------------------
 # Tirage bernoullien
 def tirage_bernoulli(N, n, random_state=None):
-    if random_state is not None:
-        np.random.seed(random_state)
+    rng = generateur(random_state)
+    N = _taille_population(N)
+    if N == 0:
+        return np.empty(0, dtype=np.int64)
     seuil = n / N
-    unif = np.random.uniform(0, 1, N)
-    echantillon = [i+1 for i in range(N) if unif[i] < seuil]
-    return echantillon
+    unif = rng.uniform(0, 1, N)
+    return np.flatnonzero(unif < seuil) + 1
 
 # --------------------------------------------------
 # Tirage par tri aléatoire
 def tri_aleatoire(N, n, random_state=None):
-    if random_state is not None:
-        np.random.seed(random_state)
-    unif = np.random.uniform(0, 1, N)
-    indices_tries = np.argsort(unif)[:n]
-    echantillon = [i+1 for i in indices_tries]
-    return echantillon
+    rng = generateur(random_state)
+    N = _taille_population(N)
+    unif = rng.uniform(0, 1, N)
+    return np.argsort(unif)[:n] + 1
 
 # --------------------------------------------------
 # Sélection-rejet
 def selection_rejet(N, n, random_state=None):
-    if random_state is not None:
-        np.random.seed(random_state)
+    rng = generateur(random_state)
+    N = _taille_population(N)
+    # L'unité k est retenue si u_k < (n - j) / (N - k + 1), soit u_k (N - k + 1) < n - j.
+    # Comme n - j ne fait que décroître, seules les unités vérifiant la condition avec j en
+    # début de bloc sont examinées une à une.
     echantillon = []
-    k = 1
     j = 0
-    while j < n and k <= N:
-        u = np.random.uniform()
-        if u < (n - j) / (N - k + 1):
-            echantillon.append(k)
-            j += 1
-        k += 1
-    return echantillon
+    for debut in range(1, N + 1, TAILLE_BLOC_SELECTION_REJET):
+        if j >= n:
+            break
+        k = np.arange(debut, min(debut + TAILLE_BLOC_SELECTION_REJET, N + 1))
+        c = rng.uniform(size=len(k)) * (N - k + 1)
+        candidats = np.flatnonzero(c < n - j)
+        for position, c_k in zip(k[candidats].tolist(), c[candidats].tolist()):
+            if j >= n:
+                break
+            if c_k < n - j:
+                echantillon.append(position)
+                j += 1
+    return np.asarray(echantillon, dtype=np.int64)
+
+# --------------------------------------------------
+# Reservoir sampling par sauts géométriques (algorithme L de Li) sur un flux quelconque
+def reservoir_flux(flux, n, random_state=None):
+    rng = generateur(random_state)
+    iterateur = iter(flux)
+    reservoir = list(islice(iterateur, n))
+    if len(reservoir) < n or n == 0:
+        return reservoir
+
+    # W suit la loi du plus grand des n rangs aléatoires du réservoir ; le nombre d'éléments
+    # à sauter avant le prochain remplacement est géométrique de paramètre W.
+    # islice consomme les éléments sautés sans boucle Python.
+    fin = object()
+    W = np.exp(np.log(1.0 - rng.uniform()) / n)
+    while True:
+        saut = int(np.floor(np.log(1.0 - rng.uniform()) / np.log1p(-W)))
+        element = next(islice(iterateur, saut, None), fin)
+        if element is fin:
+            return reservoir
+        reservoir[rng.integers(0, n)] = element
+        W *= np.exp(np.log(1.0 - rng.uniform()) / n)
+
+# --------------------------------------------------
+# Reservoir sampling (algorithme L) sur indices 0..N-1 : O(n(1 + log(N/n))) tirages
+def reservoir_indices(N, n, random_state=None):
+    rng = generateur(random_state)
+    if n >= N:
+        return np.arange(N, dtype=np.int64)
+    if n <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    reservoir = list(range(n))
+    i = n - 1
+    W = np.exp(np.log(1.0 - rng.uniform()) / n)
+    while True:
+        i += int(np.floor(np.log(1.0 - rng.uniform()) / np.log1p(-W))) + 1
+        if i >= N:
+            return np.asarray(reservoir, dtype=np.int64)
+        reservoir[rng.integers(0, n)] = i
+        W *= np.exp(np.log(1.0 - rng.uniform()) / n)
 
 # --------------------------------------------------
 # Mise à jour d'échantillon (type Reservoir Sampling)
 def reservoir_sampling(N, n, random_state=None):
-    if random_state is not None:
-        random.seed(random_state)
-    selection = list(range(1, n+1))
-    for k in range(n+1, N+1):
-        u = random.uniform(0, 1)
-        if u < n / k:
-            r = random.randint(0, n-1)
-            selection[r] = k
-    return selection
+    return reservoir_indices(_taille_population(N), n, random_state=random_state) + 1
 
 # --------------------------------------------------
-# STRATIFICATION AVEC TOUTES LES MÉTHODES DE TIRAGE
-def STRATIFICATION(db, n_par_strate, mode="sas_sans_remise", random_state=None):
-    if 'Strate' not in db.columns:
-        raise ValueError("La colonne 'Strate' est requise dans la base.")
+# Méthodes de tirage disponibles pour STRATIFICATION
+MODES_TIRAGE = {
+    "sas_sans_remise": sas_sans_remise_base,
+    "sas_avec_remise": sas_avec_remise_base,
+    "bernoulli": tirage_bernoulli,
+    "tri_aleatoire": tri_aleatoire,
+    "selection_rejet": selection_rejet,
+    "draw_by_draw": draw_by_draw,
+    "reservoir": reservoir_sampling,
+}
 
-    def tirage(N, taille, seed):
-        if mode == "sas_sans_remise":
-            return sas_sans_remise_base(N, taille, random_state=seed)
-        elif mode == "sas_avec_remise":
-            return sas_avec_remise_base(N, taille, random_state=seed)
-        elif mode == "bernoulli":
-            return tirage_bernoulli(N, taille, random_state=seed)
-        elif mode == "tri_aleatoire":
-            return tri_aleatoire(N, taille, random_state=seed)
-        elif mode == "selection_rejet":
-            return selection_rejet(N, taille, random_state=seed)
-        elif mode == "draw_by_draw":
-            return draw_by_draw(N, taille, random_state=seed)
-        elif mode == "reservoir":
-            return reservoir_sampling(N, taille, random_state=seed)
-        else:
-            raise ValueError("Mode de tirage inconnu : " + mode)
+# --------------------------------------------------
+# Tirage d'une strate selon le mode choisi (indices 1..N)
+def tirage_selon_mode(mode, N, n, random_state=None):
+    if mode not in MODES_TIRAGE:
+        raise ValueError("Mode de tirage inconnu : " + mode)
+    return MODES_TIRAGE[mode](N, n, random_state=random_state)
+
+# --------------------------------------------------
+# Parallélisation du tirage stratifié
+# Modes entièrement vectorisés : sur de grandes strates, NumPy relâche le GIL et des threads
+# suffisent. Les autres modes (boucle Python) et les nombreuses petites strates (coût d'appel
+# dominant, GIL tenu) passent par des processus.
+MODES_VECTORISES = {"sas_sans_remise", "sas_avec_remise", "bernoulli", "tri_aleatoire"}
 
-    strates = db['Strate'].unique()
-    stratified_sample = pd.DataFrame()
-    base_seed = random_state if random_state is not None else np.random.randint(0, 10000)
+# Effectif moyen des strates à partir duquel un mode vectorisé est confié à des threads
+SEUIL_STRATE_THREADS = 10_000
 
-    for i, strate in enumerate(strates):
-        sous_base = db[db['Strate'] == strate].reset_index(drop=True)
+# En dessous de ce nombre total d'unités, le tirage séquentiel est plus rapide
+SEUIL_TIRAGE_PARALLELE = 200_000
+
+def _tirer_strates(taches):
+    # Tâche élémentaire : liste de (mode, N_h, n_h, graine) -> positions 0-based dans chaque strate.
+    # Fonction de niveau module pour pouvoir être envoyée à un processus.
+    return [np.asarray(tirage_selon_mode(mode, N_h, taille, random_state=graine), dtype=np.int64) - 1
+            for mode, N_h, taille, graine in taches]
+
+def _executer_taches(taches, mode, n_jobs):
+    # Chaque strate dispose de sa propre graine : le résultat ne dépend ni du nombre de
+    # travailleurs ni de l'ordre d'exécution. Les résultats sont rendus dans l'ordre des strates.
+    N_total = sum(t[1] for t in taches)
+    if n_jobs is None:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = min(n_jobs, len(taches))
+    if n_jobs <= 1 or N_total < SEUIL_TIRAGE_PARALLELE:
+        return _tirer_strates(taches)
+
+    # Lots équilibrés en nombre d'unités (les plus grosses strates d'abord), pour limiter
+    # le coût de sérialisation quand il y a beaucoup de petites strates
+    lots = [[] for _ in range(n_jobs)]
+    charges = np.zeros(n_jobs)
+    for i in sorted(range(len(taches)), key=lambda i: -taches[i][1]):
+        k = int(np.argmin(charges))
+        lots[k].append(i)
+        charges[k] += taches[i][1] + 1
+    lots = [lot for lot in lots if lot]
+
+    par_threads = mode in MODES_VECTORISES and N_total / len(taches) >= SEUIL_STRATE_THREADS
+    executeur = ThreadPoolExecutor if par_threads else ProcessPoolExecutor
+    resultats = [None] * len(taches)
+    with executeur(max_workers=len(lots)) as pool:
+        futurs = [(lot, pool.submit(_tirer_strates, [taches[i] for i in lot])) for lot in lots]
+        for lot, futur in futurs:
+            for i, indices in zip(lot, futur.result()):
+                resultats[i] = indices
+    return resultats
+
+# --------------------------------------------------
+# Noyau du tirage stratifié : positions, π_i et multiplicités
+def tirage_stratifie_indices(strates, n_par_strate, mode="sas_sans_remise", random_state=None, n_jobs=1) -> ResultatTirage:
+    if mode not in MODES_TIRAGE:
+        raise ValueError("Mode de tirage inconnu : " + mode)
+
+    # Une seule passe sur la base : codes des strates et positions regroupées par strate
+    # (index déjà construit si l'on reçoit celui d'une SamplingFrame). Les strates sont
+    # numérotées dans l'ordre trié, comme dans une SamplingFrame : chaque strate reçoit le même
+    # flux aléatoire quel que soit le type de base
+    groupes = strates if isinstance(strates, IndexGroupes) else index_groupes(strates, trier=True)
+    effectifs = groupes.effectifs
+    graines = graines_independantes(random_state, len(groupes.modalites))
+
+    tailles = []
+    for i, strate in enumerate(groupes.modalites):
+        N_h = int(effectifs[i])
         taille = n_par_strate.get(strate, 0) if isinstance(n_par_strate, dict) else n_par_strate
-        
+
         # Vérifier que la taille de l'échantillon n'excède pas le nombre d'éléments dans la strate
-        if taille > len(sous_base):
-            print(f"Avertissement : La taille de l'échantillon pour la strate '{strate}' ({taille}) est supérieure à la taille de la strate ({len(sous_base)}). Ajustement.")
-            taille = len(sous_base)
-
-        indices = tirage(len(sous_base), taille, seed=base_seed + i)
-        
-        # Ajuster les indices (passer de 1-based à 0-based)
-        indices = [x - 1 for x in indices]
-        
-        print(f"Tirage pour la strate '{strate}': Indices {indices}")
-
-        if indices:  # Vérifier que les indices sont valides
-            extrait = sous_base.iloc[indices]
-            stratified_sample = pd.concat([stratified_sample, extrait], ignore_index=True)
+        if taille > N_h:
+            warnings.warn(f"La taille de l'échantillon pour la strate '{strate}' ({taille}) est supérieure à la taille de la strate ({N_h}). Ajustement.",
+                          stacklevel=2)
+            taille = N_h
+        tailles.append(taille)
+
+    taches = [(mode, int(effectifs[i]), tailles[i], graines[i]) for i in range(len(tailles))]
+    tirages = _executer_taches(taches, mode, n_jobs)
+
+    blocs_indices, blocs_pik = [], []
+    for i, strate in enumerate(groupes.modalites):
+        indices = tirages[i]
+        if len(indices) == 0:
+            warnings.warn(f"Aucun indice tiré pour la strate '{strate}'", stacklevel=2)
+            continue
+
+        N_h, taille = int(effectifs[i]), tailles[i]
+        blocs_indices.append(groupes.positions(i)[indices])
+        if mode == "sas_avec_remise":
+            pik_h = 1 - (1 - 1 / N_h) ** taille
         else:
-            print(f"Aucun indice tiré pour la strate '{strate}'")
+            pik_h = taille / N_h
+        blocs_pik.append(np.full(len(indices), pik_h))
 
-    return stratified_sample
+    indices = np.concatenate(blocs_indices) if blocs_indices else np.empty(0, dtype=np.int64)
+    pik = np.concatenate(blocs_pik) if blocs_pik else np.empty(0)
+    return ResultatTirage(indices, pik, multiplicites(indices) if mode == "sas_avec_remise" else None)
 
 # --------------------------------------------------
-# Allocation proportionnelle
-
-def allocations_proportionnelles(db: pd.DataFrame, n_total: int) -> Dict[str, int]:
+# STRATIFICATION AVEC TOUTES LES MÉTHODES DE TIRAGE
+def STRATIFICATION(db, n_par_strate, mode="sas_sans_remise", random_state=None, n_jobs=1):
+    # db : DataFrame, ou SamplingFrame dont l'index des strates est déjà construit
+    base = db if isinstance(db, SamplingFrame) else None
+    db = base.data if base is not None else db
     if 'Strate' not in db.columns:
         raise ValueError("La colonne 'Strate' est requise dans la base.")
 
-    effectifs = db['Strate'].value_counts().to_dict()
-    N_total = sum(effectifs.values())
-    allocations = {}
-    for strate, N_h in effectifs.items():
-        allocations[strate] = max(1, round(n_total * N_h / N_total))
+    strates = base.groupes('Strate') if base is not None else db['Strate']
+    resultat = tirage_stratifie_indices(strates, n_par_strate, mode=mode, random_state=random_state, n_jobs=n_jobs)
+
+    # Une seule extraction des lignes tirées, toutes strates confondues
+    return resultat.en_dataframe(db, reinitialiser_index=True)
+
+# --------------------------------------------------
+# Moteur de répartition optimale en entiers (Neyman avec coûts et bornes, Bethel–Chromy)
+# Les fonctions travaillent sur des tableaux alignés sur les strates (N_h, S_h, c_h) et
+# renvoient toujours une répartition réalisable : bas_h <= n_h <= haut_h <= N_h.
+
+# Précision relative de la recherche du multiplicateur de Lagrange (dichotomie)
+TOLERANCE_REPARTITION = 1e-12
+
+def _bornes_repartition(N_h, n_min, n_max):
+    N_h = np.asarray(N_h, dtype=np.int64)
+    haut = N_h if n_max is None else np.minimum(np.broadcast_to(np.asarray(n_max, dtype=np.int64), N_h.shape), N_h)
+    bas = np.minimum(np.broadcast_to(np.asarray(n_min, dtype=np.int64), N_h.shape), haut)
+    if np.any(bas < 0):
+        raise ValueError("Les bornes minimales doivent être positives ou nulles.")
+    return bas, haut
+
+def _multiplicateur(ressource, evaluer):
+    # Plus petit λ tel que evaluer(λ) >= ressource (evaluer croissante), par dichotomie
+    # sur une échelle logarithmique, entièrement vectorisée sur les strates
+    lam_bas, lam_haut = 0.0, 1.0
+    while evaluer(lam_haut) < ressource:
+        lam_bas, lam_haut = lam_haut, lam_haut * 2
+        if lam_haut > 1e300:
+            break
+    while lam_haut - lam_bas > TOLERANCE_REPARTITION * lam_haut:
+        milieu = (lam_bas + lam_haut) / 2
+        if evaluer(milieu) < ressource:
+            lam_bas = milieu
+        else:
+            lam_haut = milieu
+    return lam_haut
+
+def _gains(A, n, haut):
+    # Baisse de Σ A_h / n_h obtenue en ajoutant une unité à chaque strate (-inf si la strate est pleine)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        gains = np.where(n == 0, np.inf, A / n - A / (n + 1))
+    gains = np.where(A == 0, 0.0, gains)
+    return np.where(n >= haut, -np.inf, gains)
+
+def _pertes(A, n, bas):
+    # Hausse de Σ A_h / n_h provoquée en retirant une unité à chaque strate (inf si la strate est au minimum)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        pertes = np.where(n <= 1, np.inf, A / (n - 1) - A / n)
+    pertes = np.where(A == 0, 0.0, pertes)
+    return np.where(n <= bas, np.inf, pertes)
+
+def repartition_entiere(A, n_total, bas, haut):
+    """
+    Répartition entière exacte minimisant Σ_h A_h / n_h sous Σ_h n_h = n_total et bas_h <= n_h <= haut_h.
+
+    La solution continue (n_h = clip(λ √A_h, bas_h, haut_h)) est arrondie par défaut, le reliquat
+    est attribué aux plus forts gains marginaux (tas), puis des échanges d'une unité entre strates
+    sont faits tant qu'ils diminuent l'objectif. Pour un objectif séparable convexe et une contrainte
+    de taille, l'absence d'échange améliorant garantit l'optimum entier.
+
+    Args:
+        A (np.ndarray): Poids A_h >= 0 (N_h² S_h² pour Neyman, divisé par c_h avec des coûts).
+        n_total (int): Taille totale de l'échantillon.
+        bas, haut (np.ndarray): Bornes entières de chaque strate.
+
+    Returns:
+        np.ndarray: Tailles n_h entières (int64).
+    """
+    A = np.asarray(A, dtype=float)
+    bas, haut = np.asarray(bas, dtype=np.int64), np.asarray(haut, dtype=np.int64)
+    if np.any(A < 0) or np.any(np.isnan(A)):
+        raise ValueError("Les poids de la répartition doivent être positifs et renseignés.")
+    if not bas.sum() <= n_total <= haut.sum():
+        raise ValueError(f"Taille {n_total} irréalisable : elle doit être comprise entre {bas.sum()} et {haut.sum()}.")
+
+    # Solution continue, puis arrondi par défaut (la somme reste <= n_total)
+    racines = np.sqrt(A)
+    if racines.sum() > 0:
+        lam = _multiplicateur(n_total, lambda l: np.clip(l * racines, bas, haut).sum())
+        continue_ = np.clip(lam * racines, bas, haut)
+    else:
+        continue_ = bas.astype(float)
+    n = np.clip(np.floor(continue_ + 1e-9).astype(np.int64), bas, haut)
+    if n.sum() > n_total:
+        n = bas.copy()
+
+    # Reliquat : unité par unité, à la strate dont le gain marginal est le plus fort
+    reliquat = n_total - int(n.sum())
+    if reliquat > 0:
+        gains = _gains(A, n, haut)
+        libres = np.flatnonzero(n < haut)
+        tas = [(-gains[h], h) for h in libres]
+        heapq.heapify(tas)
+        while reliquat > 0:
+            _, h = heapq.heappop(tas)
+            n[h] += 1
+            reliquat -= 1
+            if n[h] < haut[h]:
+                heapq.heappush(tas, (-_gains(A[h:h + 1], n[h:h + 1], haut[h:h + 1])[0], h))
+
+    # Échanges améliorants : une unité passe de la strate la moins coûteuse à retirer
+    # vers celle dont le gain est le plus fort
+    for _ in range(len(A) + 1):
+        gains, pertes = _gains(A, n, haut), _pertes(A, n, bas)
+        receveuse, donneuse = int(np.argmax(gains)), int(np.argmin(pertes))
+        if receveuse == donneuse or gains[receveuse] <= pertes[donneuse] * (1 + 1e-12):
+            break
+        n[receveuse] += 1
+        n[donneuse] -= 1
+    return n
 
-    total_alloc = sum(allocations.values())
-    if total_alloc != n_total:
-        strate_ajust = max(allocations.items(), key=lambda x: x[1])[0]
-        allocations[strate_ajust] += n_total - total_alloc
+def allocation_optimale(N_h, S_h, n_total: Optional[int] = None, couts=None, budget: Optional[float] = None,
+                        n_min=1, n_max=None) -> np.ndarray:
+    """
+    Répartition optimale (Neyman, avec coûts et bornes) d'un échantillon stratifié, en entiers.
 
-    return allocations
+    Minimise la variance du total estimé Σ_h N_h² S_h² (1 / n_h - 1 / N_h) :
+    - à taille fixe (n_total) : n_h ∝ N_h S_h / √c_h, arrondi exact par repartition_entiere ;
+    - à budget fixe (budget, avec couts) : Σ_h c_h n_h <= budget, reliquat attribué selon le gain
+      marginal par unité de coût.
+
+    Args:
+        N_h (array-like): Effectifs des strates.
+        S_h (array-like): Écarts-types des strates (tous égaux : répartition proportionnelle).
+        n_total (int, optionnel): Taille totale de l'échantillon.
+        couts (array-like, optionnel): Coût unitaire c_h de chaque strate (1 par défaut).
+        budget (float, optionnel): Budget total, à la place de n_total.
+        n_min (int | array-like): Taille minimale de chaque strate (ramenée à N_h si nécessaire).
+        n_max (int | array-like, optionnel): Taille maximale de chaque strate (N_h au plus).
+
+    Returns:
+        np.ndarray: Tailles n_h entières, dans les bornes, de somme n_total (ou de coût <= budget).
+    """
+    N_h = np.asarray(N_h, dtype=np.int64)
+    S_h = np.asarray(S_h, dtype=float)
+    c_h = np.ones(len(N_h)) if couts is None else np.asarray(couts, dtype=float)
+    if np.any(c_h <= 0) or np.any(np.isnan(c_h)):
+        raise ValueError("Les coûts unitaires doivent être strictement positifs.")
+    if (n_total is None) == (budget is None):
+        raise ValueError("Indiquez soit la taille totale n_total, soit le budget.")
+    bas, haut = _bornes_repartition(N_h, n_min, n_max)
+    A = N_h.astype(float) ** 2 * S_h ** 2
+
+    if n_total is not None:
+        return repartition_entiere(A / c_h, int(n_total), bas, haut)
+
+    # Budget fixe : n_h = clip(λ N_h S_h / √c_h), Σ c_h n_h = budget
+    if np.dot(c_h, bas) > budget:
+        raise ValueError(f"Budget {budget} insuffisant pour les tailles minimales (coût {np.dot(c_h, bas)}).")
+    # Une strate vide de variance non nulle rendrait la variance infinie : une unité au moins
+    # dans chacune, si le budget le permet
+    au_moins_un = np.where((A > 0) & (haut >= 1), np.maximum(bas, 1), bas)
+    if np.dot(c_h, au_moins_un) <= budget:
+        bas = au_moins_un
+    racines = np.sqrt(A / c_h)
+    budget_utile = min(budget, np.dot(c_h, haut))
+    if racines.sum() > 0:
+        lam = _multiplicateur(budget_utile, lambda l: np.dot(c_h, np.clip(l * racines, bas, haut)))
+        n = np.clip(np.floor(np.clip(lam * racines, bas, haut) + 1e-9).astype(np.int64), bas, haut)
+    else:
+        n = bas.copy()
+    if np.dot(c_h, n) > budget:
+        n = bas.copy()
+
+    # Reliquat du budget : gain marginal par unité de coût, tant que la strate tient dans le budget
+    restant = budget - np.dot(c_h, n)
+    gains = _gains(A, n, haut) / c_h
+    tas = [(-gains[h], h) for h in np.flatnonzero(n < haut)]
+    heapq.heapify(tas)
+    while tas:
+        _, h = heapq.heappop(tas)
+        if c_h[h] > restant:
+            continue  # Le budget restant ne fera que diminuer : la strate est écartée
+        n[h] += 1
+        restant -= c_h[h]
+        if n[h] < haut[h]:
+            heapq.heappush(tas, (-_gains(A[h:h + 1], n[h:h + 1], haut[h:h + 1])[0] / c_h[h], h))
+    return n
+
+def allocation_multivariee(N_h, S_hj, totaux, cv_cibles, couts=None, n_min=1, n_max=None,
+                           tolerance: float = 1e-4, max_iterations: int = 200) -> np.ndarray:
+    """
+    Répartition multivariée de coût minimal (Bethel), par l'algorithme itératif de Chromy.
+
+    Cherche Σ_h c_h n_h minimal sous les contraintes CV(Ŷ_j) <= cv_j pour chaque variable j,
+    avec bas_h <= n_h <= haut_h. À chaque itération, la répartition optimale pour une combinaison
+    pondérée des variances est calculée en vectoriel, puis les poids α_j sont renforcés sur les
+    contraintes violées. Le résultat est arrondi par excès : toutes les contraintes restent satisfaites.
+
+    Args:
+        N_h (array-like): Effectifs des strates (H).
+        S_hj (array-like): Écarts-types par strate et par variable (H x J).
+        totaux (array-like): Totaux Y_j de la population (J).
+        cv_cibles (float | array-like): Coefficients de variation visés (J).
+        couts (array-like, optionnel): Coût unitaire c_h de chaque strate (1 par défaut).
+        n_min, n_max: Bornes des tailles par strate, comme pour allocation_optimale.
+        tolerance (float): Dépassement relatif toléré sur les contraintes à la convergence.
+        max_iterations (int): Nombre maximal d'itérations de Chromy.
+
+    Returns:
+        np.ndarray: Tailles n_h entières réalisables.
+    """
+    N_h = np.asarray(N_h, dtype=np.int64)
+    S_hj = np.asarray(S_hj, dtype=float).reshape(len(N_h), -1)
+    J = S_hj.shape[1]
+    totaux = np.broadcast_to(np.asarray(totaux, dtype=float), (J,))
+    cv_cibles = np.broadcast_to(np.asarray(cv_cibles, dtype=float), (J,))
+    c_h = np.ones(len(N_h)) if couts is None else np.asarray(couts, dtype=float)
+    if np.any(totaux == 0) or np.any(cv_cibles <= 0):
+        raise ValueError("Les totaux doivent être non nuls et les CV visés strictement positifs.")
+    if np.any(c_h <= 0) or np.any(np.isnan(c_h)):
+        raise ValueError("Les coûts unitaires doivent être strictement positifs.")
+    bas, haut = _bornes_repartition(N_h, n_min, n_max)
+
+    # Contraintes normalisées Σ_h A_hj / n_h <= 1, avec
+    # A_hj = N_h² S_hj² / ((cv_j Y_j)² + Σ_h N_h S_hj²) (correction de population finie incluse)
+    variances_cibles = (cv_cibles * totaux) ** 2
+    N = N_h.astype(float)[:, None]
+    A = N ** 2 * S_hj ** 2 / (variances_cibles + (N * S_hj ** 2).sum(axis=0))
+
+    def contraintes(n):
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return np.where(A > 0, A / n[:, None], 0.0).sum(axis=0)
+
+    if np.any(contraintes(haut.astype(float)) > 1):
+        raise ValueError("Les CV visés sont inatteignables avec les tailles maximales autorisées.")
+    if np.all(contraintes(bas.astype(float)) <= 1):
+        return bas.copy()  # Les tailles minimales suffisent déjà
+
+    alpha = np.full(J, 1 / J)
+    n = haut.astype(float)
+    for _ in range(max_iterations):
+        D = A @ alpha
+        racines = np.sqrt(D / c_h)
+        if racines.sum() == 0:
+            n = bas.astype(float)
+            break
+        # n_h = clip(μ √(D_h / c_h)) avec μ tel que Σ_h D_h / n_h = 1 (décroissante en μ)
+        def charge(mu):
+            n_mu = np.clip(mu * racines, np.maximum(bas, 1e-12), haut)
+            return -(D / n_mu).sum()
+        mu = _multiplicateur(-1.0, charge)
+        n = np.clip(mu * racines, bas, haut)
+        valeurs = contraintes(n)
+        # Convergence : contraintes respectées, et saturées sauf pour les variables de poids nul
+        saturees = np.abs(valeurs - 1) <= tolerance
+        if np.all(valeurs <= 1 + tolerance) and np.all(saturees | (alpha < tolerance)):
+            break
+        alpha = alpha * valeurs ** 2
+        alpha /= alpha.sum()
+
+    # Arrondi par excès (chaque variance diminue quand n_h augmente), dans les bornes ; si une
+    # contrainte reste violée (itérations arrêtées avant convergence), une unité est ajoutée à la
+    # strate qui la réduit le plus par unité de coût, jusqu'à ce que toutes soient respectées
+    n = np.clip(np.ceil(n - 1e-9).astype(np.int64), bas, haut)
+    valeurs = contraintes(n.astype(float))
+    while np.any(valeurs > 1):
+        j = int(np.argmax(valeurs))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            baisses = np.where(n == 0, np.inf, A[:, j] / n - A[:, j] / (n + 1)) / c_h
+        baisses = np.where((n >= haut) | (A[:, j] == 0), -np.inf, baisses)
+        n[int(np.argmax(baisses))] += 1
+        valeurs = contraintes(n.astype(float))
+    return n
 
 # --------------------------------------------------
-# Répartition de Neyman
+# Allocation proportionnelle
+# Cas particulier de la répartition optimale avec S_h constant : arrondi exact, bornes respectées
 
-def repartition_neyman(db: pd.DataFrame, n_total: int, variable: str) -> Dict[str, int]:
-    if 'Strate' not in db.columns or variable not in db.columns:
-        raise ValueError(f"Les colonnes 'Strate' et '{variable}' sont requises.")
+def allocations_proportionnelles(db, n_total: int, statistiques: Optional[pd.DataFrame] = None,
+                                 n_min=1, n_max=None) -> Dict[str, int]:
+    # db : DataFrame ou SamplingFrame ; statistiques : table de statistiques_strates déjà calculée
+    if statistiques is None:
+        if 'Strate' not in _colonnes(db):
+            raise ValueError("La colonne 'Strate' est requise dans la base.")
+        statistiques = statistiques_strates(db, 'Strate')  # Effectifs N_h en cache
 
-    stats = db.groupby('Strate')[variable].agg(['size', 'var']).to_dict('index')
+    N_h = statistiques['N_h'].to_numpy()
+    tailles = allocation_optimale(N_h, np.ones(len(N_h)), n_total=n_total, n_min=n_min, n_max=n_max)
+    return dict(zip(statistiques.index, tailles.tolist()))
 
-    for strate in stats:
-        if np.isnan(stats[strate]['var']) or stats[strate]['var'] == 0:
-            stats[strate]['var'] = db[variable].var()
+# --------------------------------------------------
+# Répartition de Neyman (avec coûts unitaires et bornes optionnels)
+
+def repartition_neyman(db, n_total: Optional[int], variable: str, statistiques: Optional[pd.DataFrame] = None,
+                       col_cout: Optional[str] = None, budget: Optional[float] = None,
+                       n_min=1, n_max=None) -> Dict[str, int]:
+    # db : DataFrame ou SamplingFrame ; statistiques : table de statistiques_strates(…, variable[, col_cout])
+    if statistiques is None:
+        if 'Strate' not in _colonnes(db) or variable not in _colonnes(db):
+            raise ValueError(f"Les colonnes 'Strate' et '{variable}' sont requises.")
+        statistiques = statistiques_strates(db, 'Strate', variable, col_cout=col_cout)  # N_h, Σy, Σy² en cache
 
-    numerateurs = {strate: stats[strate]['size'] * np.sqrt(stats[strate]['var']) for strate in stats}
-    denominateur = sum(numerateurs.values())
+    stats = statistiques
+    variances = _variances_neyman(stats)
+    couts = stats['cout'].to_numpy() if col_cout is not None or 'cout' in stats.columns else None
+    tailles = allocation_optimale(stats['N_h'].to_numpy(), np.sqrt(variances), n_total=n_total, couts=couts,
+                                  budget=budget, n_min=n_min, n_max=n_max)
+    return dict(zip(stats.index, tailles.tolist()))
 
-    allocations = {}
-    for strate in stats:
-        n_h = max(1, round(n_total * numerateurs[strate] / denominateur))
-        allocations[strate] = min(n_h, stats[strate]['size'])
+# --------------------------------------------------
+# Répartition multivariée (Bethel–Chromy) sur plusieurs variables d'intérêt
+
+def repartition_multivariee(db, variables, cv_cibles, col_cout: Optional[str] = None,
+                            n_min=1, n_max=None) -> Dict[str, int]:
+    # Une table de statistiques (en cache) par variable ; CV visé commun ou un par variable
+    if 'Strate' not in _colonnes(db):
+        raise ValueError("La colonne 'Strate' est requise dans la base.")
+    tables = [statistiques_strates(db, 'Strate', v, col_cout=col_cout) for v in variables]
+    stats = tables[0]
+    S_hj = np.column_stack([np.sqrt(_variances_neyman(t)) for t in tables])
+    totaux = [np.nansum(t['N_h'].to_numpy() * t['moyenne'].to_numpy()) for t in tables]
+    couts = stats['cout'].to_numpy() if col_cout is not None else None
+    tailles = allocation_multivariee(stats['N_h'].to_numpy(), S_hj, totaux, cv_cibles, couts=couts,
+                                     n_min=n_min, n_max=n_max)
+    return dict(zip(stats.index, tailles.tolist()))
 
-    total_alloc = sum(allocations.values())
-    if total_alloc != n_total:
-        ecarts = {s: (allocations[s] / stats[s]['size']) for s in allocations}
-        strate_ajust = max(ecarts.items(), key=lambda x: x[1])[0]
-        allocations[strate_ajust] += n_total - total_alloc
+def _variances_neyman(stats):
+    variances = stats['variance'].to_numpy(copy=True)
 
-    return allocations
+    # Strates dégénérées (variance nulle ou non définie) : variance globale, calculée une seule fois
+    # à partir des sommes par strate (décomposition intra + inter)
+    degenerees = np.isnan(variances) | (variances == 0)
+    if degenerees.any():
+        n_y = stats['n_y'].to_numpy()
+        moyennes = stats['moyenne'].to_numpy()
+        n = n_y.sum()
+        moyenne_globale = np.nansum(n_y * moyennes) / n
+        somme_carres = np.nansum((n_y - 1) * np.nan_to_num(stats['variance'].to_numpy())) + np.nansum(n_y * (moyennes - moyenne_globale) ** 2)
+        variances[degenerees] = somme_carres / (n - 1) if n > 1 else np.nan
+    return np.nan_to_num(variances)
 
+def _colonnes(db):
+    return db.data.columns if isinstance(db, SamplingFrame) else db.columns
@@ -1,16 +1,22 @@
 import pandas as pd
 import numpy as np
-import random
-from typing import Dict, List, Union
-
-df=pd.read_csv("Base.csv", sep=";")
-
-def piar_defaut(df: pd.DataFrame, n: int, col_id: str, col_poids: str, random_state: int=222) -> pd.DataFrame:
+import time
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple, Union
+from noyau_tirage import ResultatTirage, multiplicites, EtatAleatoire, generateur
+from base_de_sondage import SamplingFrame, base_de_sondage
+
+def piar_defaut(df: Union[pd.DataFrame, SamplingFrame], n: int, col_id: str, col_poids: str, random_state: EtatAleatoire=222) -> pd.DataFrame:
     """
     Sélectionne n lignes d'un DataFrame selon une distribution pondérée par les poids dans col_poids.
 
+    Les cumuls F_i sont calculés une seule fois, puis les n tirages sont localisés
+    par recherche dichotomique (np.searchsorted) : coût O(N + n log N). Avec une SamplingFrame
+    (ou un DataFrame déjà passé), les cumuls en cache de la base sont réutilisés : O(n log N).
+
     Args:
-        df (pd.DataFrame): Le DataFrame source.
+        df (pd.DataFrame | SamplingFrame): Le DataFrame source, ou sa base de sondage.
         n (int): Le nombre de lignes à sélectionner.
         col_id (str): Nom de la colonne identifiant les lignes.
         col_poids (str): Nom de la colonne contenant les poids P_i.
@@ -18,40 +24,68 @@ def piar_defaut(df: pd.DataFrame, n: int, col_id: str, col_poids: str, random_st
     Returns:
         pd.DataFrame: Un DataFrame contenant les n lignes sélectionnées.
     """
-    # Initialise la graine aléatoire si donné
-    if random_state is not None:
-        np.random.seed(random_state)
-
-    # Copie pour ne pas modifier l'original
-    df = df.copy()
+    base = base_de_sondage(df)
+    df = base.data
 
     # Vérifie que les colonnes existent
     if col_id not in df.columns or col_poids not in df.columns:
         raise ValueError("Les colonnes spécifiées n'existent pas dans le DataFrame.")
-    
-    # Normalisation des poids pour que la somme soit 1
-    df['P_normalisé'] = df[col_poids] / df[col_poids].sum()
+
+    # Normalisation des poids pour que la somme soit 1 (poids manquants comptés comme nuls)
+    cumuls = base.cumul(col_poids)
+    poids = np.nan_to_num(base.colonne(col_poids))
 
     # Calcul des F_i (cumulés)
-    df['F_i'] = df['P_normalisé'].cumsum()
-    df['F_i-1'] = df['F_i'].shift(fill_value=0)
+    F = cumuls / cumuls[-1]
+    P = poids / cumuls[-1]
+    positions = piar_defaut_indices(poids, n, random_state=random_state, cumuls=cumuls)
 
-    # Tirages aléatoires et sélection
-    u = np.random.uniform(0, 1, size=n)
-    sélection = []
-    
-    for val in u:
-        ligne = df[(df['F_i-1'] < val) & (val <= df['F_i'])].iloc[0]
-        sélection.append(ligne)
+    # Une seule extraction positionnelle des lignes tirées
+    sélection = df.iloc[positions].copy()
+    sélection['P_normalisé'] = P[positions]
+    sélection['F_i'] = F[positions]
+    sélection['F_i-1'] = np.concatenate(([0.0], F[:-1]))[positions]
+
+    return sélection
+
+def piar_defaut_indices(poids: np.ndarray, n: int, random_state: EtatAleatoire=222,
+                        cumuls: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Tire n positions avec remise, proportionnellement aux poids, par la méthode des cumuls.
+
+    Args:
+        poids (np.ndarray): Vecteur des poids P_i (positifs).
+        n (int): Le nombre de tirages.
+        cumuls (np.ndarray, optionnel): Cumuls des poids déjà calculés (SamplingFrame.cumul).
+
+    Returns:
+        np.ndarray: Les n positions (0 à N-1) tirées, dans l'ordre des tirages.
+    """
+    # Générateur explicite : aucun état aléatoire global n'est modifié
+    rng = generateur(random_state)
+
+    if cumuls is None:
+        cumuls = np.cumsum(np.nan_to_num(np.asarray(poids, dtype=float)))
+    F = cumuls / cumuls[-1]
 
-    return pd.DataFrame(sélection)
+    # Tirages aléatoires : F_{i-1} < u <= F_i  <=>  i = premier indice tel que F_i >= u
+    u = rng.uniform(0, 1, size=n)
+    positions = np.searchsorted(F, u, side='left')
 
-def piar_lahiri(df: pd.DataFrame, n: int, col_id: str, col_poids: str, random_state: int=222) -> pd.DataFrame:
+    # Protection contre l'arrondi du dernier cumul (F_N légèrement < 1)
+    return np.minimum(positions, len(F) - 1)
+
+# Nombre maximal de candidats générés par bloc dans la méthode de Lahiri
+TAILLE_MAX_BLOC_LAHIRI = 1 << 22
+
+def piar_lahiri(df: Union[pd.DataFrame, SamplingFrame], n: int, col_id: str, col_poids: str, random_state: EtatAleatoire=222) -> pd.DataFrame:
     """
     Sélectionne n lignes d'un DataFrame selon l'algorithme de rejet basé sur les poids.
-    
+
+    Les candidats sont générés par blocs vectorisés (voir piar_lahiri_indices).
+
     Args:
-        df (pd.DataFrame): Le DataFrame contenant les données.
+        df (pd.DataFrame | SamplingFrame): Le DataFrame contenant les données, ou sa base de sondage.
         n (int): Le nombre d’unités à sélectionner.
         col_id (str): Nom de la colonne identifiant chaque ligne.
         col_poids (str): Nom de la colonne contenant les poids P_j.
@@ -59,165 +93,504 @@ def piar_lahiri(df: pd.DataFrame, n: int, col_id: str, col_poids: str, random_st
     Returns:
         pd.DataFrame: Un DataFrame contenant les lignes sélectionnées.
     """
-    # Initialise la graine aléatoire si donné
-    if random_state is not None:
-        np.random.seed(random_state)
+    base = base_de_sondage(df)
+    df = base.data
+
     # Vérification des colonnes
     if col_id not in df.columns or col_poids not in df.columns:
         raise ValueError("Les colonnes spécifiées n'existent pas dans le DataFrame.")
 
-    df = df.copy()
-    N = len(df)
-    P_0 = df[col_poids].max()  # Le P_0 est le max des P_j
+    positions = piar_lahiri_indices(base.colonne(col_poids), n, random_state=random_state)
 
-    sélection = []
-    k = 0
+    return df.iloc[positions]
+
+def piar_lahiri_indices(poids: np.ndarray, n: int, random_state: EtatAleatoire=222) -> np.ndarray:
+    """
+    Tire n positions avec remise par la méthode de Lahiri (acceptation-rejet), par blocs.
+
+    Chaque bloc tire des couples (j, u) avec j uniforme sur les N unités et u ~ U[0,1] ;
+    le candidat j est accepté si u * P_0 <= P_j. La taille des blocs est fixée par le
+    taux d'acceptation attendu mean(P) / max(P).
+
+    Args:
+        poids (np.ndarray): Vecteur des poids P_j (positifs).
+        n (int): Le nombre de tirages.
+
+    Returns:
+        np.ndarray: Les n positions (0 à N-1) acceptées, dans l'ordre des tirages.
+    """
+    # Générateur explicite : aucun état aléatoire global n'est modifié
+    rng = generateur(random_state)
+
+    poids = np.nan_to_num(np.asarray(poids, dtype=float))
+    N = len(poids)
+    P_0 = poids.max()  # Le P_0 est le max des P_j
+    if N == 0 or P_0 <= 0:
+        raise ValueError("Les poids doivent contenir au moins une valeur strictement positive.")
 
+    taux_acceptation = poids.mean() / P_0
+
+    blocs = []
+    k = 0
     while k < n:
-        j = np.random.randint(0, N - 1)  # Tirage aléatoire d’un index
-        u = np.random.uniform(0, 1)   # Génération d’un u ~ U[0,1]
-        
-        Pj = df.iloc[j][col_poids]
-        if u * P_0 <= Pj:
-            sélection.append(df.iloc[j])
-            k += 1
+        # Taille du bloc : de quoi obtenir les n - k unités restantes avec une petite marge,
+        # plafonnée pour borner la mémoire quand les poids sont très dispersés
+        taille_bloc = min(int(np.ceil((n - k) / taux_acceptation * 1.1)) + 16, TAILLE_MAX_BLOC_LAHIRI)
+        j = rng.integers(0, N, size=taille_bloc)  # Tirage aléatoire des indices (0 à N-1 inclus)
+        u = rng.uniform(0, 1, size=taille_bloc)  # Génération des u ~ U[0,1]
+
+        acceptés = j[u * P_0 <= poids[j]]
+        blocs.append(acceptés[:n - k])
+        k += len(blocs[-1])
+
+    return np.concatenate(blocs) if blocs else np.empty(0, dtype=np.int64)
+
+# Cache LRU des tables d'alias, indexé par (empreinte du DataFrame, colonne des poids)
+TAILLE_MAX_CACHE_ALIAS = 16
+_cache_alias: "OrderedDict[Tuple[str, str], Tuple[np.ndarray, np.ndarray, float]]" = OrderedDict()
+_infos_alias = {"succes": 0, "echecs": 0, "temps_construction": None, "temps_tirage": None}
+
+def construire_table_alias(poids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Construit la table d'alias de Walker (variante de Vose) associée aux poids, sans boucle Python.
+
+    Les petites cases (q_i < 1) sont complétées dans l'ordre par les grandes cases prises l'une
+    après l'autre. La grande case k (excédent cumulé E_k) sert les petites cases tant que le
+    déficit cumulé S de celles-ci reste <= E_k ; elle devient ensuite petite, de hauteur
+    1 - (S - E_k), et est complétée par la grande case suivante. Deux recherches dichotomiques
+    sur les cumuls remplacent ainsi les piles de l'algorithme séquentiel : coût O(N log N).
+
+    Args:
+        poids (np.ndarray): Vecteur des poids P_i (positifs).
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Les seuils d'acceptation et les alias de chaque case.
+    """
+    poids = np.nan_to_num(np.asarray(poids, dtype=float))
+    N = len(poids)
+
+    # Poids remis à l'échelle : une case de hauteur 1 par unité
+    q = poids * N / poids.sum()
+    seuils = np.ones(N)
+    alias = np.arange(N, dtype=np.int64)
+
+    petits = np.flatnonzero(q < 1.0)
+    grands = np.flatnonzero(q >= 1.0)
+    if len(petits) == 0 or len(grands) == 0:
+        return seuils, alias
+
+    S = np.cumsum(1.0 - q[petits])   # Déficit cumulé des petites cases
+    E = np.cumsum(q[grands] - 1.0)   # Excédent cumulé des grandes cases
+
+    # Grande case active pour la petite case i : nombre de grandes cases épuisées avant elle
+    actives = np.searchsorted(E, np.concatenate(([0.0], S[:-1])), side="left")
+    servies = actives < len(grands)  # Au-delà : erreurs d'arrondi, la case reste pleine
+    seuils[petits[servies]] = q[petits[servies]]
+    alias[petits[servies]] = grands[actives[servies]]
+
+    # Grande case k épuisée au premier déficit cumulé S > E_k : complétée par la suivante
+    epuisement = np.searchsorted(S, E[:-1], side="right")
+    epuisees = np.flatnonzero(epuisement < len(S))
+    seuils[grands[epuisees]] = 1.0 - (S[epuisement[epuisees]] - E[epuisees])
+    alias[grands[epuisees]] = grands[epuisees + 1]
+
+    # Les cases restantes sont pleines (erreurs d'arrondi comprises)
+    return seuils, alias
+
+def table_alias(poids: np.ndarray, cle: Union[Tuple[str, str], None] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Renvoie la table d'alias des poids, en la construisant seulement si elle n'est pas en cache.
+
+    Args:
+        poids (np.ndarray): Vecteur des poids P_i.
+        cle (Tuple[str, str], optionnel): Clé du cache (empreinte du DataFrame, colonne des poids).
+            Par défaut, une empreinte du vecteur des poids.
+
+    Returns:
+        Tuple[np.ndarray, np.ndarray]: Les seuils d'acceptation et les alias de chaque case.
+    """
+    if cle is None:
+        poids = np.ascontiguousarray(poids, dtype=float)
+        cle = (hashlib.blake2b(poids.tobytes(), digest_size=16).hexdigest(), "")
+
+    if cle in _cache_alias:
+        _cache_alias.move_to_end(cle)
+        seuils, alias, _ = _cache_alias[cle]
+        _infos_alias["succes"] += 1
+        _infos_alias["temps_construction"] = 0.0
+    else:
+        debut = time.perf_counter()
+        seuils, alias = construire_table_alias(poids)
+        duree = time.perf_counter() - debut
+        _cache_alias[cle] = (seuils, alias, duree)
+        if len(_cache_alias) > TAILLE_MAX_CACHE_ALIAS:
+            _cache_alias.popitem(last=False)  # Retire la table la moins récemment utilisée
+        _infos_alias["echecs"] += 1
+        _infos_alias["temps_construction"] = duree
+
+    return seuils, alias
+
+def piar_alias_indices(seuils: np.ndarray, alias: np.ndarray, n: int, random_state: EtatAleatoire=222) -> np.ndarray:
+    """
+    Tire n positions avec remise à partir d'une table d'alias, en O(1) par tirage.
+
+    Args:
+        seuils (np.ndarray): Seuils d'acceptation de chaque case.
+        alias (np.ndarray): Alias de chaque case.
+        n (int): Le nombre de tirages.
+
+    Returns:
+        np.ndarray: Les n positions (0 à N-1) tirées, dans l'ordre des tirages.
+    """
+    # Générateur explicite : aucun état aléatoire global n'est modifié
+    rng = generateur(random_state)
+
+    cases = rng.integers(0, len(seuils), size=n)  # Case choisie uniformément
+    u = rng.uniform(0, 1, size=n)                 # On garde la case ou on prend son alias
+    return np.where(u < seuils[cases], cases, alias[cases])
+
+def piar_alias(df: Union[pd.DataFrame, SamplingFrame], n: int, col_id: str, col_poids: str, random_state: EtatAleatoire=222,
+               empreinte: Optional[str] = None) -> pd.DataFrame:
+    """
+    Sélectionne n lignes avec remise, proportionnellement à col_poids, par la méthode des alias.
+
+    La table d'alias est construite une seule fois par (empreinte de la base, colonne des poids),
+    la même clé que tirage_probabilites_inegales_base, et conservée dans un cache LRU borné :
+    les tirages suivants coûtent O(1) par unité. L'empreinte est celle de la SamplingFrame, ou
+    celle fournie ; sinon, elle est calculée au premier appel sur le DataFrame puis réutilisée
+    (voir base_de_sondage). Les temps de construction et de tirage sont consultables via
+    infos_cache_alias().
+
+    Args:
+        df (pd.DataFrame | SamplingFrame): Le DataFrame source, ou sa base de sondage.
+        n (int): Le nombre de lignes à sélectionner.
+        col_id (str): Nom de la colonne identifiant les lignes.
+        col_poids (str): Nom de la colonne contenant les poids P_i.
+        empreinte (str, optionnel): Empreinte du DataFrame, si elle est déjà connue.
+
+    Returns:
+        pd.DataFrame: Un DataFrame contenant les n lignes sélectionnées.
+    """
+    base = base_de_sondage(df, empreinte)
+    df = base.data
+    if col_id not in df.columns or col_poids not in df.columns:
+        raise ValueError("Les colonnes spécifiées n'existent pas dans le DataFrame.")
+
+    seuils, alias = table_alias(base.colonne(col_poids), cle=(base.empreinte, col_poids))
+
+    debut = time.perf_counter()
+    positions = piar_alias_indices(seuils, alias, n, random_state=random_state)
+    _infos_alias["temps_tirage"] = time.perf_counter() - debut
+
+    return df.iloc[positions]
+
+def infos_cache_alias() -> Dict[str, Union[int, float, None]]:
+    """
+    Renvoie l'état du cache des tables d'alias et les temps du dernier appel à piar_alias.
+
+    Returns:
+        Dict: succès/échecs du cache, nombre de tables conservées, temps de construction
+        du dernier appel (0 en cas de succès du cache), temps de tirage du dernier appel,
+        et temps de construction cumulé des tables en cache (en secondes).
+    """
+    return {
+        **_infos_alias,
+        "tables_en_cache": len(_cache_alias),
+        "temps_construction_en_cache": sum(entree[2] for entree in _cache_alias.values()),
+    }
 
-    return pd.DataFrame(sélection)
+def vider_cache_alias() -> None:
+    """
+    Vide le cache des tables d'alias et remet ses compteurs à zéro.
+    """
+    _cache_alias.clear()
+    _infos_alias.update({"succes": 0, "echecs": 0, "temps_construction": None, "temps_tirage": None})
 
-def pisr_poisson(df: pd.DataFrame, col_id: str, col_pi: str, random_state: int=222) -> pd.DataFrame:
+def pisr_poisson(df: Union[pd.DataFrame, SamplingFrame], col_id: str, col_pi: str, random_state: EtatAleatoire=222) -> pd.DataFrame:
     """
     Effectue un échantillonnage Bernoulli basé sur les probabilités d'inclusion π_i.
 
     Args:
-        df (pd.DataFrame): Le DataFrame contenant les données.
+        df (pd.DataFrame | SamplingFrame): Le DataFrame contenant les données, ou sa base de sondage.
         col_id (str): Nom de la colonne identifiant chaque ligne.
         col_pi (str): Nom de la colonne contenant les probabilités d’inclusion π_i (comprises entre 0 et 1).
 
     Returns:
         pd.DataFrame: Un DataFrame contenant les lignes échantillonnées.
     """
-    # Initialise la graine aléatoire si donné
-    if random_state is not None:
-        np.random.seed(random_state)
+    # Générateur explicite : aucun état aléatoire global n'est modifié
+    rng = generateur(random_state)
+    base = base_de_sondage(df)
+    df = base.data
 
     # Vérification des colonnes
     if col_id not in df.columns or (col_pi not in df.columns):
         raise ValueError("Les colonnes spécifiées n'existent pas dans le DataFrame.")
 
-    df = df.copy()
-    N = len(df)
-
     # Génération de N réalisations u_i ~ U[0,1]
-    u = np.random.uniform(0, 1, size=N)
-    
+    u = rng.uniform(0, 1, size=len(df))
+
     # Sélection des lignes où u_i < π_i
-    df['u_i'] = u
-    échantillon = df[df['u_i'] < df[col_pi]]
+    positions = np.flatnonzero(u < base.colonne(col_pi))
+    échantillon = df.iloc[positions].copy()
+    échantillon['u_i'] = u[positions]
+
+    return échantillon
+
+def pisr_poisson_indices(pi: np.ndarray, random_state: EtatAleatoire=222) -> np.ndarray:
+    """
+    Tire les positions d'un échantillon de Poisson : l'unité i est retenue si u_i < π_i.
+
+    Args:
+        pi (np.ndarray): Vecteur des probabilités d'inclusion π_i.
+
+    Returns:
+        np.ndarray: Les positions (0 à N-1) sélectionnées, par ordre croissant.
+    """
+    # Générateur explicite : aucun état aléatoire global n'est modifié
+    rng = generateur(random_state)
 
-    return pd.DataFrame(échantillon)
+    pi = np.asarray(pi, dtype=float)
+    return np.flatnonzero(rng.uniform(0, 1, size=len(pi)) < pi)
 
-def pisr_systematique(df: pd.DataFrame, n: int, col_id: str, col_pi: str, random_state: int=222) -> pd.DataFrame:
+def pisr_systematique(df: Union[pd.DataFrame, SamplingFrame], n: int, col_id: str, col_pi: str, random_state: EtatAleatoire=222) -> pd.DataFrame:
     """
     Effectue un échantillonnage systématique pondéré à probabilités proportionnelles aux tailles (PPS) avec taille fixe n.
 
+    Les cumuls V_i sont calculés une seule fois et les n points u + k sont localisés
+    en un seul appel à np.searchsorted (voir pisr_systematique_indices) ; avec une SamplingFrame
+    (ou un DataFrame déjà passé), les cumuls en cache de la base sont réutilisés.
+
     Args:
-        df (pd.DataFrame): Le DataFrame contenant les données.
+        df (pd.DataFrame | SamplingFrame): Le DataFrame contenant les données, ou sa base de sondage.
         col_id (str): Nom de la colonne identifiant chaque ligne.
         col_pi (str): Nom de la colonne contenant les π_i, telles que leur somme vaut n (taille de l'échantillon).
         
     Returns:
         pd.DataFrame: Un DataFrame contenant les n lignes sélectionnées.
     """
-    # Initialise la graine aléatoire si donné
-    if random_state is not None:
-        np.random.seed(random_state)
-
+    base = base_de_sondage(df)
+    df = base.data
     if col_id not in df.columns or col_pi not in df.columns:
         raise ValueError("Les colonnes spécifiées n'existent pas dans le DataFrame.")
 
-    df = df.copy()
-    
-    # Calcul des cumuls V_i
-    df['V'] = df[col_pi].cumsum()
-    df['V_shift'] = df['V'].shift(fill_value=0)
+    pi = np.nan_to_num(base.colonne(col_pi))
+    V = base.cumul(col_pi)
+    positions = pisr_systematique_indices(pi, n, random_state=random_state, cumuls=V)
+
+    # Cumuls V_i des seules unités sélectionnées
+    sélection = df.iloc[positions].copy()
+    sélection['V'] = V[positions]
+    sélection['V_shift'] = V[positions] - pi[positions]
+
+    return sélection.reset_index(drop=True)
+
+def pisr_systematique_indices(pi: np.ndarray, n: int, random_state: EtatAleatoire=222,
+                              cumuls: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Tire les positions d'un échantillon systématique πps de taille n, en une seule passe.
+
+    Args:
+        pi (np.ndarray): Vecteur des probabilités d'inclusion π_i (somme égale à n).
+        n (int): La taille de l'échantillon.
+        cumuls (np.ndarray, optionnel): Cumuls des π_i déjà calculés (SamplingFrame.cumul).
+
+    Returns:
+        np.ndarray: Les positions (0 à N-1) sélectionnées, par ordre croissant.
+    """
+    # Générateur explicite : aucun état aléatoire global n'est modifié
+    rng = generateur(random_state)
 
-    u = np.random.uniform(0, 1)  # Point de départ aléatoire
+    V = np.cumsum(np.nan_to_num(np.asarray(pi, dtype=float))) if cumuls is None else cumuls
 
-    # Calcul des positions de sélection u + k pour k = 0 à n-1
-    positions = [u + k for k in range(n)]
+    u = rng.uniform(0, 1)  # Point de départ aléatoire
 
-    # Sélection des lignes correspondantes aux intervalles V_{i-1} < pos <= V_i
-    sélection = pd.DataFrame()
-    for pos in positions:
-        ligne = df[(df['V_shift'] < pos) & (pos <= df['V'])].head(1)
-        sélection = pd.concat([sélection, ligne], axis=0)
+    # Unité i retenue pour le point u + k si V_{i-1} < u + k <= V_i
+    positions = np.searchsorted(V, u + np.arange(n), side='left')
 
-    return pd.DataFrame(sélection).reset_index(drop=True)
+    # Les points au-delà de V_N (somme des π_i < n) ne sélectionnent aucune unité
+    return positions[positions < len(V)]
 
-def pisr_sunter(df: pd.DataFrame, n: int, col_id: str, col_pi: str, random_state=None) -> pd.DataFrame:
+# Tolérance sur les cumuls des π_i pour repérer le franchissement d'un entier
+TOLERANCE_CUMULS = 1e-9
+
+def pisr_sunter(df: Union[pd.DataFrame, SamplingFrame], n: int, col_id: str, col_pi: str, random_state: EtatAleatoire=None) -> pd.DataFrame:
     """
     Implémente la méthode de sélection-rejet généralisée pour tirer un échantillon de taille fixe n.
 
+    Le parcours de la population est effectué sur des tableaux NumPy (voir pisr_sunter_indices),
+    à partir de la colonne et des cumuls en cache de la base de sondage.
+
     Args:
-        df (pd.DataFrame): Le DataFrame contenant les données.
+        df (pd.DataFrame | SamplingFrame): Le DataFrame contenant les données, ou sa base de sondage.
         col_id (str): Nom de la colonne identifiant chaque ligne.
         col_pi (str): Nom de la colonne contenant les probabilités d’inclusion π_i.
 
     Returns:
         pd.DataFrame: Le DataFrame contenant les unités sélectionnées.
     """
-
-    # Initialise la graine aléatoire si donné
-    if random_state is not None:
-        np.random.seed(random_state)
+    base = base_de_sondage(df)
+    df = base.data
     if col_id not in df.columns or col_pi not in df.columns:
         raise ValueError("Les colonnes spécifiées n'existent pas dans le DataFrame.")
 
-    df = df.copy().reset_index(drop=True)
-    N = len(df)
+    positions = pisr_sunter_indices(base.colonne(col_pi), n, random_state=random_state, cumuls=base.cumul(col_pi))
 
-    i = 0  # index sur la population
-    j = 0  # compteur d'unités sélectionnées
-    V = 0  # somme cumulative des π_i
-    échantillon = []
+    return df.iloc[positions].reset_index(drop=True)
 
-    while j < n and i < N:
-        pi_i = df.loc[i, col_pi]
-        u = np.random.uniform(0, 1)
+def pisr_sunter_indices(pi: np.ndarray, n: int, random_state: EtatAleatoire=None,
+                        cumuls: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Sélection-rejet généralisée (méthode séquentielle de Sunter) sur un vecteur contigu de π_i.
+
+    La règle de Sunter u_i < π_i (n - j) / (n - V_{i-1}), où j est le nombre d'unités déjà
+    retenues et V_{i-1} le cumul des π précédents, n'est pas de taille fixe : quand ce rapport
+    dépasse 1, il manque des unités en fin de fichier. On conditionne donc plutôt sur la position
+    de j par rapport à V_{i-1} : j vaut ⌊V_{i-1}⌋ (« à l'heure ») ou ⌊V_{i-1}⌋ + 1 (« en avance »).
+    Avec f = V_{i-1} - ⌊V_{i-1}⌋, l'unité i est retenue :
+        - si V_i ne franchit pas d'entier : avec probabilité π_i / (1 - f) à l'heure, jamais en avance ;
+        - si V_i franchit un entier : toujours à l'heure, avec probabilité (V_i - ⌊V_i⌋) / f en avance.
+    On obtient exactement n = Σ π_i unités et les probabilités d'inclusion π_i (principe du
+    tirage systématique de Deville). L'état « en avance » ne change qu'aux unités qui le forcent
+    (retenue sans franchissement, rejet avec franchissement) : il se calcule sans boucle Python
+    à partir du dernier forçage. Coût O(N), mémoire O(N).
 
-        if n-V != 0:  # éviter division par 0
-            seuil = pi_i * ((n - j) / (n - V))
+    Args:
+        pi (np.ndarray): Vecteur des probabilités d'inclusion π_i (somme égale à n).
+        n (int): La taille de l'échantillon.
+        cumuls (np.ndarray, optionnel): Cumuls des π_i déjà calculés (SamplingFrame.cumul).
 
-        if u < seuil:
-            échantillon.append(df.loc[i])
-            j += 1
+    Returns:
+        np.ndarray: Les positions (0 à N-1) sélectionnées, par ordre croissant.
+    """
+    # Générateur explicite : aucun état aléatoire global n'est modifié
+    rng = generateur(random_state)
+
+    pi = np.nan_to_num(np.asarray(pi, dtype=np.float64))
+    N = len(pi)
+    if N == 0 or n <= 0:
+        return np.empty(0, dtype=np.int64)
+
+    u = rng.uniform(0, 1, size=N)
+    V = np.cumsum(pi) if cumuls is None else np.asarray(cumuls, dtype=np.float64)
+    V_prec = V - pi  # V_{i-1} : somme des π des unités précédentes
+
+    # Parties entières et fractionnaires des cumuls, tolérantes aux erreurs d'arrondi
+    m_prec, m = np.floor(V_prec + TOLERANCE_CUMULS), np.floor(V + TOLERANCE_CUMULS)
+    f_prec, f = np.clip(V_prec - m_prec, 0.0, 1.0), np.clip(V - m, 0.0, 1.0)
+    franchit = m > m_prec
+
+    p_heure = pi / (1.0 - f_prec)                                          # sans franchissement
+    p_avance = np.divide(f, f_prec, out=np.zeros(N), where=f_prec > 0)     # avec franchissement
+    r = u < np.where(franchit, p_avance, p_heure)
+
+    # État « en avance » après chaque unité : valeur du dernier forçage (à l'heure au départ)
+    force = np.where(franchit, ~r, r)
+    dernier = np.maximum.accumulate(np.where(force, np.arange(N), -1))
+    avance_apres = np.where(dernier >= 0, ~franchit[np.maximum(dernier, 0)], False)
+    avance = np.concatenate(([False], avance_apres[:-1]))
+
+    retenue = np.where(franchit, r | ~avance, r & ~avance)
+    return np.flatnonzero(retenue).astype(np.int64)
+
+def tirage_probabilites_inegales(poids: np.ndarray, n: Union[int, None], methode: str, random_state: EtatAleatoire=222,
+                                 cle_alias: Union[Tuple[str, str], None] = None,
+                                 cumuls: Optional[np.ndarray] = None) -> ResultatTirage:
+    """
+    Noyau commun des méthodes à probabilités inégales : renvoie des tableaux, sans DataFrame.
 
-        V += pi_i
-        i += 1
+    Args:
+        poids (np.ndarray): Poids P_i pour les méthodes PIAR, probabilités d'inclusion π_i pour les méthodes PISR.
+        n (int | None): Taille de l'échantillon (nombre de tirages pour PIAR ; ignoré pour 'pisr_poisson').
+        methode (str): 'piar_defaut', 'piar_lahiri', 'piar_alias', 'pisr_poisson', 'pisr_systematique' ou 'pisr_sunter'.
+        random_state (int | SeedSequence | Generator | None): Graine ou générateur à utiliser
+            (un Generator est consommé tel quel, sans toucher à l'état global de NumPy).
+        cle_alias (Tuple[str, str], optionnel): Clé du cache des tables d'alias
+            (empreinte de la base, colonne des poids) ; par défaut, une empreinte des poids.
+        cumuls (np.ndarray, optionnel): Cumuls des poids déjà calculés ('piar_defaut',
+            'pisr_systematique', 'pisr_sunter').
 
-    return pd.DataFrame(échantillon).reset_index(drop=True)
+    Returns:
+        ResultatTirage: Positions tirées, probabilités d'inclusion associées et, pour les
+        méthodes avec remise, multiplicités. Pour PIAR, π_i = 1 - (1 - p_i)^n.
+    """
+    poids = np.nan_to_num(np.asarray(poids, dtype=float))
+
+    if methode == "pisr_poisson":
+        positions = pisr_poisson_indices(poids, random_state=random_state)
+        return ResultatTirage(positions, poids[positions])
+
+    if n is None:
+        raise ValueError("Veuillez fournir la taille n de l'échantillon")
+
+    if methode in ["piar_defaut", "piar_lahiri", "piar_alias"]:
+        if methode == "piar_defaut":
+            positions = piar_defaut_indices(poids, n, random_state=random_state, cumuls=cumuls)
+        elif methode == "piar_lahiri":
+            positions = piar_lahiri_indices(poids, n, random_state=random_state)
+        else:
+            seuils, alias = table_alias(poids, cle=cle_alias)
+            debut = time.perf_counter()
+            positions = piar_alias_indices(seuils, alias, n, random_state=random_state)
+            _infos_alias["temps_tirage"] = time.perf_counter() - debut
+        p = poids[positions] / poids.sum()
+        return ResultatTirage(positions, 1 - (1 - p) ** n, multiplicites(positions))
+
+    if methode == "pisr_systematique":
+        positions = pisr_systematique_indices(poids, n, random_state=random_state, cumuls=cumuls)
+    elif methode == "pisr_sunter":
+        positions = pisr_sunter_indices(poids, n, random_state=random_state, cumuls=cumuls)
+    else:
+        raise ValueError(f"Méthode '{methode}' non reconnue.")
+    return ResultatTirage(positions, poids[positions])
+
+def tirage_probabilites_inegales_base(base: SamplingFrame, col_poids: str, n: Union[int, None], methode: str,
+                                      random_state: EtatAleatoire=222) -> ResultatTirage:
+    """
+    Même noyau que tirage_probabilites_inegales, sur une base de sondage construite au chargement.
 
-def unequal_prob_sampling(df, n: Union[int, None], col_id: str, col_pi: Union[int, None], methode: str, random_state: int=222, appliquer_piar: bool = True) -> pd.DataFrame:
+    La colonne des poids et ses cumuls sont calculés une seule fois par la base, et la table
+    d'alias est mise en cache sous l'empreinte de la base, sans rehacher les données.
 
+    Args:
+        base (SamplingFrame): La base de sondage.
+        col_poids (str): Colonne des poids P_i (PIAR) ou des probabilités π_i (PISR).
+        n (int | None): Taille de l'échantillon (ignorée pour 'pisr_poisson').
+        methode (str): Nom de la méthode (voir tirage_probabilites_inegales).
+        random_state (int | SeedSequence | Generator | None): Graine ou générateur à utiliser.
+
+    Returns:
+        ResultatTirage: Positions tirées dans base.data, π_i et multiplicités éventuelles.
     """
-    Applique la méthode d'échantillonnage choisie parmi les 5 disponibles.
+    cumuls = base.cumul(col_poids) if methode in ("piar_defaut", "pisr_systematique", "pisr_sunter") else None
+    return tirage_probabilites_inegales(base.colonne(col_poids), n, methode, random_state=random_state,
+                                        cle_alias=(base.empreinte, col_poids), cumuls=cumuls)
+
+def unequal_prob_sampling(df, n: Union[int, None], col_id: str, col_pi: Union[int, None], methode: str, random_state: EtatAleatoire=222, appliquer_piar: bool = True) -> pd.DataFrame:
+
+    """
+    Applique la méthode d'échantillonnage choisie parmi les 6 disponibles.
 
     Args:
         df (pd.DataFrame): Données sources.
         col_id (str): Colonne identifiant les unités.
         col_pi (str): Colonne des poids ou probabilités.
-        méthode (str): Nom de la méthode à appliquer (doit être l'un des 5 noms de fonction).
-        appliquer_piar (bool): Si True, la méthode doit être 'piar_defaut' ou 'piar_lahiri'.
+        méthode (str): Nom de la méthode à appliquer (doit être l'un des 6 noms de fonction).
+        appliquer_piar (bool): Si True, la méthode doit être 'piar_defaut', 'piar_lahiri' ou 'piar_alias'.
 
     Returns:
         pd.DataFrame: Le résultat de l'échantillonnage.
     """
-    if random_state is not None:
-        np.random.seed(random_state)
+    # Une base de sondage est transmise telle quelle aux méthodes (colonnes et cumuls en cache)
+    base = df
+    if isinstance(df, SamplingFrame):
+        df = df.data
+
     # Dictionnaire des fonctions disponibles
     fonctions = {
         "piar_defaut": piar_defaut,
         "piar_lahiri": piar_lahiri,
+        "piar_alias": piar_alias,
         "pisr_poisson": pisr_poisson,
         "pisr_systematique": pisr_systematique,
         "pisr_sunter": pisr_sunter,
@@ -227,20 +600,22 @@ def unequal_prob_sampling(df, n: Union[int, None], col_id: str, col_pi: Union[in
         raise ValueError(f"Méthode '{methode}' non reconnue. Choisissez parmi : {list(fonctions.keys())}")
 
     if appliquer_piar:
-        if methode not in ["piar_defaut", "piar_lahiri"]:
-            raise ValueError("Quand 'appliquer_piar=True', la méthode doit être 'piar_defaut' ou 'piar_lahiri'.")
+        if methode not in ["piar_defaut", "piar_lahiri", "piar_alias"]:
+            raise ValueError("Quand 'appliquer_piar=True', la méthode doit être 'piar_defaut', 'piar_lahiri' ou 'piar_alias'.")
     
     if col_pi is None :
         col_pi="col_pi"
         freq   = df[col_id].value_counts().reset_index(0)
         freq.columns = [col_id, 'effectif']
-        if methode in ['piar_defaut', 'piar_lahiri', 'pisr_poisson']:
+        if methode in ['piar_defaut', 'piar_lahiri', 'piar_alias', 'pisr_poisson']:
             freq[col_pi] = freq['effectif']/freq['effectif'].sum()
         else: 
             if n is None:
                 raise ValueError("Veuillez fournir la taille n de l'échantillon")
             freq[col_pi] = (freq['effectif']/freq['effectif'].sum())*n
         df_copy=freq[[col_id, col_pi]]
+    else:
+        df_copy=base
 
     # Appel de la bonne fonction avec les arguments
     fonction_choisie = fonctions[methode]
@@ -251,5 +626,8 @@ def unequal_prob_sampling(df, n: Union[int, None], col_id: str, col_pi: Union[in
             raise ValueError("Veuillez fournir la taille n de l'échantillon")
         return fonction_choisie(df_copy, n, col_id, col_pi, random_state)
 
-sampling=unequal_prob_sampling(df, n=5, col_id="Grappe", col_pi=None, methode="pisr_sunter", appliquer_piar=False)
-sampling
+# Exécution
+if __name__ == "__main__":
+    df=pd.read_csv("Base.csv", sep=";")
+    sampling=unequal_prob_sampling(df, n=5, col_id="Grappe", col_pi=None, methode="pisr_sunter", appliquer_piar=False)
+    print(sampling)